@@ -0,0 +1,93 @@
+"""Benchmark for the in-memory bitmap index of the catalog filters.
+
+Builds a synthetic SQLite catalog (same generator as bench_indexes.py), builds
+the index (time and memory), then compares matching ids for filter
+combinations of catalog.home computed by the index and by SQL.
+
+	python benchmarks/bench_bitmap.py --books 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlalchemy import select
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_indexes import populate  # noqa: E402
+from library_tracker.app import create_app  # noqa: E402
+from library_tracker.app.extensions import db  # noqa: E402
+from library_tracker.app.models.core import Emplacement  # noqa: E402
+from library_tracker.app.models.books import Livre, livre_genre  # noqa: E402
+from library_tracker.app.services.bitmap_index import BitmapIndex  # noqa: E402
+
+
+def combinations() -> list[tuple[str, dict, object]]:
+	in_genre = Livre.id.in_(select(livre_genre.c.livre_id).where(livre_genre.c.genre_id == 5))
+	zone = Emplacement.zone == "Zone 3"
+	return [
+		("genre", {"genre": [5]}, [in_genre]),
+		("langue", {"langue": [3]}, [Livre.langue_id == 3]),
+		("genre + langue", {"genre": [5], "langue": [3]}, [in_genre, Livre.langue_id == 3]),
+		("editeur + serie", {"editeur": [7], "serie": [11]}, [Livre.editeur_id == 7, Livre.serie_id == 11]),
+		("zone (50 emplacements)", {"emplacement": "zone"}, [zone]),
+		("zone + genre", {"emplacement": "zone", "genre": [5]}, [zone, in_genre]),
+	]
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--books", type=int, default=1_000_000)
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--db", help="SQLite file to use (default: temporary file)")
+	args = parser.parse_args()
+
+	path = Path(args.db) if args.db else Path(tempfile.mkdtemp()) / "bench_bitmap.db"
+	path.unlink(missing_ok=True)
+	app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path.as_posix()}"})
+	with app.app_context():
+		db.create_all()
+		db.engine.dispose()
+
+	conn = sqlite3.connect(path)
+	t0 = time.perf_counter()
+	populate(conn, args.books)
+	conn.close()
+	print(f"Populated {args.books} books in {time.perf_counter() - t0:.1f}s ({path})")
+
+	with app.app_context():
+		index = BitmapIndex()
+		tracemalloc.start()
+		t0 = time.perf_counter()
+		index.build(db.session.connection())
+		elapsed = time.perf_counter() - t0
+		memory = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+		print(f"Index built in {elapsed:.1f}s, {memory / 1e6:.0f} MB\n")
+
+		zone_ids = list(db.session.scalars(select(Emplacement.id).where(Emplacement.zone == "Zone 3")))
+		print(f"{'filters':<24} {'books':>8} {'index ms':>9} {'SQL ms':>9}")
+		for name, filters, where in combinations():
+			filters = {k: zone_ids if v == "zone" else v for k, v in filters.items()}
+			stmt = select(Livre.id).outerjoin(Emplacement, Emplacement.id == Livre.emplacement_id).where(*where)
+			timings = []
+			for run in (lambda: index.match(filters).ids(), lambda: db.session.scalars(stmt).all()):
+				best = float("inf")
+				for _ in range(args.repeat):
+					t0 = time.perf_counter()
+					found = run()
+					best = min(best, time.perf_counter() - t0)
+				timings.append((best, sorted(found)))
+			assert timings[0][1] == timings[1][1], name
+			print(f"{name:<24} {len(timings[0][1]):8d} {timings[0][0] * 1000:9.1f} {timings[1][0] * 1000:9.1f}")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
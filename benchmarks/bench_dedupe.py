@@ -0,0 +1,66 @@
+"""Benchmark for the catalog-wide duplicate clustering (`flask dedupe-clusters`).
+
+Builds a synthetic SQLite catalog (same generator as bench_indexes.py), builds
+the duplicate-detection index, then clusters books and authors, printing block
+counts, comparisons and time per kind.
+
+	python benchmarks/bench_dedupe.py --books 100000 --workers 4
+
+The synthetic titles ("Titre 01234567") all look alike, so most books land in
+crowded buckets: a pessimistic case for blocking.
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_indexes import populate  # noqa: E402
+from library_tracker.app import create_app  # noqa: E402
+from library_tracker.app.extensions import db  # noqa: E402
+from library_tracker.app.services import duplicate_check, duplicate_clusters  # noqa: E402
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--books", type=int, default=100_000)
+	parser.add_argument("--workers", type=int, default=0)
+	parser.add_argument("--batch-blocks", type=int, default=2000)
+	parser.add_argument("--db", help="SQLite file to use (default: temporary file)")
+	args = parser.parse_args()
+
+	path = Path(args.db) if args.db else Path(tempfile.mkdtemp()) / "bench_dedupe.db"
+	path.unlink(missing_ok=True)
+	app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path.as_posix()}"})
+	with app.app_context():
+		db.create_all()
+		db.engine.dispose()
+
+	conn = sqlite3.connect(path)
+	t0 = time.perf_counter()
+	populate(conn, args.books)
+	conn.close()
+	print(f"Populated {args.books} books in {time.perf_counter() - t0:.1f}s ({path})")
+
+	with app.app_context():
+		t0 = time.perf_counter()
+		duplicate_check.rebuild_index(db.session.connection())
+		db.session.commit()
+		print(f"Duplicate index built in {time.perf_counter() - t0:.1f}s\n")
+
+		for kind in duplicate_clusters.KINDS:
+			run = duplicate_clusters.cluster_duplicates(kind, workers=args.workers, batch_blocks=args.batch_blocks)
+			print(
+				f"{kind:<7} {run.elapsed:7.1f} s  {run.position:7d} blocks  {run.comparisons:10d} comparisons  "
+				f"{run.comparisons / run.elapsed:9.0f} /s  {run.clusters:6d} clusters"
+			)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
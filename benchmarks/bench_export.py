@@ -0,0 +1,89 @@
+"""Throughput benchmark for the catalog export formats.
+
+Builds a synthetic SQLite catalog (100k books by default, same generator as
+bench_indexes.py), then streams every registered export format to /dev/null,
+printing books/s, MB/s, output size and peak traced memory per format.
+
+	python benchmarks/bench_export.py --books 100000 --batch-size 1000
+
+Formats needing an optional dependency that is missing (parquet: pyarrow) are
+reported and skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_indexes import populate  # noqa: E402
+from library_tracker.app import create_app  # noqa: E402
+from library_tracker.app.extensions import db  # noqa: E402
+from library_tracker.app.services.import_export import EXPORTERS  # noqa: E402
+
+
+def run(name: str, batch_size: int, books: int, trace: bool) -> None:
+	exp = EXPORTERS[name]
+	if not exp.available:
+		print(f"{exp.label:<12} skipped (pip install {exp.requires})")
+		return
+	if trace:
+		tracemalloc.start()
+	size = 0
+	t0 = time.perf_counter()
+	first = None
+	with open(os.devnull, "wb") as sink:
+		for chunk in exp.stream(batch_size):
+			if first is None:
+				first = time.perf_counter() - t0
+			sink.write(chunk)
+			size += len(chunk)
+	elapsed = time.perf_counter() - t0
+	peak = ""
+	if trace:
+		peak = f"  peak {tracemalloc.get_traced_memory()[1] / 1e6:7.1f} MB"
+		tracemalloc.stop()
+	db.session.remove()
+	print(
+		f"{exp.label:<12} {elapsed:7.2f} s  {books / elapsed:9.0f} books/s  {size / 1e6 / elapsed:7.1f} MB/s  "
+		f"{size / 1e6:8.1f} MB  first byte {first * 1000:6.0f} ms{peak}"
+	)
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--books", type=int, default=100_000)
+	parser.add_argument("--batch-size", type=int, default=1000)
+	parser.add_argument("--db", help="SQLite file to use (default: temporary file)")
+	parser.add_argument("--formats", default=",".join(EXPORTERS), help="Comma-separated formats to run.")
+	parser.add_argument("--trace-memory", action="store_true", help="Report peak Python allocations (slower).")
+	args = parser.parse_args()
+
+	path = Path(args.db) if args.db else Path(tempfile.mkdtemp()) / "bench_export.db"
+	path.unlink(missing_ok=True)
+	app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path.as_posix()}"})
+	with app.app_context():
+		db.create_all()
+		db.engine.dispose()
+
+	import sqlite3
+
+	conn = sqlite3.connect(path)
+	t0 = time.perf_counter()
+	populate(conn, args.books)
+	conn.close()
+	print(f"Populated {args.books} books in {time.perf_counter() - t0:.1f}s ({path})\n")
+
+	with app.app_context():
+		for name in args.formats.split(","):
+			run(name.strip(), args.batch_size, args.books, args.trace_memory)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
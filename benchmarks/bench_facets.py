@@ -0,0 +1,77 @@
+"""Benchmark for the catalog facet counts (genre, editeur, serie, langue, zone).
+
+Builds a synthetic SQLite catalog (same generator as bench_indexes.py), builds
+the facet index, then times `facet_counts` for the unfiltered catalog and for
+filters of decreasing selectivity, printing matching books and milliseconds.
+
+	python benchmarks/bench_facets.py --books 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import select
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_indexes import populate  # noqa: E402
+from library_tracker.app import create_app  # noqa: E402
+from library_tracker.app.extensions import db  # noqa: E402
+from library_tracker.app.models.books import Livre, livre_genre  # noqa: E402
+from library_tracker.app.services.facets import facet_counts, rebuild_facets  # noqa: E402
+
+
+def filters() -> list[tuple[str, object]]:
+	return [
+		("none", None),
+		("editeur_id", select(Livre.id).where(Livre.editeur_id == 7)),
+		("genre_id", select(livre_genre.c.livre_id).where(livre_genre.c.genre_id == 5)),
+		("langue_id", select(Livre.id).where(Livre.langue_id == 3)),
+		("serie_id is set", select(Livre.id).where(Livre.serie_id.is_not(None))),
+	]
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--books", type=int, default=1_000_000)
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--db", help="SQLite file to use (default: temporary file)")
+	args = parser.parse_args()
+
+	path = Path(args.db) if args.db else Path(tempfile.mkdtemp()) / "bench_facets.db"
+	path.unlink(missing_ok=True)
+	app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path.as_posix()}"})
+	with app.app_context():
+		db.create_all()
+		db.engine.dispose()
+
+	conn = sqlite3.connect(path)
+	t0 = time.perf_counter()
+	populate(conn, args.books)
+	conn.close()
+	print(f"Populated {args.books} books in {time.perf_counter() - t0:.1f}s ({path})")
+
+	with app.app_context():
+		t0 = time.perf_counter()
+		rows = rebuild_facets(db.session.connection())
+		db.session.commit()
+		print(f"Facet index built in {time.perf_counter() - t0:.1f}s ({rows} rows)\n")
+
+		for name, stmt in filters():
+			matching = args.books if stmt is None else len(db.session.execute(stmt).all())
+			best = float("inf")
+			for _ in range(args.repeat):
+				t0 = time.perf_counter()
+				facet_counts(stmt)
+				best = min(best, time.perf_counter() - t0)
+			print(f"{name:<16} {matching:9d} books  {best * 1000:9.1f} ms")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
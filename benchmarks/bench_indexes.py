@@ -0,0 +1,176 @@
+"""Query-plan benchmark for the catalog secondary indexes.
+
+Builds a synthetic SQLite catalog (500k books by default), then runs the
+catalog.home sorts/filters and the importer's get-or-create lookups twice:
+once with the secondary indexes dropped and once with them in place, printing
+the EXPLAIN QUERY PLAN and timing of each query.
+
+	python benchmarks/bench_indexes.py --books 500000
+
+Exits non-zero if a query still needs a full table scan once indexed.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.dialects import sqlite as sqlite_dialect
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from library_tracker.app import create_app  # noqa: E402
+from library_tracker.app.extensions import db  # noqa: E402
+from library_tracker.app.models.core import Auteur, Editeur, Genre, Serie, Emplacement  # noqa: E402
+from library_tracker.app.models.books import Livre, LivreAuteur, livre_genre  # noqa: E402
+from library_tracker.app.models.anthologies import Oeuvre, LivreOeuvre  # noqa: E402
+
+
+def populate(conn: sqlite3.Connection, books: int, seed: int = 42) -> None:
+	rnd = random.Random(seed)
+	n_auteurs = max(books // 6, 10)
+	n_editeurs, n_series, n_genres, n_langues, n_emplacements = 2000, 5000, 200, 50, 1000
+	n_oeuvres = max(books // 20, 10)
+	conn.executemany("INSERT INTO auteur (id, nom, prenom) VALUES (?, ?, ?)", ((i, f"Nom{i}", f"Prenom{i % 997}") for i in range(1, n_auteurs + 1)))
+	conn.executemany("INSERT INTO editeur (id, nom) VALUES (?, ?)", ((i, f"Editeur {i}") for i in range(1, n_editeurs + 1)))
+	conn.executemany("INSERT INTO serie (id, nom) VALUES (?, ?)", ((i, f"Serie {i}") for i in range(1, n_series + 1)))
+	conn.executemany("INSERT INTO genre (id, nom) VALUES (?, ?)", ((i, f"Genre {i}") for i in range(1, n_genres + 1)))
+	conn.executemany("INSERT INTO langue (id, nom) VALUES (?, ?)", ((i, f"Langue {i}") for i in range(1, n_langues + 1)))
+	conn.executemany(
+		"INSERT INTO emplacement (id, zone, colonne, etage) VALUES (?, ?, ?, ?)",
+		((i, f"Zone {i % 20}", i % 50, "ABCDEF"[i % 6]) for i in range(1, n_emplacements + 1)),
+	)
+	conn.executemany("INSERT INTO oeuvre (id, titre) VALUES (?, ?)", ((i, f"Oeuvre {i}") for i in range(1, n_oeuvres + 1)))
+	start = datetime(2000, 1, 1)
+	conn.executemany(
+		"INSERT INTO livres (id, titre, editeur_id, langue_id, serie_id, numero_serie, emplacement_id, created_at, updated_at) "
+		"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+		(
+			(
+				i, f"Titre {rnd.randrange(books * 10):08d}", rnd.randint(1, n_editeurs), rnd.randint(1, n_langues),
+				rnd.randint(1, n_series) if i % 3 else None, i % 12 or None, rnd.randint(1, n_emplacements),
+				start + timedelta(minutes=rnd.randrange(books * 10)), start,
+			)
+			for i in range(1, books + 1)
+		),
+	)
+	conn.executemany(
+		"INSERT OR IGNORE INTO livre_auteur (livre_id, auteur_id, role) VALUES (?, ?, ?)",
+		((i, rnd.randint(1, n_auteurs), "auteur") for i in range(1, books + 1) for _ in range(1 + i % 2)),
+	)
+	conn.executemany(
+		"INSERT OR IGNORE INTO livre_genre (livre_id, genre_id) VALUES (?, ?)",
+		((i, rnd.randint(1, n_genres)) for i in range(1, books + 1) for _ in range(1 + i % 2)),
+	)
+	conn.executemany(
+		"INSERT OR IGNORE INTO livre_oeuvre (livre_id, oeuvre_id, ordre) VALUES (?, ?, 1)",
+		((i, rnd.randint(1, n_oeuvres)) for i in range(1, books + 1, 10)),
+	)
+	conn.commit()
+
+
+# Sorted listings legitimately walk an index ("SCAN livres USING INDEX ...") and
+# stop after LIMIT rows; every other query must be a SEARCH.
+ORDERED = {"sort created_at desc", "sort titre asc"}
+
+
+def queries() -> list[tuple[str, object]]:
+	page = 20
+	return [
+		("sort created_at desc", select(Livre.id).order_by(Livre.created_at.desc(), Livre.id.desc()).limit(page)),
+		("sort titre asc", select(Livre.id).order_by(Livre.titre.asc(), Livre.id.asc()).limit(page)),
+		("filter editeur_id", select(Livre.id).where(Livre.editeur_id == 7).order_by(Livre.created_at.desc()).limit(page)),
+		("filter serie_id", select(Livre.id).where(Livre.serie_id == 11)),
+		("filter langue_id", select(Livre.id).where(Livre.langue_id == 3).limit(page)),
+		("filter genre (reverse livre_genre)", select(livre_genre.c.livre_id).where(livre_genre.c.genre_id == 5).limit(page)),
+		("filter auteur (reverse livre_auteur)", select(LivreAuteur.livre_id).where(LivreAuteur.auteur_id == 5)),
+		("filter oeuvre (reverse livre_oeuvre)", select(LivreOeuvre.livre_id).where(LivreOeuvre.oeuvre_id == 5)),
+		(
+			"filter emplacement zone/colonne/etage",
+			select(Livre.id).join(Emplacement, Emplacement.id == Livre.emplacement_id)
+			.where(Emplacement.zone == "Zone 3", Emplacement.colonne == 23, Emplacement.etage == "D"),
+		),
+		("import: livre by titre", select(Livre.id).where(Livre.titre == "Titre 00001234")),
+		("import: editeur by nom", select(Editeur.id).where(Editeur.nom == "Editeur 17")),
+		("import: serie by nom", select(Serie.id).where(Serie.nom == "Serie 17")),
+		("import: genre by nom", select(Genre.id).where(Genre.nom == "Genre 17")),
+		("import: auteur by nom/prenom", select(Auteur.id).where(Auteur.nom == "Nom17", Auteur.prenom == "Prenom17")),
+		("import: oeuvre by titre", select(Oeuvre.id).where(Oeuvre.titre == "Oeuvre 17")),
+	]
+
+
+def _sql(stmt) -> str:
+	return str(stmt.compile(dialect=sqlite_dialect.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def full_scans(name: str, plan: list[str]) -> list[str]:
+	"""Plan lines reading a whole table (or a whole index when no order is needed)."""
+	if name in ORDERED:
+		return [line for line in plan if line.startswith("SCAN ") and " USING " not in line]
+	return [line for line in plan if line.startswith("SCAN ")]
+
+
+def report(conn: sqlite3.Connection, label: str) -> list[str]:
+	print(f"\n=== {label} ===")
+	failures = []
+	for name, stmt in queries():
+		sql = _sql(stmt)
+		plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+		t0 = time.perf_counter()
+		conn.execute(sql).fetchall()
+		elapsed = (time.perf_counter() - t0) * 1000
+		scans = full_scans(name, plan)
+		if scans:
+			failures.append(name)
+		print(f"{name:<40} {elapsed:9.2f} ms  {'SCAN' if scans else 'SEEK'}  | {' / '.join(plan)}")
+	return failures
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--books", type=int, default=500_000)
+	parser.add_argument("--db", help="SQLite file to use (default: temporary file)")
+	args = parser.parse_args()
+
+	path = Path(args.db) if args.db else Path(tempfile.mkdtemp()) / "bench_indexes.db"
+	path.unlink(missing_ok=True)
+	app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path.as_posix()}"})
+	with app.app_context():
+		db.create_all()
+		indexes = [ix for table in db.metadata.sorted_tables for ix in table.indexes]
+		db.engine.dispose()
+
+	conn = sqlite3.connect(path)
+	t0 = time.perf_counter()
+	populate(conn, args.books)
+	print(f"Populated {args.books} books in {time.perf_counter() - t0:.1f}s ({path})")
+
+	for ix in indexes:
+		conn.execute(f"DROP INDEX IF EXISTS {ix.name}")
+	conn.execute("ANALYZE")
+	report(conn, "without secondary indexes")
+
+	with app.app_context():
+		with db.engine.begin() as connection:
+			for ix in indexes:
+				ix.create(connection)
+		db.engine.dispose()
+	conn.execute("ANALYZE")
+	failures = report(conn, "with secondary indexes")
+	conn.close()
+
+	if failures:
+		print(f"\nFull scans remaining: {', '.join(failures)}")
+		return 1
+	print("\nAll queries use index seeks.")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Optional
 
+import click
 from flask import Flask
 
 from .config import Config
@@ -15,6 +17,8 @@ def register_extensions(app: Flask) -> None:
 	login_manager.login_view = "auth.login"
 	login_manager.login_message_category = "info"
 	babel.init_app(app)
+	from .services.cache import init_cache
+	init_cache(app)
 
 
 def register_blueprints(app: Flask) -> None:
@@ -109,22 +113,221 @@ def register_cli(app: Flask) -> None:
 		db.session.commit()
 		print("Demo data inserted.")
 
+	@app.cli.command("search-reindex")
+	def search_reindex() -> None:
+		"""Rebuild the full-text search index from the livres table."""
+		from .services.search import rebuild_index
 
-def create_app() -> Flask:
+		count = rebuild_index(db.session.connection())
+		db.session.commit()
+		print(f"Search index rebuilt ({count} livres).")
+
+	@app.cli.command("duplicates-reindex")
+	def duplicates_reindex() -> None:
+		"""Rebuild the title keys and LSH signatures used by duplicate detection."""
+		from .services.duplicate_check import rebuild_index
+
+		count = rebuild_index(db.session.connection())
+		db.session.commit()
+		print(f"Duplicate index rebuilt ({count} livres).")
+
+	@app.cli.command("facets-reindex")
+	def facets_reindex() -> None:
+		"""Rebuild the per-book facet values and facet counts of the catalog filters."""
+		from .services.facets import rebuild_facets
+
+		count = rebuild_facets(db.session.connection())
+		db.session.commit()
+		print(f"Facet index rebuilt ({count} values).")
+
+	@app.cli.command("summary-rebuild")
+	def summary_rebuild() -> None:
+		"""Re-render the livre_summary read table (catalog list and CSV export columns)."""
+		from .services.summary import rebuild_summary
+
+		count = rebuild_summary(db.session.connection())
+		db.session.commit()
+		print(f"Summary table rebuilt ({count} livres).")
+
+	@app.cli.command("import-csv")
+	@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+	@click.option("--resume/--restart", default=True, help="Continue an unfinished import of the same file.")
+	@click.option("--chunk-size", type=int, default=None, help="Rows per committed chunk.")
+	@click.option("--parse-workers", type=int, default=None, help="Processes parsing rows (default: IMPORT_PARSE_WORKERS).")
+	@click.option("--dry-run", is_flag=True, help="Report created/updated/unchanged/conflicting rows without writing.")
+	def import_csv(path: str, resume: bool, chunk_size: Optional[int], parse_workers: Optional[int], dry_run: bool) -> None:
+		"""Stream a CSV file into the catalog, committing and checkpointing every chunk."""
+		import csv
+
+		from .services.import_diff import diff_books_from_csv
+		from .services.import_export import open_import, run_import
+
+		if dry_run:
+			with open(path, newline="", encoding="utf-8") as fh:
+				diff = diff_books_from_csv(csv.DictReader(fh), sample=20, parse_workers=parse_workers)
+			for row in diff.rows["conflicting"]:
+				print(f"conflict  line {row.line}: {row.titre} ({row.reason})")
+			for row in diff.rows["updated"]:
+				print(f"update    line {row.line}: {row.titre} [{', '.join(row.changes)}]")
+			counts = ", ".join(f"{count} {kind}" for kind, count in diff.counts.items())
+			print(f"Dry run: {counts}, {diff.skipped} skipped ({diff.elapsed:.1f}s). Nothing was written.")
+			return
+
+		run = open_import(str(Path(path).resolve()), resume=resume)
+		if run.position:
+			print(f"Resuming import #{run.id} after row {run.position}.")
+		res = run_import(run, chunk_size=chunk_size, parse_workers=parse_workers)
+		print(
+			f"Import #{run.id}: {res.created} created, {res.updated} updated, {res.skipped} skipped, "
+			f"{len(res.errors)} errors ({res.rows_per_second:.0f} rows/s)."
+		)
+
+	@app.cli.command("export")
+	@click.argument("fmt", metavar="FORMAT")
+	@click.option("-o", "--output", type=click.Path(dir_okay=False, writable=True), help="Output file (default: stdout).")
+	@click.option("--batch-size", type=int, default=None, help="Books fetched per batch.")
+	def export(fmt: str, output: Optional[str], batch_size: Optional[int]) -> None:
+		"""Export the catalog (csv, jsonl, parquet, sqlite)."""
+		import time
+
+		from .services.import_export import EXPORTERS, ExportUnavailable, get_exporter
+
+		if fmt not in EXPORTERS:
+			raise click.BadParameter(f"choose from {', '.join(EXPORTERS)}", param_hint="FORMAT")
+		try:
+			exp = get_exporter(fmt)
+		except ExportUnavailable as exc:
+			raise click.ClickException(str(exc))
+		started = time.perf_counter()
+		size = 0
+		with click.open_file(output or "-", "wb") as fh:
+			for chunk in exp.stream(batch_size):
+				fh.write(chunk)
+				size += len(chunk)
+		elapsed = time.perf_counter() - started
+		click.echo(f"{exp.label}: {size / 1e6:.1f} MB in {elapsed:.1f}s", err=True)
+
+	@app.cli.command("import-worker")
+	@click.option("--once", is_flag=True, help="Exit when the queue is empty.")
+	@click.option("--poll", type=float, default=None, help="Seconds between queue checks.")
+	def import_worker(once: bool, poll: Optional[float]) -> None:
+		"""Process CSV imports queued from the web interface."""
+		from .services.import_jobs import run_worker
+
+		try:
+			count = run_worker(once=once, poll_interval=poll)
+		except KeyboardInterrupt:
+			print("Worker stopped; the current import was re-queued.")
+			return
+		print(f"{count} import(s) processed.")
+
+	@app.cli.command("covers-thumbnails")
+	@click.option("--all", "all_covers", is_flag=True, help="Regenerate every cover, not only those without thumbnails.")
+	def covers_thumbnails(all_covers: bool) -> None:
+		"""Make missing cover thumbnails (e.g. after an upload whose background job was lost)."""
+		from .services.covers import generate_thumbnails, pending_covers
+
+		pending = pending_covers(include_ready=all_covers)
+		done = sum(generate_thumbnails(filename) for filename in pending)
+		print(f"{done}/{len(pending)} cover(s) processed.")
+
+	@app.cli.command("covers-rehash")
+	def covers_rehash() -> None:
+		"""Move covers stored under random names to content-addressed storage."""
+		from .services.covers import generate_thumbnails, pending_covers, rehash_covers
+
+		moved, merged, missing = rehash_covers()
+		print(f"{moved} cover(s) moved ({merged} identical to an existing one), {missing} missing file(s).")
+		pending = pending_covers()
+		done = sum(generate_thumbnails(filename) for filename in pending)
+		print(f"{done}/{len(pending)} cover(s) given thumbnails.")
+
+	@app.cli.command("covers-rebuild")
+	@click.option("--full", is_flag=True, help="Remake every referenced cover, not only those out of date.")
+	@click.option("--workers", type=int, default=None, help="Thumbnail processes (default: one per CPU).")
+	@click.option("--check", is_flag=True, help="Only report, do not make thumbnails.")
+	def covers_rebuild(full: bool, workers: Optional[int], check: bool) -> None:
+		"""Check UPLOAD_FOLDER against the livres and remake out-of-date thumbnails.
+
+		Incremental by default: a cover is redone when one of its THUMB_SIZES x
+		THUMB_FORMATS thumbnails is missing or older than the cover file.
+		"""
+		import os
+		import time
+
+		from .services.covers import audit_covers, rebuild_thumbnails
+
+		audit = audit_covers(full=full)
+		print(f"{audit.files} cover file(s), {len(audit.stale)} to (re)make.")
+		for label, names in (("orphan file(s), used by no livre", audit.orphans), ("missing file(s), referenced by livres", audit.missing)):
+			if names:
+				print(f"{len(names)} {label}:")
+				for name in names[:20]:
+					print(f"  {name}")
+				if len(names) > 20:
+					print(f"  ... and {len(names) - 20} more")
+		if check or not audit.stale:
+			return
+		started = time.perf_counter()
+		done, failed = rebuild_thumbnails(audit.stale, workers=(os.cpu_count() or 1) if workers is None else workers)
+		print(f"{done}/{len(audit.stale)} cover(s) processed in {time.perf_counter() - started:.1f}s, {failed} failure(s).")
+
+	@app.cli.command("dedupe-clusters")
+	@click.argument("kind", type=click.Choice(["livre", "auteur", "all"]), default="all")
+	@click.option("--restart", is_flag=True, help="Start a new run instead of resuming an unfinished one.")
+	@click.option("--min-score", type=float, default=None, help="Pair threshold (default: DUPLICATE_CLUSTER_MIN_SCORE).")
+	@click.option("--workers", type=int, default=None, help="Scoring processes (default: DUPLICATE_CLUSTER_WORKERS).")
+	@click.option("--batch-blocks", type=int, default=2000, help="Candidate blocks per committed batch.")
+	def dedupe_clusters(kind: str, restart: bool, min_score: Optional[float], workers: Optional[int], batch_blocks: int) -> None:
+		"""Cluster likely duplicate books and/or authors into the review tables."""
+		from .services.duplicate_clusters import KINDS, cluster_duplicates
+
+		for k in KINDS if kind == "all" else (kind,):
+			try:
+				run = cluster_duplicates(k, min_score=min_score, workers=workers, batch_blocks=batch_blocks, restart=restart)
+			except KeyboardInterrupt:
+				print(f"{k}: interrupted; run again to resume.")
+				return
+			print(
+				f"{k}: run #{run.id}, {run.clusters} cluster(s) from {run.position} blocks, "
+				f"{run.comparisons} comparisons in {run.elapsed:.1f}s."
+			)
+
+
+def create_app(config_overrides: Optional[dict] = None) -> Flask:
 	app = Flask(__name__, instance_relative_config=True)
 	app.config.from_object(Config())
+	if config_overrides:
+		app.config.update(config_overrides)
 
-	# Ensure directories exist (instance, uploads, thumbs)
-	for p in [app.instance_path, app.config.get("UPLOAD_FOLDER"), app.config.get("THUMB_FOLDER")]:
+	# Ensure directories exist (instance, uploads, thumbs, imports)
+	for p in [app.instance_path, app.config.get("UPLOAD_FOLDER"), app.config.get("THUMB_ROOT"), app.config.get("IMPORT_FOLDER")]:
 		if p:
 			Path(p).mkdir(parents=True, exist_ok=True)
 
 	register_extensions(app)
 	# Ensure models are imported so Alembic sees them
 	from . import models as _models  # noqa: F401
+	# Registers derived-data hooks (full-text index DDL/sync, refs cache invalidation,
+	# duplicate-detection signatures, facet counts, bitmap index change log, list summaries,
+	# page cache version, HTML fragments)
+	from .services import search as _search  # noqa: F401
+	from .services import refdata as _refdata  # noqa: F401
+	from .services import duplicate_check as _duplicate_check  # noqa: F401
+	from .services import facets as _facets  # noqa: F401
+	from .services import bitmap_index as _bitmap_index  # noqa: F401
+	from .services import summary as _summary  # noqa: F401
+	from .services import response_cache as _response_cache  # noqa: F401
+	from .services import fragments as _fragments  # noqa: F401
 	register_blueprints(app)
 	register_cli(app)
 
+	from .services.covers import cover_picture, cover_url
+	from .services.fragments import cached_fragment
+	app.add_template_global(cover_url)
+	app.add_template_global(cover_picture)
+	app.add_template_global(cached_fragment)
+
 	@app.route("/health")
 	def health() -> str:
 		return "ok"
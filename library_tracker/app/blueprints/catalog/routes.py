@@ -1,86 +1,166 @@
 from __future__ import annotations
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for, current_app, Response
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for, current_app, Response, stream_with_context
 from flask_login import login_required
 
 from ...extensions import db
 from ...models.books import Livre, LivreAuteur
-from ...models.core import Editeur, Langue, Serie, Emplacement, Auteur, Genre
+from ...models.core import Emplacement, Auteur, Genre
 from ...models.anthologies import Oeuvre, LivreOeuvre
+from ...models.imports import ImportRun
+from ...services.bitmap_index import catalog_match
 from ...services.duplicate_check import find_potential_duplicates
-from ...services.images import save_image_and_thumbnail, is_allowed_image, delete_cover_files
-from ...services.import_export import import_books_from_csv
+from ...services.facets import FACETS, facet_counts
+from ...services.fragments import get_fragments
+from ...services.covers import cover_variants, release_cover, schedule_thumbnails, set_cover
+from ...services.images import save_cover, is_allowed_image
+from ...services.import_export import (
+	EXPORTERS,
+	ExportUnavailable,
+	get_exporter,
+	open_import,
+	run_import,
+	run_result,
+	store_import_file,
+)
+from ...services.import_diff import diff_books_from_csv
+from ...services.import_jobs import enqueue_import, job_status
+from ...services.loading import loader_options
+from ...services.pagination import SORT_KEYS, approximate_count, keyset_paginate, order_by_sort
+from ...services.refdata import get_all_refs, get_refs
+from ...services.response_cache import cached_page
+from ...services.search import match_subquery
+from ...services.summary import summaries_for
 
 bp = Blueprint("catalog", __name__, template_folder="../../templates/catalog")
 
 
 @bp.get("/")
 @login_required
+@cached_page
 def home():
 	q = db.session.query(Livre)
 	search = request.args.get("q", "").strip()
 	genre_id = request.args.get("genre_id")
 	editeur_id = request.args.get("editeur_id")
 	serie_id = request.args.get("serie_id")
+	langue_id = request.args.get("langue_id")
 	author_q = request.args.get("author", "").strip()
 	zone = request.args.get("zone", "").strip()
 	colonne = request.args.get("colonne", "").strip()
 	etage = request.args.get("etage", "").strip()
-	sort = request.args.get("sort", "created_desc")
+	sort = request.args.get("sort") or ("relevance" if search or author_q else "created_desc")
 	page = max(int(request.args.get("page", 1)), 1)
 	per_page = 20
 
-	if search:
+	match = match_subquery(q=search, author=author_q)
+	if match is not None:
+		q = q.join(match, match.c.livre_id == Livre.id)
+	elif search:
 		q = q.filter(Livre.titre.ilike(f"%{search}%"))
-	if genre_id:
-		q = q.join(Livre.genres).filter(Genre.id == int(genre_id))
-	if editeur_id:
-		q = q.filter(Livre.editeur_id == int(editeur_id))
-	if serie_id:
-		q = q.filter(Livre.serie_id == int(serie_id))
-	if author_q:
+	if author_q and match is None:
 		q = q.join(Livre.livre_auteurs).join(Auteur).filter((Auteur.nom.ilike(f"%{author_q}%")) | (Auteur.prenom.ilike(f"%{author_q}%")))
-	if zone:
-		q = q.join(Emplacement).filter(Emplacement.zone.ilike(f"%{zone}%"))
-	if colonne and colonne.isdigit():
-		q = q.join(Emplacement).filter(Emplacement.colonne == int(colonne))
-	if etage:
-		q = q.join(Emplacement).filter(Emplacement.etage == etage)
-
-	# sorting
-	if sort == "title_asc":
-		q = q.order_by(Livre.titre.asc())
-	elif sort == "title_desc":
-		q = q.order_by(Livre.titre.desc())
-	elif sort == "created_asc":
-		q = q.order_by(Livre.created_at.asc())
-	else:
-		q = q.order_by(Livre.created_at.desc())
-
-	# count total (distinct if joins)
-	total = q.distinct(Livre.id).count()
-	livres = q.offset((page - 1) * per_page).limit(per_page).all()
-	pages = (total + per_page - 1) // per_page
+	colonne = colonne if colonne.isdigit() else ""
 
-	# pagination urls
+	# shelf filters: a small match of the bitmap index (BITMAP_INDEX) is fetched by id
+	indexed = catalog_match(
+		genre_id=int(genre_id) if genre_id else None,
+		editeur_id=int(editeur_id) if editeur_id else None,
+		serie_id=int(serie_id) if serie_id else None,
+		langue_id=int(langue_id) if langue_id else None,
+		zone=zone,
+		colonne=int(colonne) if colonne else None,
+		etage=etage,
+	)
+	if indexed is not None and indexed.count <= current_app.config["BITMAP_MAX_IDS"]:
+		q = q.filter(Livre.id.in_(indexed.ids()))
+	else:
+		if genre_id:
+			q = q.join(Livre.genres).filter(Genre.id == int(genre_id))
+		if editeur_id:
+			q = q.filter(Livre.editeur_id == int(editeur_id))
+		if serie_id:
+			q = q.filter(Livre.serie_id == int(serie_id))
+		if langue_id:
+			q = q.filter(Livre.langue_id == int(langue_id))
+		if zone or colonne or etage:
+			# one join for all location filters
+			q = q.join(Emplacement)
+		if zone:
+			q = q.filter(Emplacement.zone.ilike(f"%{zone}%"))
+		if colonne:
+			q = q.filter(Emplacement.colonne == int(colonne))
+		if etage:
+			q = q.filter(Emplacement.etage == etage)
+	# exact count known without a query
+	known_total = indexed.count if indexed is not None and not (search or author_q) else None
+	filtered = any((search, genre_id, editeur_id, serie_id, langue_id, author_q, zone, colonne, etage))
+
+	# pagination: keyset (cursor) by default, offset for relevance or explicit ?page=
 	params = request.args.to_dict(flat=True)
-	params.pop("page", None)
-	prev_url = url_for("catalog.home", **params, page=page - 1) if page > 1 else None
-	next_url = url_for("catalog.home", **params, page=page + 1) if page < pages else None
+	for key in ("page", "after", "before"):
+		params.pop(key, None)
+	keyset = (
+		current_app.config["CATALOG_PAGINATION"] == "keyset"
+		and sort in SORT_KEYS
+		and "page" not in request.args
+	)
+	if keyset:
+		result = keyset_paginate(
+			q, sort, after=request.args.get("after"), before=request.args.get("before"), per_page=per_page,
+		)
+		livres = result.items
+		if known_total is not None:
+			total, total_exact = known_total, True
+		else:
+			total, total_exact = approximate_count(q, current_app.config["CATALOG_COUNT_CAP"])
+		pages = None
+		prev_url = url_for("catalog.home", **params, before=result.prev_cursor) if result.prev_cursor else None
+		next_url = url_for("catalog.home", **params, after=result.next_cursor) if result.next_cursor else None
+	else:
+		if sort == "relevance" and match is not None:
+			ordered = q.order_by(match.c.rank.asc(), Livre.id.desc())
+		else:
+			ordered = order_by_sort(q, sort)
+		total, total_exact = (q.count() if known_total is None else known_total), True
+		livres = ordered.offset((page - 1) * per_page).limit(per_page).all()
+		pages = (total + per_page - 1) // per_page
+		prev_url = url_for("catalog.home", **params, page=page - 1) if page > 1 else None
+		next_url = url_for("catalog.home", **params, page=page + 1) if page < pages else None
+
+	facets = facet_counts(q.with_entities(Livre.id).scalar_subquery() if filtered else None)
+	for facet, values in facets.items():
+		param = FACETS[facet][0]
+		selected = request.args.get(param, "")
+		for v in values:
+			v.selected = v.value == selected
+			v.url = url_for(
+				"catalog.home",
+				**({k: a for k, a in params.items() if k != param} if v.selected else {**params, param: v.value}),
+			)
+
+	# rows rendered earlier are reused; only the others read summaries and covers
+	rows = get_fragments("row", livres)
+	missing = [l for l in livres if l.id not in rows]
 
-	genres = db.session.query(Genre).order_by(Genre.nom).all()
-	editeurs = db.session.query(Editeur).order_by(Editeur.nom).all()
-	series = db.session.query(Serie).order_by(Serie.nom).all()
 	return render_template(
 		"catalog/home.html",
 		livres=livres,
+		rows=rows,
+		# display columns come from livre_summary, read once for the page
+		summaries=summaries_for(l.id for l in missing),
+		facets=facets,
+		covers=cover_variants(l.lien_couverture for l in missing if l.couverture_prete),
 		search=search,
-		genres=genres,
-		editeurs=editeurs,
-		series=series,
+		genres=get_refs("genres"),
+		editeurs=get_refs("editeurs"),
+		series=get_refs("series"),
+		langues=get_refs("langues"),
+		exporters=[e for e in EXPORTERS.values() if e.available and e.name != "csv"],
 		selected_genre=genre_id,
 		selected_editeur=editeur_id,
 		selected_serie=serie_id,
+		selected_langue=langue_id,
 		author_q=author_q,
 		zone=zone,
 		colonne=colonne,
@@ -89,6 +169,7 @@ def home():
 		page=page,
 		pages=pages,
 		total=total,
+		total_exact=total_exact,
 		prev_url=prev_url,
 		next_url=next_url,
 	)
@@ -107,26 +188,48 @@ def import_upload():
 	if not file or not file.filename:
 		flash("Veuillez sélectionner un fichier CSV.", "error")
 		return redirect(url_for("catalog.import_form"))
-	# read CSV
-	import csv
-	from io import TextIOWrapper
+	if request.form.get("dry_run"):
+		import csv
+		from io import TextIOWrapper
+
+		diff = diff_books_from_csv(csv.DictReader(TextIOWrapper(file.stream, encoding="utf-8")))
+		return render_template("catalog/import_diff.html", diff=diff, filename=file.filename)
+	# stored by content hash: uploading the same file again resumes an interrupted import
+	if current_app.config["IMPORT_BACKGROUND"]:
+		run = enqueue_import(file.stream, file.filename)
+	else:
+		run = open_import(store_import_file(file.stream), file.filename)
+		try:
+			run_import(run)
+		except Exception:
+			current_app.logger.exception("Import #%s failed", run.id)
+	return redirect(url_for("catalog.import_run", run_id=run.id))
+
+
+@bp.get("/import/<int:run_id>")
+@login_required
+def import_run(run_id: int):
+	run = db.session.get(ImportRun, run_id)
+	if not run:
+		flash("Import introuvable.", "error")
+		return redirect(url_for("catalog.import_form"))
+	return render_template("catalog/import_result.html", run=run, result=run_result(run))
 
-	stream = TextIOWrapper(file.stream, encoding="utf-8")
-	reader = csv.DictReader(stream)
-	res = import_books_from_csv(reader)
-	return render_template("catalog/import_result.html", result=res)
+
+@bp.get("/import/<int:run_id>/status")
+@login_required
+def import_status(run_id: int):
+	run = db.get_or_404(ImportRun, run_id)
+	response = jsonify(job_status(run))
+	response.headers["Cache-Control"] = "no-store"
+	return response
 
 
 @bp.get("/livres/nouveau")
 @login_required
 def livre_new():
-	editeurs = db.session.query(Editeur).order_by(Editeur.nom).all()
-	langues = db.session.query(Langue).order_by(Langue.nom).all()
-	series = db.session.query(Serie).order_by(Serie.nom).all()
-	emplacements = db.session.query(Emplacement).order_by(Emplacement.zone, Emplacement.colonne, Emplacement.etage).all()
-	genres = db.session.query(Genre).order_by(Genre.nom).all()
-	auteurs = db.session.query(Auteur).order_by(Auteur.nom, Auteur.prenom).all()
-	return render_template("catalog/livre_form.html", editeurs=editeurs, langues=langues, series=series, emplacements=emplacements, genres=genres, auteurs=auteurs)
+	refs = get_all_refs("editeurs", "langues", "series", "emplacements", "genres")
+	return render_template("catalog/livre_form.html", **refs)
 
 
 def _apply_relations_from_form(livre: Livre) -> None:
@@ -178,6 +281,11 @@ def _apply_relations_from_form(livre: Livre) -> None:
 		livre.livre_oeuvres.append(le)
 
 
+def _duplicates_message(dups: list[Livre]) -> str:
+	titres = ", ".join(f"« {d.titre} »" for d in dups[:3])
+	return f"Attention: des livres similaires existent déjà ({titres})."
+
+
 @bp.post("/livres")
 @login_required
 def livre_create():
@@ -193,22 +301,20 @@ def livre_create():
 		flash("Le titre est requis.", "error")
 		return redirect(url_for("catalog.livre_new"))
 
-	dups = find_potential_duplicates(titre)
+	dups = find_potential_duplicates(titre, request.form.getlist("author_id[]"), editeur_id)
 	if dups:
-		flash("Attention: des livres similaires existent déjà.", "warning")
+		flash(_duplicates_message(dups), "warning")
 
 	lien_couverture = None
 	if file and file.filename:
 		if not is_allowed_image(file.filename, set(current_app.config["ALLOWED_IMAGE_EXTENSIONS"])):
 			flash("Format d'image non autorisé.", "error")
 			return redirect(url_for("catalog.livre_new"))
-		name, _thumb = save_image_and_thumbnail(
+		lien_couverture = save_cover(
 			file_storage=file,
 			upload_dir=current_app.config["UPLOAD_FOLDER"],
-			thumb_dir=current_app.config["THUMB_FOLDER"],
 			allowed_ext=set(current_app.config["ALLOWED_IMAGE_EXTENSIONS"]),
 		)
-		lien_couverture = name
 
 	livre = Livre(
 		titre=titre,
@@ -217,27 +323,32 @@ def livre_create():
 		serie_id=int(serie_id) if serie_id else None,
 		numero_serie=int(numero_serie) if numero_serie else None,
 		emplacement_id=int(emplacement_id) if emplacement_id else None,
-		lien_couverture=lien_couverture,
 	)
+	needs_thumbnails = set_cover(livre, lien_couverture, file.read() if lien_couverture else None)
 
 	# relations
 	_apply_relations_from_form(livre)
 
 	db.session.add(livre)
 	db.session.commit()
+	if needs_thumbnails:
+		schedule_thumbnails(lien_couverture)
 	flash("Livre créé.", "success")
 	return redirect(url_for("catalog.detail", livre_id=livre.id))
 
 
 @bp.get("/livres/<int:livre_id>")
 @login_required
+@cached_page
 def detail(livre_id: int):
 	livre = db.session.get(Livre, livre_id)
 	if not livre:
 		flash("Livre introuvable.", "error")
 		return redirect(url_for("catalog.home"))
-	auteurs = db.session.query(Auteur).order_by(Auteur.nom, Auteur.prenom).all()
-	return render_template("catalog/livre_detail.html", livre=livre, auteurs=auteurs)
+	fragments = get_fragments("detail", [livre])
+	if not fragments:
+		db.session.get(Livre, livre_id, options=loader_options("detail"), populate_existing=True)
+	return render_template("catalog/livre_detail.html", livre=livre, fragments=fragments)
 
 
 @bp.post("/livres/<int:livre_id>/authors")
@@ -265,17 +376,12 @@ def update_authors(livre_id: int):
 @bp.get("/livres/<int:livre_id>/edit")
 @login_required
 def edit(livre_id: int):
-	livre = db.session.get(Livre, livre_id)
+	livre = db.session.get(Livre, livre_id, options=loader_options("detail"))
 	if not livre:
 		flash("Livre introuvable.", "error")
 		return redirect(url_for("catalog.home"))
-	editeurs = db.session.query(Editeur).order_by(Editeur.nom).all()
-	langues = db.session.query(Langue).order_by(Langue.nom).all()
-	series = db.session.query(Serie).order_by(Serie.nom).all()
-	emplacements = db.session.query(Emplacement).order_by(Emplacement.zone, Emplacement.colonne, Emplacement.etage).all()
-	genres = db.session.query(Genre).order_by(Genre.nom).all()
-	auteurs = db.session.query(Auteur).order_by(Auteur.nom, Auteur.prenom).all()
-	return render_template("catalog/livre_edit.html", livre=livre, editeurs=editeurs, langues=langues, series=series, emplacements=emplacements, genres=genres, auteurs=auteurs)
+	refs = get_all_refs("editeurs", "langues", "series", "emplacements", "genres")
+	return render_template("catalog/livre_edit.html", livre=livre, **refs)
 
 
 @bp.post("/livres/<int:livre_id>")
@@ -291,9 +397,10 @@ def update(livre_id: int):
 		flash("Le titre est requis.", "error")
 		return redirect(url_for("catalog.edit", livre_id=livre.id))
 	if titre != livre.titre:
-		dups = [d for d in find_potential_duplicates(titre) if d.id != livre.id]
+		auteur_ids = request.form.getlist("author_id[]") or [la.auteur_id for la in livre.livre_auteurs]
+		dups = find_potential_duplicates(titre, auteur_ids, request.form.get("editeur_id") or None, exclude_id=livre.id)
 		if dups:
-			flash("Attention: des livres similaires existent déjà.", "warning")
+			flash(_duplicates_message(dups), "warning")
 
 	livre.titre = titre
 	livre.editeur_id = int(request.form.get("editeur_id")) if request.form.get("editeur_id") else None
@@ -305,23 +412,24 @@ def update(livre_id: int):
 
 	# cover replace optionally
 	file = request.files.get("cover")
+	needs_thumbnails = False
 	if file and file.filename:
 		if not is_allowed_image(file.filename, set(current_app.config["ALLOWED_IMAGE_EXTENSIONS"])):
 			flash("Format d'image non autorisé.", "error")
 			return redirect(url_for("catalog.edit", livre_id=livre.id))
-		name, _thumb = save_image_and_thumbnail(
+		lien_couverture = save_cover(
 			file_storage=file,
 			upload_dir=current_app.config["UPLOAD_FOLDER"],
-			thumb_dir=current_app.config["THUMB_FOLDER"],
 			allowed_ext=set(current_app.config["ALLOWED_IMAGE_EXTENSIONS"]),
 		)
-		# delete old files
-		delete_cover_files(livre.lien_couverture, current_app.config["UPLOAD_FOLDER"], current_app.config["THUMB_FOLDER"])
-		livre.lien_couverture = name
+		# the previous cover's files go when no other livre uses them
+		needs_thumbnails = set_cover(livre, lien_couverture, file.read())
 
 	_apply_relations_from_form(livre)
 
 	db.session.commit()
+	if needs_thumbnails:
+		schedule_thumbnails(livre.lien_couverture)
 	flash("Livre mis à jour.", "success")
 	return redirect(url_for("catalog.detail", livre_id=livre.id))
 
@@ -331,8 +439,8 @@ def update(livre_id: int):
 def delete(livre_id: int):
 	livre = db.session.get(Livre, livre_id)
 	if livre:
-		# delete files first
-		delete_cover_files(livre.lien_couverture, current_app.config["UPLOAD_FOLDER"], current_app.config["THUMB_FOLDER"])
+		# files go with the last livre using them
+		release_cover(livre.lien_couverture)
 		db.session.delete(livre)
 		db.session.commit()
 		flash("Livre supprimé.", "info")
@@ -342,24 +450,23 @@ def delete(livre_id: int):
 @bp.get("/export.csv")
 @login_required
 def export_csv() -> Response:
-	import csv
-	from io import StringIO
-
-	output = StringIO()
-	writer = csv.writer(output)
-	writer.writerow([
-		"id", "titre", "editeur", "langue", "serie", "numero_serie", "emplacement",
-		"auteurs", "genres", "oeuvres",
-	])
-	for l in db.session.query(Livre).order_by(Livre.id):
-		auteurs = "; ".join([f"{la.auteur.prenom or ''} {la.auteur.nom}{f' ({la.role})' if la.role else ''}".strip() for la in l.livre_auteurs])
-		genres = ", ".join([g.nom for g in l.genres])
-		oeuvres = "; ".join([f"{lo.ordre or ''} {lo.oeuvre.titre}{f' ({lo.pages})' if lo.pages else ''}".strip() for lo in sorted(l.livre_oeuvres, key=lambda x: (x.ordre or 0))])
-		editeur = l.editeur.nom if l.editeur else ""
-		langue = l.langue.nom if l.langue else ""
-		serie = l.serie.nom if l.serie else ""
-		emplacement = f"{l.emplacement.zone or ''} C{l.emplacement.colonne} E{l.emplacement.etage}" if l.emplacement else ""
-		writer.writerow([l.id, l.titre, editeur, langue, serie, l.numero_serie or "", emplacement, auteurs, genres, oeuvres])
-
-	output.seek(0)
-	return Response(output.read(), mimetype="text/csv", headers={"Content-Disposition": "attachment; filename=livres.csv"})
+	return export("csv")
+
+
+@bp.get("/export/<fmt>")
+@login_required
+def export(fmt: str) -> Response:
+	# streamed: bytes go out as soon as the first batch is serialised
+	try:
+		exp = get_exporter(fmt)
+	except KeyError:
+		flash("Format d'export inconnu.", "error")
+		return redirect(url_for("catalog.home"))
+	except ExportUnavailable as exc:
+		flash(str(exc), "error")
+		return redirect(url_for("catalog.home"))
+	return Response(
+		stream_with_context(exp.stream()),
+		mimetype=exp.mimetype,
+		headers={"Content-Disposition": f"attachment; filename=livres.{exp.extension}"},
+	)
@@ -1,10 +1,69 @@
 from __future__ import annotations
 
-from flask import Blueprint
+import mimetypes
+from pathlib import Path
+from typing import Optional
+
+from flask import Blueprint, Response, abort, current_app, request
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+from ...services.covers import cover_etag, thumbnail_file
 
 bp = Blueprint("files", __name__)
 
+# content-addressed URLs never change content; legacy names get a day
+IMMUTABLE = "public, max-age=31536000, immutable"
+LEGACY_CACHE = "public, max-age=86400"
+
+
+def _send(path: Path, accel_path: str, etag: Optional[str]) -> Response:
+	"""Send a cover file with its caching headers.
+
+	If-None-Match/If-Modified-Since answer 304 and Range requests 206 (Werkzeug
+	conditional responses). With COVER_SENDFILE the body is left to the front
+	server, which also handles ranges.
+	"""
+	mode = current_app.config["COVER_SENDFILE"]
+	if mode == "x-accel-redirect":
+		response = Response(mimetype=mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+		response.headers["X-Accel-Redirect"] = current_app.config["COVER_ACCEL_PREFIX"] + accel_path
+		if etag:
+			response.set_etag(etag)
+		response.last_modified = path.stat().st_mtime
+		response.make_conditional(request)
+		if response.status_code == 304:
+			del response.headers["X-Accel-Redirect"]
+	else:
+		response = send_file(
+			path,
+			request.environ,
+			conditional=True,
+			etag=etag or True,
+			max_age=None,
+			use_x_sendfile=mode == "x-sendfile",
+			response_class=current_app.response_class,
+		)
+	response.headers["Cache-Control"] = IMMUTABLE if etag else LEGACY_CACHE
+	return response
+
+
+@bp.get("/covers/<path:filename>")
+def cover(filename: str):
+	"""Original cover file."""
+	path = safe_join(current_app.config["UPLOAD_FOLDER"], filename)
+	if path is None or not Path(path).is_file():
+		abort(404)
+	return _send(Path(path), f"covers/{filename}", cover_etag(filename))
+
 
-@bp.get("/")
-def files_home():
-	return "Files"
+@bp.get("/thumbs/<int:size>/<path:filename>")
+def thumbnail(size: int, filename: str):
+	"""Thumbnail of a cover (`filename` with another extension: that format), made on demand if missing."""
+	if safe_join(current_app.config["UPLOAD_FOLDER"], filename) is None:
+		abort(404)
+	path = thumbnail_file(size, filename)
+	if path is None:
+		abort(404)
+	prefix = "thumbs" if path.is_relative_to(current_app.config["THUMB_ROOT"]) else "cache"
+	return _send(path, f"{prefix}/{size}/{filename}", cover_etag(filename, size))
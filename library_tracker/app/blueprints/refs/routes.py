@@ -1,17 +1,22 @@
 from __future__ import annotations
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import login_required
 
 from ...extensions import db
 from ...models.core import Auteur, Editeur, Langue, Genre, Serie, Emplacement
 from ...services.authz import require_roles
+from ...services.cache import get_cache
+from ...services.refdata import refs_version
+from ...services.response_cache import cached_page
+from ...services.search import fold, search_auteurs
 
 bp = Blueprint("refs", __name__, template_folder="../../templates/refs")
 
 
 @bp.get("/")
 @login_required
+@cached_page
 def refs_home():
 	return render_template("refs/home.html")
 
@@ -19,11 +24,36 @@ def refs_home():
 # AUTEURS
 @bp.get("/auteurs")
 @login_required
+@cached_page
 def auteurs_list():
 	items = db.session.query(Auteur).order_by(Auteur.nom, Auteur.prenom).all()
 	return render_template("refs/auteurs.html", items=items)
 
 
+@bp.get("/auteurs/search")
+@login_required
+def auteurs_search():
+	"""JSON typeahead for author pickers: ?q=<prefix>&limit=<n>."""
+	term = request.args.get("q", "").strip()
+	limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+	if len(term) < 1:
+		return jsonify([])
+	cache = get_cache()
+	# keyed on the refs version so new/renamed authors show up immediately
+	key = f"auteurs:search:{refs_version()}:{limit}:{fold(term)}"
+	items = cache.get(key)
+	if items is None:
+		items = [
+			{"id": a["id"], "label": " ".join(p for p in (a["prenom"], a["nom"]) if p), "alias": a["alias"]}
+			for a in search_auteurs(term, limit=limit)
+		]
+		cache.set(key, items, ttl=current_app.config["AUTHOR_SEARCH_TTL"])
+	response = jsonify(items)
+	response.cache_control.private = True
+	response.cache_control.max_age = current_app.config["AUTHOR_SEARCH_TTL"]
+	return response
+
+
 @bp.post("/auteurs")
 @require_roles("admin", "editeur")
 def auteurs_create():
@@ -54,6 +84,7 @@ def auteurs_delete(item_id: int):
 # EDITEURS
 @bp.get("/editeurs")
 @login_required
+@cached_page
 def editeurs_list():
 	items = db.session.query(Editeur).order_by(Editeur.nom).all()
 	return render_template("refs/editeurs.html", items=items)
@@ -87,6 +118,7 @@ def editeurs_delete(item_id: int):
 # LANGUES
 @bp.get("/langues")
 @login_required
+@cached_page
 def langues_list():
 	items = db.session.query(Langue).order_by(Langue.nom).all()
 	return render_template("refs/langues.html", items=items)
@@ -120,6 +152,7 @@ def langues_delete(item_id: int):
 # GENRES
 @bp.get("/genres")
 @login_required
+@cached_page
 def genres_list():
 	items = db.session.query(Genre).order_by(Genre.nom).all()
 	return render_template("refs/genres.html", items=items)
@@ -153,6 +186,7 @@ def genres_delete(item_id: int):
 # SERIES
 @bp.get("/series")
 @login_required
+@cached_page
 def series_list():
 	items = db.session.query(Serie).order_by(Serie.nom).all()
 	return render_template("refs/series.html", items=items)
@@ -186,6 +220,7 @@ def series_delete(item_id: int):
 # EMPLACEMENTS
 @bp.get("/emplacements")
 @login_required
+@cached_page
 def emplacements_list():
 	items = db.session.query(Emplacement).order_by(Emplacement.zone, Emplacement.colonne, Emplacement.etage).all()
 	return render_template("refs/emplacements.html", items=items)
@@ -18,10 +18,82 @@ class Config:
 	# Uploads
 	STATIC_DIR = BASE_DIR / "library_tracker" / "app" / "static"
 	UPLOAD_FOLDER = (STATIC_DIR / "uploads" / "covers").as_posix()
-	THUMB_FOLDER = (STATIC_DIR / "thumbs" / "256").as_posix()
+	# thumbnails in THUMB_ROOT/<size>/, one per size (longest side, px)
+	THUMB_ROOT = (STATIC_DIR / "thumbs").as_posix()
+	THUMB_SIZES = tuple(int(s) for s in os.getenv("THUMB_SIZES", "64,128,256,512").split(","))
+	# extra thumbnail formats written next to the cover's own (skipped when Pillow
+	# cannot encode them; AVIF needs Pillow >= 11.3 or pillow-avif-plugin)
+	THUMB_FORMATS = tuple(f for f in os.getenv("THUMB_FORMATS", "avif,webp").split(",") if f)
+	# threads making thumbnails after the request has returned (0: within the request)
+	THUMB_WORKERS = int(os.getenv("THUMB_WORKERS", "2"))
+	# /files/thumbs/<size>/...: other sizes (multiples of 16 up to COVER_MAX_SIZE)
+	# and formats are rendered on demand into COVER_CACHE_FOLDER, capped at
+	# COVER_CACHE_MAX_FILES files (oldest removed first)
+	COVER_MAX_SIZE = int(os.getenv("COVER_MAX_SIZE", "1024"))
+	COVER_CACHE_FOLDER = os.getenv("COVER_CACHE_FOLDER", (INSTANCE_PATH / "cover_cache").as_posix())
+	COVER_CACHE_MAX_FILES = int(os.getenv("COVER_CACHE_MAX_FILES", "5000"))
+	# cover delivery by the front server: "" (Flask sends the file), "x-sendfile"
+	# (Apache mod_xsendfile, lighttpd) or "x-accel-redirect" (nginx, internal
+	# locations under COVER_ACCEL_PREFIX: covers/, thumbs/ and cache/)
+	COVER_SENDFILE = os.getenv("COVER_SENDFILE", "")
+	COVER_ACCEL_PREFIX = os.getenv("COVER_ACCEL_PREFIX", "/_protected/")
 	MAX_CONTENT_LENGTH = 15 * 1024 * 1024  # 15 MB
 	ALLOWED_IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
 
+	# Catalog listing: "keyset" (cursor) or "offset" pagination; result counts
+	# stop at CATALOG_COUNT_CAP and are then displayed as approximate ("N+").
+	CATALOG_PAGINATION = os.getenv("CATALOG_PAGINATION", "keyset")
+	CATALOG_COUNT_CAP = int(os.getenv("CATALOG_COUNT_CAP", "10000"))
+	# values listed per facet (genre, editeur, serie, langue, zone), most frequent first
+	FACET_LIMIT = int(os.getenv("FACET_LIMIT", "10"))
+	# In-memory bitmap index of the catalog filters (per worker, built on first
+	# use): matches of up to BITMAP_MAX_IDS books are fetched by id. Writes are
+	# logged in livre_change (last BITMAP_CHANGE_KEEP rows) for the other workers.
+	BITMAP_INDEX = os.getenv("BITMAP_INDEX", "0") == "1"
+	BITMAP_MAX_IDS = int(os.getenv("BITMAP_MAX_IDS", "2000"))
+	BITMAP_CHANGE_KEEP = int(os.getenv("BITMAP_CHANGE_KEEP", "100000"))
+
+	# Cache: "memory" (per-process LRU) or "sqlite" (file shared by all workers)
+	CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+	CACHE_PATH = os.getenv("CACHE_PATH", (INSTANCE_PATH / "cache.db").as_posix())
+	CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+	# Reference lists (filters, forms): invalidated by the refs version stamp,
+	# kept at most this many seconds as a safety net
+	REFS_CACHE_TTL = int(os.getenv("REFS_CACHE_TTL", "300"))
+
+	# Rendered catalog, detail and refs pages, cached per catalog version and
+	# user roles in the cache above (any write bumps the version); seconds kept
+	RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "1") == "1"
+	RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+	# Rendered catalog rows and detail pages per book (kept across other books'
+	# writes, dropped when the book or a row it references changes); seconds kept
+	FRAGMENT_CACHE = os.getenv("FRAGMENT_CACHE", "1") == "1"
+	FRAGMENT_CACHE_TTL = int(os.getenv("FRAGMENT_CACHE_TTL", "86400"))
+
+	# Author typeahead responses (seconds)
+	AUTHOR_SEARCH_TTL = int(os.getenv("AUTHOR_SEARCH_TTL", "30"))
+
+	# CSV import: rows written per bulk INSERT/UPDATE batch
+	IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+	# processes parsing CSV rows ahead of the database writer (0/1: inline)
+	IMPORT_PARSE_WORKERS = int(os.getenv("IMPORT_PARSE_WORKERS", "0"))
+	# uploaded CSV files, kept so interrupted imports can resume
+	IMPORT_FOLDER = os.getenv("IMPORT_FOLDER", (INSTANCE_PATH / "imports").as_posix())
+	# uploads are queued for `flask import-worker` (0: imported within the request)
+	IMPORT_BACKGROUND = os.getenv("IMPORT_BACKGROUND", "1") == "1"
+	IMPORT_WORKER_POLL = float(os.getenv("IMPORT_WORKER_POLL", "2"))
+	# a running import without checkpoint for this long (seconds) is taken over
+	IMPORT_JOB_TIMEOUT = int(os.getenv("IMPORT_JOB_TIMEOUT", "600"))
+	# duplicate warnings: minimum score (0..1) and LSH candidates scored per lookup
+	DUPLICATE_MIN_SCORE = float(os.getenv("DUPLICATE_MIN_SCORE", "0.5"))
+	DUPLICATE_MAX_CANDIDATES = int(os.getenv("DUPLICATE_MAX_CANDIDATES", "200"))
+	# catalog-wide clustering (flask dedupe-clusters): stricter threshold, since
+	# clusters chain pairs together; processes scoring candidate blocks (0/1: inline)
+	DUPLICATE_CLUSTER_MIN_SCORE = float(os.getenv("DUPLICATE_CLUSTER_MIN_SCORE", "0.7"))
+	DUPLICATE_CLUSTER_WORKERS = int(os.getenv("DUPLICATE_CLUSTER_WORKERS", "0"))
+	# exports: books fetched (and serialised) per batch
+	EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
 	# i18n
 	BABEL_DEFAULT_LOCALE = os.getenv("BABEL_DEFAULT_LOCALE", "fr")
 	BABEL_DEFAULT_TIMEZONE = os.getenv("BABEL_DEFAULT_TIMEZONE", "Europe/Paris")
@@ -32,6 +104,6 @@ class Config:
 
 	def __call__(self) -> "Config":
 		# ensure folders exist
-		for path in [self.INSTANCE_PATH, Path(self.UPLOAD_FOLDER), Path(self.THUMB_FOLDER)]:
+		for path in [self.INSTANCE_PATH, Path(self.UPLOAD_FOLDER), Path(self.THUMB_ROOT), Path(self.COVER_CACHE_FOLDER)]:
 			path.mkdir(parents=True, exist_ok=True)
 		return self
@@ -5,3 +5,9 @@ from . import core  # noqa: F401
 from . import books  # noqa: F401
 from . import anthologies  # noqa: F401
 from . import auth  # noqa: F401
+from . import imports  # noqa: F401
+from . import dedup  # noqa: F401
+from . import covers  # noqa: F401
+from . import facets  # noqa: F401
+from . import summary  # noqa: F401
+from . import cache  # noqa: F401
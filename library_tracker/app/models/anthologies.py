@@ -8,7 +8,7 @@ from ..extensions import db
 class Oeuvre(db.Model):
 	__tablename__ = "oeuvre"
 	id: int = db.Column(db.Integer, primary_key=True)
-	titre: str = db.Column(db.String(512), nullable=False)
+	titre: str = db.Column(db.String(512), nullable=False, index=True)
 	resume: Optional[str] = db.Column(db.Text, nullable=True)
 	notes: Optional[str] = db.Column(db.Text, nullable=True)
 
@@ -19,7 +19,7 @@ class Oeuvre(db.Model):
 oeuvre_auteur = db.Table(
 	"oeuvre_auteur",
 	db.Column("oeuvre_id", db.Integer, db.ForeignKey("oeuvre.id", ondelete="CASCADE"), primary_key=True),
-	db.Column("auteur_id", db.Integer, db.ForeignKey("auteur.id", ondelete="CASCADE"), primary_key=True),
+	db.Column("auteur_id", db.Integer, db.ForeignKey("auteur.id", ondelete="CASCADE"), primary_key=True, index=True),
 	db.Column("role", db.String(64), nullable=True),
 )
 
@@ -27,7 +27,7 @@ oeuvre_auteur = db.Table(
 class LivreOeuvre(db.Model):
 	__tablename__ = "livre_oeuvre"
 	livre_id: int = db.Column(db.Integer, db.ForeignKey("livres.id", ondelete="CASCADE"), primary_key=True)
-	oeuvre_id: int = db.Column(db.Integer, db.ForeignKey("oeuvre.id", ondelete="CASCADE"), primary_key=True)
+	oeuvre_id: int = db.Column(db.Integer, db.ForeignKey("oeuvre.id", ondelete="CASCADE"), primary_key=True, index=True)
 	ordre: Optional[int] = db.Column(db.Integer, nullable=True)
 	pages: Optional[str] = db.Column(db.String(64), nullable=True)
 
@@ -9,7 +9,7 @@ from ..extensions import db
 class LivreAuteur(db.Model):
 	__tablename__ = "livre_auteur"
 	livre_id: int = db.Column(db.Integer, db.ForeignKey("livres.id", ondelete="CASCADE"), primary_key=True)
-	auteur_id: int = db.Column(db.Integer, db.ForeignKey("auteur.id", ondelete="CASCADE"), primary_key=True)
+	auteur_id: int = db.Column(db.Integer, db.ForeignKey("auteur.id", ondelete="CASCADE"), primary_key=True, index=True)
 	role: Optional[str] = db.Column(db.String(64), nullable=True)
 
 	auteur = db.relationship("Auteur", backref=db.backref("livre_auteurs", cascade="all, delete-orphan"))
@@ -18,23 +18,30 @@ class LivreAuteur(db.Model):
 livre_genre = db.Table(
 	"livre_genre",
 	db.Column("livre_id", db.Integer, db.ForeignKey("livres.id", ondelete="CASCADE"), primary_key=True),
-	db.Column("genre_id", db.Integer, db.ForeignKey("genre.id", ondelete="CASCADE"), primary_key=True),
+	db.Column("genre_id", db.Integer, db.ForeignKey("genre.id", ondelete="CASCADE"), primary_key=True, index=True),
 )
 
 
 class Livre(db.Model):
 	__tablename__ = "livres"
+	__table_args__ = (
+		# sort keys of the catalog listing, with id as tie-breaker
+		db.Index("ix_livres_titre_id", "titre", "id"),
+		db.Index("ix_livres_created_at_id", "created_at", "id"),
+	)
 	id: int = db.Column(db.Integer, primary_key=True)
 	titre: str = db.Column(db.String(512), nullable=False)
 
-	editeur_id: Optional[int] = db.Column(db.Integer, db.ForeignKey("editeur.id"))
-	langue_id: Optional[int] = db.Column(db.Integer, db.ForeignKey("langue.id"))
-	serie_id: Optional[int] = db.Column(db.Integer, db.ForeignKey("serie.id"))
+	editeur_id: Optional[int] = db.Column(db.Integer, db.ForeignKey("editeur.id"), index=True)
+	langue_id: Optional[int] = db.Column(db.Integer, db.ForeignKey("langue.id"), index=True)
+	serie_id: Optional[int] = db.Column(db.Integer, db.ForeignKey("serie.id"), index=True)
 	numero_serie: Optional[int] = db.Column(db.Integer)
 
-	emplacement_id: Optional[int] = db.Column(db.Integer, db.ForeignKey("emplacement.id"))
+	emplacement_id: Optional[int] = db.Column(db.Integer, db.ForeignKey("emplacement.id"), index=True)
 
 	lien_couverture: Optional[str] = db.Column(db.String(1024))
+	# thumbnails of lien_couverture written (made in the background after upload)
+	couverture_prete: bool = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
 	created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 	updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -44,17 +51,17 @@ class Livre(db.Model):
 	serie = db.relationship("Serie", backref="livres")
 	emplacement = db.relationship("Emplacement", backref="livres")
 
+	# Loaded lazily by default; views pick eager strategies through
+	# services.loading so list queries are not multiplied by joined collections.
 	livre_auteurs = db.relationship(
 		"LivreAuteur",
 		cascade="all, delete-orphan",
 		backref="livre",
-		lazy="joined",
 	)
 	genres = db.relationship(
 		"Genre",
 		secondary=livre_genre,
 		backref=db.backref("livres", lazy="dynamic"),
-		lazy="joined",
 	)
 
 	def __repr__(self) -> str:
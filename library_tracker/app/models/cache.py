@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from ..extensions import db
+
+
+class CacheVersion(db.Model):
+	"""Version stamps of cached data (rendered pages, ...), bumped inside the
+	writing transaction so every process sees the invalidation."""
+	__tablename__ = "cache_version"
+	name: str = db.Column(db.String(32), primary_key=True)
+	value: int = db.Column(db.Integer, nullable=False, default=0)
+	changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+	def __repr__(self) -> str:
+		return f"<CacheVersion {self.name}={self.value}>"
@@ -7,6 +7,7 @@ from ..extensions import db
 
 class Auteur(db.Model):
 	__tablename__ = "auteur"
+	__table_args__ = (db.Index("ix_auteur_nom_prenom", "nom", "prenom"),)
 	id: int = db.Column(db.Integer, primary_key=True)
 	nom: str = db.Column(db.String(255), nullable=False)
 	prenom: Optional[str] = db.Column(db.String(255))
@@ -19,7 +20,7 @@ class Auteur(db.Model):
 class Editeur(db.Model):
 	__tablename__ = "editeur"
 	id: int = db.Column(db.Integer, primary_key=True)
-	nom: str = db.Column(db.String(255), nullable=False)
+	nom: str = db.Column(db.String(255), nullable=False, index=True)
 
 	def __repr__(self) -> str:
 		return f"<Editeur {self.nom}>"
@@ -28,7 +29,7 @@ class Editeur(db.Model):
 class Langue(db.Model):
 	__tablename__ = "langue"
 	id: int = db.Column(db.Integer, primary_key=True)
-	nom: str = db.Column(db.String(64), nullable=False)
+	nom: str = db.Column(db.String(64), nullable=False, index=True)
 
 	def __repr__(self) -> str:
 		return f"<Langue {self.nom}>"
@@ -37,7 +38,7 @@ class Langue(db.Model):
 class Genre(db.Model):
 	__tablename__ = "genre"
 	id: int = db.Column(db.Integer, primary_key=True)
-	nom: str = db.Column(db.String(128), nullable=False)
+	nom: str = db.Column(db.String(128), nullable=False, index=True)
 
 	def __repr__(self) -> str:
 		return f"<Genre {self.nom}>"
@@ -46,7 +47,7 @@ class Genre(db.Model):
 class Serie(db.Model):
 	__tablename__ = "serie"
 	id: int = db.Column(db.Integer, primary_key=True)
-	nom: str = db.Column(db.String(255), nullable=False)
+	nom: str = db.Column(db.String(255), nullable=False, index=True)
 
 	def __repr__(self) -> str:
 		return f"<Serie {self.nom}>"
@@ -54,6 +55,7 @@ class Serie(db.Model):
 
 class Emplacement(db.Model):
 	__tablename__ = "emplacement"
+	__table_args__ = (db.Index("ix_emplacement_zone_colonne_etage", "zone", "colonne", "etage"),)
 	id: int = db.Column(db.Integer, primary_key=True)
 	colonne: int = db.Column(db.Integer, nullable=False)
 	etage: str = db.Column(db.String(16), nullable=False)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from ..extensions import db
+
+
+class CoverBlob(db.Model):
+	"""A stored cover file and how many livres use it; deleted with its files at zero."""
+	__tablename__ = "cover_blob"
+	# path under UPLOAD_FOLDER (content-addressed: "3f/a0/3fa0...e1.jpg")
+	filename: str = db.Column(db.String(1024), primary_key=True)
+	refcount: int = db.Column(db.Integer, nullable=False, default=0)
+	# unknown for covers stored before content addressing
+	bytes: Optional[int] = db.Column(db.Integer, nullable=True)
+	created_at: datetime = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+	def __repr__(self) -> str:
+		return f"<CoverBlob {self.filename} x{self.refcount}>"
+
+
+class CoverVariant(db.Model):
+	"""One generated thumbnail of a cover file: size bucket, format and what it weighs."""
+	__tablename__ = "cover_variant"
+	__table_args__ = (db.UniqueConstraint("filename", "size", "format", name="uq_cover_variant"),)
+	id: int = db.Column(db.Integer, primary_key=True)
+	# cover file (Livre.lien_couverture); looked up through uq_cover_variant
+	filename: str = db.Column(db.String(1024), nullable=False)
+	# requested longest side (THUMB_SIZES); width/height are the actual pixels
+	size: int = db.Column(db.SmallInteger, nullable=False)
+	# jpeg | png | webp | avif ...
+	format: str = db.Column(db.String(8), nullable=False)
+	width: int = db.Column(db.SmallInteger, nullable=False)
+	height: int = db.Column(db.SmallInteger, nullable=False)
+	bytes: int = db.Column(db.Integer, nullable=False)
+
+	def __repr__(self) -> str:
+		return f"<CoverVariant {self.filename} {self.size} {self.format}>"
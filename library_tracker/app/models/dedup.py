@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from ..extensions import db
+
+
+class LivreTitleKey(db.Model):
+	"""Normalised title (folded, leading article removed) of each book, maintained on write."""
+	__tablename__ = "livre_title_key"
+	livre_id: int = db.Column(db.Integer, db.ForeignKey("livres.id", ondelete="CASCADE"), primary_key=True)
+	title_key: str = db.Column(db.String(512), nullable=False, index=True)
+
+
+class LivreSignature(db.Model):
+	"""MinHash LSH bands of the title key: books sharing a (band, bucket) are candidates."""
+	__tablename__ = "livre_signature"
+	__table_args__ = (db.Index("ix_livre_signature_band_bucket", "band", "bucket"),)
+	livre_id: int = db.Column(db.Integer, db.ForeignKey("livres.id", ondelete="CASCADE"), primary_key=True)
+	band: int = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+	bucket: int = db.Column(db.BigInteger, nullable=False)
+
+
+class DuplicateRun(db.Model):
+	"""A catalog-wide clustering pass (`flask dedupe-clusters`), resumable from its checkpoint."""
+	__tablename__ = "duplicate_run"
+	id: int = db.Column(db.Integer, primary_key=True)
+	# livre | auteur
+	kind: str = db.Column(db.String(16), nullable=False, index=True)
+	# running | interrupted | done
+	status: str = db.Column(db.String(16), nullable=False, default="running")
+	min_score: float = db.Column(db.Float, nullable=False)
+	# checkpoint: candidate blocks fully scored and committed
+	position: int = db.Column(db.Integer, nullable=False, default=0)
+	# (band, bucket) of the last committed block; blocks are processed in that order
+	last_band: Optional[int] = db.Column(db.SmallInteger, nullable=True)
+	last_bucket: Optional[int] = db.Column(db.BigInteger, nullable=True)
+	comparisons: int = db.Column(db.Integer, nullable=False, default=0)
+	clusters: int = db.Column(db.Integer, nullable=False, default=0)
+	elapsed: float = db.Column(db.Float, nullable=False, default=0.0)
+	created_at: datetime = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+	updated_at: datetime = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+	finished_at: Optional[datetime] = db.Column(db.DateTime, nullable=True)
+
+	def __repr__(self) -> str:
+		return f"<DuplicateRun {self.id} {self.kind} {self.status}@{self.position}>"
+
+
+class DuplicatePair(db.Model):
+	"""Two records scored above the run's threshold (left_id < right_id)."""
+	__tablename__ = "duplicate_pair"
+	run_id: int = db.Column(db.Integer, db.ForeignKey("duplicate_run.id", ondelete="CASCADE"), primary_key=True)
+	left_id: int = db.Column(db.Integer, primary_key=True, autoincrement=False)
+	right_id: int = db.Column(db.Integer, primary_key=True, autoincrement=False)
+	score: float = db.Column(db.Float, nullable=False)
+
+
+class DuplicateCluster(db.Model):
+	"""Connected records of a run, to be reviewed (and merged or dismissed) by hand."""
+	__tablename__ = "duplicate_cluster"
+	id: int = db.Column(db.Integer, primary_key=True)
+	run_id: int = db.Column(db.Integer, db.ForeignKey("duplicate_run.id", ondelete="CASCADE"), nullable=False, index=True)
+	kind: str = db.Column(db.String(16), nullable=False)
+	size: int = db.Column(db.Integer, nullable=False)
+	# best and weakest pair score linking the members
+	max_score: float = db.Column(db.Float, nullable=False)
+	min_score: float = db.Column(db.Float, nullable=False)
+	# pending | merged | dismissed
+	status: str = db.Column(db.String(16), nullable=False, default="pending", index=True)
+
+	members = db.relationship("DuplicateClusterMember", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class DuplicateClusterMember(db.Model):
+	__tablename__ = "duplicate_cluster_member"
+	cluster_id: int = db.Column(db.Integer, db.ForeignKey("duplicate_cluster.id", ondelete="CASCADE"), primary_key=True)
+	# Livre.id or Auteur.id depending on the cluster kind
+	entity_id: int = db.Column(db.Integer, primary_key=True, autoincrement=False, index=True)
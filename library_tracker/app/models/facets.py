@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from ..extensions import db
+
+
+class LivreFacet(db.Model):
+	"""Facet values of each book (genre, editeur, serie, langue, zone), maintained on write.
+
+	Ids are stored as text so zones (plain strings) share the table. The primary
+	key doubles as the index for "books with this value"; ix_livre_facet_livre
+	covers the per-book lookups of facet counting.
+	"""
+	__tablename__ = "livre_facet"
+	__table_args__ = (db.Index("ix_livre_facet_livre", "livre_id", "facet", "value"),)
+	facet: str = db.Column(db.String(16), primary_key=True)
+	value: str = db.Column(db.String(64), primary_key=True)
+	livre_id: int = db.Column(db.Integer, db.ForeignKey("livres.id", ondelete="CASCADE"), primary_key=True)
+
+
+class FacetCount(db.Model):
+	"""Number of books per facet value over the whole catalog (unfiltered drill-down)."""
+	__tablename__ = "facet_count"
+	# top values of a facet: index-ordered read
+	__table_args__ = (db.Index("ix_facet_count_facet_count", "facet", "count"),)
+	facet: str = db.Column(db.String(16), primary_key=True)
+	value: str = db.Column(db.String(64), primary_key=True)
+	count: int = db.Column(db.Integer, nullable=False, default=0)
+
+	def __repr__(self) -> str:
+		return f"<FacetCount {self.facet}={self.value}: {self.count}>"
+
+
+class LivreChange(db.Model):
+	"""Books touched by each flush, in commit order: workers replay it to keep
+	their in-memory bitmap index current (written only when BITMAP_INDEX is on)."""
+	__tablename__ = "livre_change"
+	seq: int = db.Column(db.Integer, primary_key=True)
+	livre_id: int = db.Column(db.Integer, nullable=False)
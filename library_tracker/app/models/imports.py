@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Optional
+
+from ..extensions import db
+
+
+class ImportRun(db.Model):
+	"""A CSV import streamed in committed chunks, resumable from its checkpoint.
+
+	Also the job record of the background import queue (`flask import-worker`).
+	"""
+	__tablename__ = "import_run"
+	id: int = db.Column(db.Integer, primary_key=True)
+	filename: str = db.Column(db.String(255), nullable=False)
+	source_path: str = db.Column(db.String(1024), nullable=False)
+	source_hash: str = db.Column(db.String(64), nullable=False, index=True)
+	# queued | running | interrupted | failed | done
+	status: str = db.Column(db.String(16), nullable=False, default="running", index=True)
+	# checkpoint: CSV records (after the header) fully processed and committed
+	position: int = db.Column(db.Integer, nullable=False, default=0)
+	# CSV records in the file, counted when processing starts (progress)
+	total: Optional[int] = db.Column(db.Integer, nullable=True)
+	created: int = db.Column(db.Integer, nullable=False, default=0)
+	updated: int = db.Column(db.Integer, nullable=False, default=0)
+	skipped: int = db.Column(db.Integer, nullable=False, default=0)
+	errors_json: str = db.Column(db.Text, nullable=False, default="[]")
+	elapsed: float = db.Column(db.Float, nullable=False, default=0.0)
+	message: Optional[str] = db.Column(db.Text, nullable=True)
+	created_at: datetime = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+	updated_at: datetime = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+	finished_at: Optional[datetime] = db.Column(db.DateTime, nullable=True)
+
+	@property
+	def errors(self) -> list[str]:
+		return json.loads(self.errors_json or "[]")
+
+	@errors.setter
+	def errors(self, value: list[str]) -> None:
+		self.errors_json = json.dumps(value, ensure_ascii=False)
+
+	@property
+	def resumable(self) -> bool:
+		return self.status in ("queued", "running", "interrupted", "failed")
+
+	@property
+	def finished(self) -> bool:
+		return self.status in ("done", "failed", "interrupted")
+
+	@property
+	def progress(self) -> Optional[float]:
+		if not self.total:
+			return 1.0 if self.status == "done" else None
+		return min(self.position / self.total, 1.0)
+
+	def __repr__(self) -> str:
+		return f"<ImportRun {self.id} {self.filename} {self.status}@{self.position}>"
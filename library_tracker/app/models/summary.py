@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from ..extensions import db
+
+
+class LivreSummary(db.Model):
+	"""Display fields of each book rendered once on write (list pages, CSV export).
+
+	Derived from livres and its references by services.summary; never edited
+	directly. Text columns hold the export formatting ("" when absent).
+	"""
+	__tablename__ = "livre_summary"
+	__table_args__ = (
+		# same sort keys as livres, so listings can page on this table alone
+		db.Index("ix_livre_summary_titre_id", "titre", "livre_id"),
+		db.Index("ix_livre_summary_created_at_id", "created_at", "livre_id"),
+	)
+	livre_id: int = db.Column(db.Integer, db.ForeignKey("livres.id", ondelete="CASCADE"), primary_key=True)
+	titre: str = db.Column(db.String(512), nullable=False)
+	editeur: str = db.Column(db.String(255), nullable=False, default="")
+	langue: str = db.Column(db.String(255), nullable=False, default="")
+	serie: str = db.Column(db.String(255), nullable=False, default="")
+	numero_serie: Optional[int] = db.Column(db.Integer)
+	# "Serie #n" as listed in the catalog
+	serie_label: str = db.Column(db.String(300), nullable=False, default="")
+	# "zone C{colonne} E{etage}"
+	emplacement: str = db.Column(db.String(300), nullable=False, default="")
+	auteurs: str = db.Column(db.Text, nullable=False, default="")
+	genres: str = db.Column(db.Text, nullable=False, default="")
+	oeuvres: str = db.Column(db.Text, nullable=False, default="")
+	created_at = db.Column(db.DateTime, nullable=False)
+	# incremented at each re-render: stamps the cached HTML fragments
+	revision: int = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+	def __repr__(self) -> str:
+		return f"<LivreSummary {self.titre}>"
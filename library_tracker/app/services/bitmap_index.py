@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional, Union
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+
+from ..extensions import db
+from ..models.books import Livre, livre_genre
+from ..models.facets import LivreChange
+from .catalog_events import CatalogChanges, on_flush
+from .refdata import get_refs
+
+
+# A value's books are a sorted array of ids while few, a bitmap (bit i of a
+# bytearray = livre i) once they exceed 1/32 of the id range: whichever is
+# smaller, as in Roaring bitmaps.
+Container = Union[array, bytearray]
+SPARSE_MIN = 1024
+
+SINGLE = ("editeur", "serie", "langue", "emplacement")
+ATTRIBUTES = ("genre", *SINGLE)
+_NONZERO = re.compile(rb"[^\x00]")
+# livre_change seqs are allocated at insert but become visible at commit, so a
+# seq below the last one applied may still show up (Postgres: a transaction
+# holding seq 10 commits after the one holding 11). Missing seqs are looked for
+# again on every sync for GAP_TIMEOUT seconds (rolled back ones never come);
+# build() watches the last GAP_WINDOW seqs before its snapshot.
+GAP_TIMEOUT = 300.0
+GAP_WINDOW = 1000
+
+
+def _contains(c: Container, i: int) -> bool:
+	if isinstance(c, array):
+		pos = bisect_left(c, i)
+		return pos < len(c) and c[pos] == i
+	return (i >> 3) < len(c) and bool(c[i >> 3] >> (i & 7) & 1)
+
+
+def _to_int(c: Container) -> int:
+	if isinstance(c, bytearray):
+		return int.from_bytes(c, "little")
+	buf = bytearray((c[-1] >> 3) + 1 if c else 0)
+	for i in c:
+		buf[i >> 3] |= 1 << (i & 7)
+	return int.from_bytes(buf, "little")
+
+
+def _bit_ids(bits: int) -> list[int]:
+	data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+	ids = []
+	for m in _NONZERO.finditer(data):
+		byte, base = data[m.start()], m.start() << 3
+		ids += [base + k for k in range(8) if byte >> k & 1]
+	return ids
+
+
+class Match:
+	"""Books matching a filter combination: sorted ids or an int bitmap."""
+
+	def __init__(self, ids: Optional[list[int]] = None, bits: int = 0) -> None:
+		self._ids = ids
+		self._bits = bits
+		self.count = len(ids) if ids is not None else bits.bit_count()
+
+	def ids(self) -> list[int]:
+		if self._ids is None:
+			self._ids = _bit_ids(self._bits)
+		return self._ids
+
+
+class BitmapIndex:
+	"""In-process index of the catalog filters: for each genre, editeur, serie,
+	langue and emplacement, the set of Livre.id having it.
+
+	Built from two scans on first use, then kept current by replaying
+	livre_change (see `sync`), so every worker sees the others' writes.
+	"""
+
+	def __init__(self) -> None:
+		self.lock = threading.RLock()
+		self._reset()
+
+	def _reset(self) -> None:
+		self.values: dict[str, dict[int, Container]] = {attr: {} for attr in ATTRIBUTES}
+		# livre id -> value of each single-valued attribute (0: none), to unindex on change
+		self.single: dict[str, array] = {attr: array("i") for attr in SINGLE}
+		self.present = bytearray()
+		self.max_id = 0
+		# last livre_change row applied
+		self.seq = 0
+		# seqs below self.seq not seen yet -> time.monotonic() when first missed
+		self.gaps: dict[int, float] = {}
+		self.ready = False
+
+	# -- maintenance
+
+	def _threshold(self) -> int:
+		return max(SPARSE_MIN, self.max_id >> 5)
+
+	def _add(self, attr: str, value: int, livre_id: int) -> None:
+		c = self.values[attr].get(value)
+		if c is None:
+			self.values[attr][value] = array("I", [livre_id])
+		elif isinstance(c, array):
+			pos = bisect_left(c, livre_id)
+			if pos == len(c) or c[pos] != livre_id:
+				c.insert(pos, livre_id)
+				if len(c) > self._threshold():
+					self.values[attr][value] = bytearray(_to_int(c).to_bytes((self.max_id >> 3) + 1, "little"))
+		else:
+			if (livre_id >> 3) >= len(c):
+				c.extend(bytes((livre_id >> 3) + 1 - len(c)))
+			c[livre_id >> 3] |= 1 << (livre_id & 7)
+
+	def _discard(self, attr: str, value: int, livre_id: int) -> None:
+		c = self.values[attr].get(value)
+		if c is None:
+			return
+		if isinstance(c, array):
+			pos = bisect_left(c, livre_id)
+			if pos < len(c) and c[pos] == livre_id:
+				del c[pos]
+			if not c:
+				del self.values[attr][value]
+		elif (livre_id >> 3) < len(c):
+			c[livre_id >> 3] &= ~(1 << (livre_id & 7)) & 0xFF
+
+	def _grow(self, livre_id: int) -> None:
+		if livre_id > self.max_id:
+			self.max_id = livre_id
+		for a in self.single.values():
+			if len(a) <= livre_id:
+				a.extend([0] * (livre_id + 1 - len(a)))
+		if (livre_id >> 3) >= len(self.present):
+			self.present.extend(bytes((livre_id >> 3) + 1 - len(self.present)))
+
+	def _unindex(self, livre_id: int) -> None:
+		if not _contains(self.present, livre_id):
+			return
+		for attr, a in self.single.items():
+			if a[livre_id]:
+				self._discard(attr, a[livre_id], livre_id)
+				a[livre_id] = 0
+		# genres are not kept per book: probe every genre
+		for genre_id in list(self.values["genre"]):
+			self._discard("genre", genre_id, livre_id)
+		self.present[livre_id >> 3] &= ~(1 << (livre_id & 7)) & 0xFF
+
+	def _index(self, rows: Iterable[tuple], genres: Iterable[tuple[int, int]]) -> None:
+		for livre_id, *values in rows:
+			self._grow(livre_id)
+			self.present[livre_id >> 3] |= 1 << (livre_id & 7)
+			for attr, value in zip(SINGLE, values):
+				if value:
+					self.single[attr][livre_id] = value
+					self._add(attr, value, livre_id)
+		for livre_id, genre_id in genres:
+			self._add("genre", genre_id, livre_id)
+
+	@staticmethod
+	def _rows(connection: Connection, ids: Optional[list[int]] = None):
+		books = select(Livre.id, Livre.editeur_id, Livre.serie_id, Livre.langue_id, Livre.emplacement_id)
+		genres = select(livre_genre.c.livre_id, livre_genre.c.genre_id)
+		if ids is not None:
+			books = books.where(Livre.id.in_(ids))
+			genres = genres.where(livre_genre.c.livre_id.in_(ids))
+		else:
+			# ascending ids: sparse arrays are appended to, not inserted into
+			books = books.order_by(Livre.id)
+			genres = genres.order_by(livre_genre.c.livre_id)
+		return connection.execute(books), connection.execute(genres)
+
+	def build(self, connection: Connection) -> None:
+		with self.lock:
+			self._reset()
+			self.seq = connection.execute(select(func.max(LivreChange.seq))).scalar() or 0
+			recent = connection.execute(
+				select(LivreChange.seq).where(LivreChange.seq > self.seq - GAP_WINDOW)
+			).scalars()
+			self._track_gaps(max(self.seq - GAP_WINDOW, 0), set(recent), self.seq)
+			self._grow(connection.execute(select(func.max(Livre.id))).scalar() or 0)
+			books, genres = self._rows(connection)
+			members: dict[str, dict[int, list[int]]] = {attr: {} for attr in ATTRIBUTES}
+			present, single = self.present, self.single
+			for livre_id, *values in books:
+				present[livre_id >> 3] |= 1 << (livre_id & 7)
+				for attr, value in zip(SINGLE, values):
+					if value:
+						single[attr][livre_id] = value
+						members[attr].setdefault(value, []).append(livre_id)
+			for livre_id, genre_id in genres:
+				members["genre"].setdefault(genre_id, []).append(livre_id)
+			# ids come in ascending order: containers are made whole
+			threshold = self._threshold()
+			for attr, by_value in members.items():
+				for value, ids in by_value.items():
+					c = array("I", ids)
+					if len(c) > threshold:
+						c = bytearray(_to_int(c).to_bytes((self.max_id >> 3) + 1, "little"))
+					self.values[attr][value] = c
+			self.ready = True
+
+	def refresh(self, connection: Connection, livre_ids: Iterable[int], chunk_size: int = 500) -> None:
+		"""Re-read the given books (deleted ones just leave the index)."""
+		ids = sorted(set(livre_ids))
+		with self.lock:
+			for start in range(0, len(ids), chunk_size):
+				chunk = ids[start:start + chunk_size]
+				for livre_id in chunk:
+					self._unindex(livre_id)
+				books, genres = self._rows(connection, chunk)
+				self._index(list(books), list(genres))
+
+	def _track_gaps(self, after: int, seen: set[int], last: int) -> None:
+		"""Remember the seqs in (after, last] missing from `seen`."""
+		now = time.monotonic()
+		for seq in range(after + 1, last + 1):
+			if seq not in seen:
+				self.gaps.setdefault(seq, now)
+
+	def sync(self, connection: Connection) -> None:
+		"""Apply livre_change rows written since the last sync (by any process),
+		and those that committed late below the last applied seq.
+
+		Rebuilds when the log was pruned past this index's position.
+		"""
+		with self.lock:
+			if not self.ready:
+				self.build(connection)
+				return
+			expired = time.monotonic() - GAP_TIMEOUT
+			self.gaps = {seq: t for seq, t in self.gaps.items() if t > expired}
+			where = LivreChange.seq > self.seq
+			if self.gaps:
+				where = where | LivreChange.seq.in_(sorted(self.gaps))
+			rows = connection.execute(
+				select(LivreChange.seq, LivreChange.livre_id).where(where).order_by(LivreChange.seq)
+			).all()
+			if not rows:
+				return
+			oldest = connection.execute(select(func.min(LivreChange.seq))).scalar()
+			if oldest > self.seq + 1 or any(seq < oldest for seq in self.gaps):
+				# pruned: what we missed may be gone from the log
+				self.build(connection)
+				return
+			seen = {seq for seq, _ in rows}
+			for seq in seen:
+				self.gaps.pop(seq, None)
+			last = max(self.seq, rows[-1][0])
+			self._track_gaps(self.seq, seen, last)
+			self.refresh(connection, (livre_id for _, livre_id in rows))
+			self.seq = last
+
+	# -- queries
+
+	def match(self, filters: dict[str, Iterable[int]]) -> Match:
+		"""Books having, for every attribute in `filters`, one of the listed values."""
+		with self.lock:
+			operands = []
+			for attr, wanted in filters.items():
+				found = [self.values[attr][v] for v in set(wanted) if v in self.values[attr]]
+				if not found:
+					return Match([])
+				operands.append(found[0] if len(found) == 1 else self._union(found))
+			if not operands:
+				return Match(bits=_to_int(self.present))
+			sparse = sorted((c for c in operands if isinstance(c, array)), key=len)
+			dense = [c for c in operands if isinstance(c, bytearray)]
+			if sparse:
+				# walk the smallest set, probe the others
+				others = sparse[1:] + dense
+				return Match([i for i in sparse[0] if all(_contains(c, i) for c in others)])
+			bits = _to_int(dense[0])
+			for c in dense[1:]:
+				bits &= _to_int(c)
+			return Match(bits=bits)
+
+	def _union(self, containers: list[Container]) -> Container:
+		if all(isinstance(c, array) for c in containers) and sum(map(len, containers)) <= self._threshold():
+			return array("I", sorted(set().union(*containers)))
+		bits = 0
+		for c in containers:
+			bits |= _to_int(c)
+		return bytearray(bits.to_bytes((bits.bit_length() + 7) // 8, "little"))
+
+
+@on_flush
+def _log_changes(connection: Connection, changes: CatalogChanges) -> None:
+	if not has_app_context() or not current_app.config.get("BITMAP_INDEX"):
+		return
+	ids = changes.livres | changes.deleted_livres
+	if not ids:
+		return
+	connection.execute(insert(LivreChange.__table__), [{"livre_id": i} for i in sorted(ids)])
+	last = connection.execute(select(func.max(LivreChange.seq))).scalar()
+	connection.execute(delete(LivreChange.__table__).where(LivreChange.seq <= last - current_app.config["BITMAP_CHANGE_KEEP"]))
+
+
+def get_bitmap_index() -> Optional[BitmapIndex]:
+	"""This worker's index, brought up to date; None when BITMAP_INDEX is off.
+
+	The first call builds it (a few seconds for a million books).
+	"""
+	if not current_app.config.get("BITMAP_INDEX"):
+		return None
+	index = current_app.extensions.setdefault("bitmap_index", BitmapIndex())
+	index.sync(db.session.connection())
+	return index
+
+
+def catalog_match(
+	genre_id: Optional[int] = None,
+	editeur_id: Optional[int] = None,
+	serie_id: Optional[int] = None,
+	langue_id: Optional[int] = None,
+	zone: str = "",
+	colonne: Optional[int] = None,
+	etage: str = "",
+) -> Optional[Match]:
+	"""catalog.home's filters evaluated on the bitmap index (None: index off or no filter).
+
+	zone/colonne/etage select emplacements as the SQL filters do (zone is a
+	case-insensitive substring), then the union of their books.
+	"""
+	filters: dict[str, list[int]] = {}
+	for attr, value in (("genre", genre_id), ("editeur", editeur_id), ("serie", serie_id), ("langue", langue_id)):
+		if value:
+			filters[attr] = [value]
+	if zone or colonne is not None or etage:
+		filters["emplacement"] = [
+			e["id"] for e in get_refs("emplacements")
+			if (not zone or zone.casefold() in (e["zone"] or "").casefold())
+			and (colonne is None or e["colonne"] == colonne)
+			and (not etage or e["etage"] == etage)
+		]
+	if not filters:
+		return None
+	index = get_bitmap_index()
+	return index.match(filters) if index is not None else None
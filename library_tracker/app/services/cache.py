@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from flask import Flask, current_app, has_request_context, request
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Connection
+
+from ..extensions import db
+from ..models.cache import CacheVersion
+
+
+_MISSING = object()
+
+
+class MemoryCache:
+	"""In-process LRU cache with optional per-entry TTL (one per worker)."""
+
+	def __init__(self, max_entries: int = 2048) -> None:
+		self.max_entries = max_entries
+		self._data: OrderedDict[str, tuple[Optional[float], Any]] = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key: str, default: Any = None) -> Any:
+		with self._lock:
+			entry = self._data.get(key, _MISSING)
+			if entry is _MISSING:
+				return default
+			expires, value = entry
+			if expires is not None and expires < time.time():
+				del self._data[key]
+				return default
+			self._data.move_to_end(key)
+			return value
+
+	def get_many(self, keys: list[str]) -> dict[str, Any]:
+		found = {}
+		for key in keys:
+			value = self.get(key, _MISSING)
+			if value is not _MISSING:
+				found[key] = value
+		return found
+
+	def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+		expires = time.time() + ttl if ttl else None
+		with self._lock:
+			self._data[key] = (expires, value)
+			self._data.move_to_end(key)
+			while len(self._data) > self.max_entries:
+				self._data.popitem(last=False)
+
+	def delete(self, key: str) -> None:
+		with self._lock:
+			self._data.pop(key, None)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._data.clear()
+
+
+class SqliteCache:
+	"""Cache shared by all worker processes of a host through a local SQLite file.
+
+	Values are pickled. Invalidation goes through the version stamps in the
+	database (cache_version), not through the cache itself.
+	"""
+
+	def __init__(self, path: str, max_entries: int = 20000) -> None:
+		self.path = path
+		self.max_entries = max_entries
+		self._local = threading.local()
+		Path(path).parent.mkdir(parents=True, exist_ok=True)
+		with self._connect() as conn:
+			conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, stored REAL NOT NULL)")
+			conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_stored ON cache (stored)")
+
+	def _connect(self) -> sqlite3.Connection:
+		conn = getattr(self._local, "conn", None)
+		if conn is None:
+			conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+			conn.execute("PRAGMA journal_mode=WAL")
+			conn.execute("PRAGMA synchronous=NORMAL")
+			self._local.conn = conn
+		return conn
+
+	def get(self, key: str, default: Any = None) -> Any:
+		found = self.get_many([key])
+		return found.get(key, default)
+
+	def get_many(self, keys: list[str]) -> dict[str, Any]:
+		if not keys:
+			return {}
+		conn = self._connect()
+		now = time.time()
+		placeholders = ",".join("?" * len(keys))
+		rows = conn.execute(
+			f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND (expires IS NULL OR expires >= ?)",
+			[*keys, now],
+		).fetchall()
+		return {key: pickle.loads(value) for key, value in rows}
+
+	def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+		now = time.time()
+		conn = self._connect()
+		conn.execute(
+			"INSERT OR REPLACE INTO cache (key, value, expires, stored) VALUES (?, ?, ?, ?)",
+			(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl if ttl else None, now),
+		)
+		# cheap amortised trim: evict expired entries and the oldest beyond max_entries
+		if hash(key) % 64 == 0:
+			conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires < ?", (now,))
+			conn.execute(
+				"DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY stored DESC LIMIT -1 OFFSET ?)",
+				(self.max_entries,),
+			)
+
+	def delete(self, key: str) -> None:
+		self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+	def clear(self) -> None:
+		self._connect().execute("DELETE FROM cache")
+
+
+def init_cache(app: Flask) -> None:
+	backend = app.config.get("CACHE_BACKEND", "memory")
+	if backend == "sqlite":
+		cache = SqliteCache(app.config["CACHE_PATH"], max_entries=app.config["CACHE_MAX_ENTRIES"])
+	elif backend == "memory":
+		cache = MemoryCache(max_entries=app.config["CACHE_MAX_ENTRIES"])
+	else:
+		raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+	app.extensions["cache"] = cache
+
+
+def get_cache():
+	return current_app.extensions["cache"]
+
+
+# Version stamps in the database: whatever the cache backend, a bump is seen
+# by every worker (and the import worker's writes by the web workers) as soon
+# as the writing transaction commits.
+
+# per-request memo (the WSGI environ: g outlives requests sharing an app context)
+_VERSIONS_KEY = "library_tracker.cache_versions"
+
+
+def _versions() -> dict[str, tuple[int, datetime]]:
+	# read once per request; outside requests (workers, CLI) on every call
+	if has_request_context() and _VERSIONS_KEY in request.environ:
+		return request.environ[_VERSIONS_KEY]
+	versions = {name: (value, changed_at) for name, value, changed_at in db.session.execute(
+		select(CacheVersion.name, CacheVersion.value, CacheVersion.changed_at)
+	)}
+	if has_request_context():
+		request.environ[_VERSIONS_KEY] = versions
+	return versions
+
+
+def cache_version(name: str) -> int:
+	return _versions().get(name, (0, None))[0]
+
+
+def cache_version_changed_at(name: str) -> Optional[datetime]:
+	"""UTC time of the last bump (naive), None if never bumped."""
+	return _versions().get(name, (0, None))[1]
+
+
+def bump_version(connection: Connection, name: str) -> None:
+	"""Increment a version stamp in the current transaction (visible to others at commit)."""
+	now = datetime.utcnow()
+	updated = connection.execute(
+		update(CacheVersion.__table__).where(CacheVersion.name == name)
+		.values(value=CacheVersion.value + 1, changed_at=now)
+	)
+	if not updated.rowcount:
+		connection.execute(insert(CacheVersion.__table__).values(name=name, value=1, changed_at=now))
+	if has_request_context():
+		request.environ.pop(_VERSIONS_KEY, None)
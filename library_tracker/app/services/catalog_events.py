@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models.core import Auteur, Editeur, Langue, Genre, Serie, Emplacement
+from ..models.books import Livre, LivreAuteur, livre_genre
+from ..models.anthologies import Oeuvre, LivreOeuvre
+
+
+REF_MODELS = (Auteur, Editeur, Langue, Genre, Serie, Emplacement, Oeuvre)
+
+
+@dataclass
+class CatalogChanges:
+	"""Ids touched by a flush (or a bulk operation), grouped for index maintenance.
+
+	`livres` holds inserted/updated books, including books whose referenced rows
+	(auteur, serie, ...) changed; `titles` the inserted books and those whose
+	titre changed. `refs` / `deleted_refs` are keyed by table name.
+	"""
+	livres: set[int] = field(default_factory=set)
+	deleted_livres: set[int] = field(default_factory=set)
+	titles: set[int] = field(default_factory=set)
+	refs: dict[str, set[int]] = field(default_factory=dict)
+	deleted_refs: dict[str, set[int]] = field(default_factory=dict)
+
+	def touch_ref(self, table: str, ref_id: int, deleted: bool = False) -> None:
+		target = self.deleted_refs if deleted else self.refs
+		target.setdefault(table, set()).add(ref_id)
+
+	def normalize(self) -> None:
+		self.livres -= self.deleted_livres
+		self.titles -= self.deleted_livres
+		self.livres.discard(None)
+		self.titles.discard(None)
+		self.deleted_livres.discard(None)
+
+	def __bool__(self) -> bool:
+		return bool(self.livres or self.deleted_livres or self.refs or self.deleted_refs)
+
+
+FlushHandler = Callable[[Connection, CatalogChanges], None]
+
+_flush_handlers: list[FlushHandler] = []
+
+_INDIRECT_KEY = "catalog_events.indirect"
+
+
+def on_flush(handler: FlushHandler) -> FlushHandler:
+	"""Register a handler run inside the flushing transaction (derived tables, indexes)."""
+	if handler not in _flush_handlers:
+		_flush_handlers.append(handler)
+	return handler
+
+
+def publish(session: Session, changes: CatalogChanges) -> None:
+	"""Dispatch changes made outside the ORM unit of work (bulk inserts/updates)."""
+	changes.normalize()
+	if not changes:
+		return
+	connection = session.connection()
+	for handler in list(_flush_handlers):
+		handler(connection, changes)
+
+
+def _livres_referencing(connection: Connection, table: str, ids: set[int]) -> set[int]:
+	if not ids:
+		return set()
+	if table == "auteur":
+		stmt = select(LivreAuteur.livre_id).where(LivreAuteur.auteur_id.in_(ids))
+	elif table == "oeuvre":
+		stmt = select(LivreOeuvre.livre_id).where(LivreOeuvre.oeuvre_id.in_(ids))
+	elif table == "genre":
+		stmt = select(livre_genre.c.livre_id).where(livre_genre.c.genre_id.in_(ids))
+	else:
+		column = getattr(Livre, f"{table}_id")
+		stmt = select(Livre.id).where(column.in_(ids))
+	return set(connection.execute(stmt).scalars())
+
+
+def _ref_modified(session: Session, obj) -> bool:
+	# Appending to a backref collection (auteur.livre_auteurs, ...) marks the
+	# reference dirty; only column changes matter here.
+	return session.is_modified(obj, include_collections=False)
+
+
+@event.listens_for(Session, "before_flush")
+def _before_flush(session: Session, flush_context, instances) -> None:
+	# Rows pointing at modified/deleted reference data must be resolved before the
+	# flush removes or re-points them.
+	touched: dict[str, set[int]] = {}
+	for obj in session.dirty:
+		if isinstance(obj, REF_MODELS) and obj.id is not None and _ref_modified(session, obj):
+			touched.setdefault(obj.__tablename__, set()).add(obj.id)
+	for obj in session.deleted:
+		if isinstance(obj, REF_MODELS) and obj.id is not None:
+			touched.setdefault(obj.__tablename__, set()).add(obj.id)
+	if not touched:
+		return
+	connection = session.connection()
+	indirect = session.info.setdefault(_INDIRECT_KEY, set())
+	for table, ids in touched.items():
+		indirect |= _livres_referencing(connection, table, ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context) -> None:
+	changes = CatalogChanges()
+	changes.livres |= session.info.pop(_INDIRECT_KEY, set())
+	for obj in list(session.new) + list(session.dirty):
+		if isinstance(obj, Livre):
+			changes.livres.add(obj.id)
+			if obj in session.new or inspect(obj).attrs.titre.history.has_changes():
+				changes.titles.add(obj.id)
+		elif isinstance(obj, (LivreAuteur, LivreOeuvre)):
+			changes.livres.add(obj.livre_id if obj.livre_id is not None else getattr(obj.livre, "id", None))
+		elif isinstance(obj, REF_MODELS) and (obj in session.new or _ref_modified(session, obj)):
+			changes.touch_ref(obj.__tablename__, obj.id)
+	for obj in session.deleted:
+		if isinstance(obj, Livre):
+			changes.deleted_livres.add(obj.id)
+		elif isinstance(obj, (LivreAuteur, LivreOeuvre)):
+			changes.livres.add(obj.livre_id)
+		elif isinstance(obj, REF_MODELS):
+			changes.touch_ref(obj.__tablename__, obj.id, deleted=True)
+	publish(session, changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+	session.info.pop(_INDIRECT_KEY, None)
@@ -0,0 +1,521 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import repeat
+from pathlib import Path
+from typing import Iterable, Optional
+
+from flask import Flask, current_app, url_for
+from markupsafe import Markup, escape
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from ..models.books import Livre
+from ..models.covers import CoverBlob, CoverVariant
+from .images import (
+	EXTENSIONS,
+	Thumbnail,
+	available_formats,
+	content_name,
+	delete_cover_files,
+	make_thumbnails,
+	store_cover_bytes,
+	thumb_path,
+	write_thumbnail,
+)
+from .fragments import invalidate_fragments
+from .response_cache import bump_catalog_version
+
+
+log = logging.getLogger(__name__)
+
+PLACEHOLDER = "img/placeholders/cover-256.png"
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending: set[Future] = set()
+
+# stem of a content-addressed cover (see images.content_name)
+CONTENT_HASH = re.compile(r"[0-9a-f]{32}")
+# sizes generated on demand: multiples of 16 up to COVER_MAX_SIZE
+SIZE_STEP = 16
+
+_cache_lock = threading.Lock()
+_cache_files: dict[str, int] = {}
+
+# session.info keys: covers whose last reference went, covers retained with their bytes
+_RELEASED_KEY = "covers.released"
+_RETAINED_KEY = "covers.retained"
+
+
+def _get_executor(workers: int) -> ThreadPoolExecutor:
+	global _executor
+	with _executor_lock:
+		if _executor is None:
+			_executor = ThreadPoolExecutor(workers, thread_name_prefix="thumbs")
+		return _executor
+
+
+def generate_thumbnails(filename: str) -> bool:
+	"""Make every THUMB_SIZES x format thumbnail of a cover file, then mark its livres ready.
+
+	The variants' dimensions and weights are recorded in cover_variant. Every
+	livre pointing at `filename` is marked, so a cover shared by a whole
+	series is processed once.
+	"""
+	config = current_app.config
+	try:
+		thumbs = make_thumbnails(
+			config["UPLOAD_FOLDER"],
+			filename,
+			config["THUMB_ROOT"],
+			config["THUMB_SIZES"],
+			available_formats(config["THUMB_FORMATS"]),
+		)
+	except Exception:
+		log.exception("Thumbnails failed for %s", filename)
+		return False
+	record_thumbnails(filename, thumbs)
+	db.session.commit()
+	return True
+
+
+def record_thumbnails(filename: str, thumbs: list[Thumbnail]) -> None:
+	"""Replace the cover_variant rows of a cover and mark its livres ready (not committed).
+
+	A bulk update, unseen by the catalog events: the page cache version is bumped here.
+	"""
+	db.session.execute(delete(CoverVariant).where(CoverVariant.filename == filename))
+	db.session.execute(insert(CoverVariant), [
+		{"filename": filename, "size": t.size, "format": t.format, "width": t.width, "height": t.height, "bytes": t.bytes}
+		for t in thumbs
+	])
+	db.session.execute(
+		update(Livre)
+		.where(Livre.lien_couverture == filename)
+		# not an edit of the book: keep updated_at
+		.values(couverture_prete=True, updated_at=Livre.updated_at)
+		.execution_options(synchronize_session=False)
+	)
+	bump_catalog_version()
+
+
+def has_thumbnails(filename: str) -> bool:
+	return db.session.scalar(select(CoverVariant.id).where(CoverVariant.filename == filename).limit(1)) is not None
+
+
+def retain_cover(filename: str, data: Optional[bytes] = None) -> None:
+	"""Count one more livre using a stored cover file.
+
+	Given the cover's bytes, the file is written again if the release of its
+	last other user removed it meanwhile (now, and after the commit).
+	"""
+	retained = db.session.execute(
+		update(CoverBlob).where(CoverBlob.filename == filename).values(refcount=CoverBlob.refcount + 1)
+	)
+	if data is not None:
+		_restore_blob(filename, data)
+		db.session.info.setdefault(_RETAINED_KEY, {})[filename] = data
+	if not retained.rowcount:
+		path = Path(current_app.config["UPLOAD_FOLDER"]) / filename
+		db.session.execute(insert(CoverBlob).values(
+			filename=filename, refcount=1, bytes=path.stat().st_size if path.exists() else None,
+		))
+
+
+def _restore_blob(filename: str, data: bytes) -> None:
+	upload_dir = current_app.config["UPLOAD_FOLDER"]
+	if not (Path(upload_dir) / filename).exists():
+		store_cover_bytes(data, Path(filename).suffix.lstrip("."), upload_dir)
+
+
+def release_cover(filename: Optional[str]) -> None:
+	"""Count one livre less; the last one removes the file, its thumbnails and their metadata.
+
+	Files are removed once the transaction commits, and only if no livre took
+	the cover again in between.
+	"""
+	if not filename:
+		return
+	db.session.execute(
+		update(CoverBlob).where(CoverBlob.filename == filename).values(refcount=CoverBlob.refcount - 1)
+	)
+	unused = db.session.execute(delete(CoverBlob).where(CoverBlob.filename == filename, CoverBlob.refcount <= 0))
+	if unused.rowcount:
+		db.session.execute(delete(CoverVariant).where(CoverVariant.filename == filename))
+		db.session.info.setdefault(_RELEASED_KEY, set()).add(filename)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+	if session.in_nested_transaction():
+		return
+	retained = session.info.pop(_RETAINED_KEY, {})
+	released = session.info.pop(_RELEASED_KEY, set()) - retained.keys()
+	if released:
+		# another transaction may have retained the cover since: re-check committed counts
+		with db.engine.connect() as connection:
+			used = set(connection.execute(
+				select(CoverBlob.filename).where(CoverBlob.filename.in_(released), CoverBlob.refcount > 0)
+			).scalars())
+		config = current_app.config
+		for filename in released - used:
+			delete_cover_files(filename, config["UPLOAD_FOLDER"], config["THUMB_ROOT"], config["COVER_CACHE_FOLDER"])
+	# a concurrent release may have removed the file before this commit
+	for filename, data in retained.items():
+		_restore_blob(filename, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+	if not session.in_nested_transaction():
+		session.info.pop(_RELEASED_KEY, None)
+		session.info.pop(_RETAINED_KEY, None)
+
+
+def set_cover(livre: Livre, filename: Optional[str], data: Optional[bytes] = None) -> bool:
+	"""Point a livre at a stored cover (or none), keeping reference counts.
+
+	`data`, the cover's bytes when just uploaded, lets retain_cover restore a
+	file removed by a concurrent release.
+
+	Returns True when thumbnails still have to be made (`schedule_thumbnails`
+	after the commit); a cover already used by another livre is ready at once.
+	"""
+	previous = livre.lien_couverture
+	if filename == previous:
+		return False
+	if filename:
+		retain_cover(filename, data)
+	release_cover(previous)
+	livre.lien_couverture = filename
+	livre.couverture_prete = bool(filename) and has_thumbnails(filename)
+	return bool(filename) and not livre.couverture_prete
+
+
+def recount_covers() -> None:
+	"""Rebuild cover_blob reference counts from the livres (after bulk changes)."""
+	counts = {
+		filename: count
+		for filename, count in db.session.execute(
+			select(Livre.lien_couverture, func.count()).where(Livre.lien_couverture.is_not(None)).group_by(Livre.lien_couverture)
+		)
+	}
+	known = set(db.session.scalars(select(CoverBlob.filename)))
+	for filename in known - counts.keys():
+		db.session.execute(update(CoverBlob).where(CoverBlob.filename == filename).values(refcount=0))
+	for filename, count in counts.items():
+		if filename in known:
+			db.session.execute(update(CoverBlob).where(CoverBlob.filename == filename).values(refcount=count))
+		else:
+			db.session.execute(insert(CoverBlob).values(filename=filename, refcount=count))
+
+
+def rehash_covers() -> tuple[int, int, int]:
+	"""Move covers stored under random names to content-addressed storage.
+
+	Each legacy file is hashed, stored once under its content name (identical
+	covers collapse into one blob) and removed with its old thumbnails; the
+	livres are repointed and reference counts rebuilt. Committed per file, so
+	an interrupted run can simply be restarted.
+	Returns (files moved, duplicates merged, missing files).
+	"""
+	upload_dir = current_app.config["UPLOAD_FOLDER"]
+	legacy = db.session.scalars(
+		select(Livre.lien_couverture).where(Livre.lien_couverture.is_not(None), Livre.lien_couverture.not_like("%/%")).distinct()
+	).all()
+	moved = merged = missing = 0
+	for old in legacy:
+		path = Path(upload_dir) / old
+		if not path.exists():
+			missing += 1
+			continue
+		data, ext = path.read_bytes(), path.suffix.lstrip(".").lower()
+		merged += (Path(upload_dir) / content_name(data, ext)).exists()
+		new = store_cover_bytes(data, ext, upload_dir)
+		ready = has_thumbnails(new)
+		db.session.execute(
+			update(Livre).where(Livre.lien_couverture == old)
+			.values(lien_couverture=new, couverture_prete=ready, updated_at=Livre.updated_at)
+			.execution_options(synchronize_session=False)
+		)
+		db.session.execute(delete(CoverBlob).where(CoverBlob.filename == old))
+		db.session.execute(delete(CoverVariant).where(CoverVariant.filename == old))
+		bump_catalog_version()
+		db.session.commit()
+		delete_cover_files(old, upload_dir, current_app.config["THUMB_ROOT"], current_app.config["COVER_CACHE_FOLDER"])
+		moved += 1
+	recount_covers()
+	invalidate_fragments()
+	db.session.commit()
+	return moved, merged, missing
+
+
+@dataclass
+class CoverAudit:
+	"""Cover files on disk compared with the livres referencing them."""
+	files: int = 0
+	# stored files no livre points at / livre references without a file
+	orphans: list[str] = field(default_factory=list)
+	missing: list[str] = field(default_factory=list)
+	# referenced files whose thumbnails are missing, older than the file, or not recorded
+	stale: list[str] = field(default_factory=list)
+
+
+def _thumbnails_current(filename: str, mtime: float, thumb_root: str, sizes: Iterable[int], formats: Iterable[str]) -> bool:
+	for size in sizes:
+		for fmt in (None, *formats):
+			try:
+				if thumb_path(thumb_root, size, filename, fmt).stat().st_mtime < mtime:
+					return False
+			except FileNotFoundError:
+				return False
+	return True
+
+
+def audit_covers(full: bool = False) -> CoverAudit:
+	"""Walk UPLOAD_FOLDER and compare it with Livre.lien_couverture.
+
+	`stale` lists the covers to (re)make: all referenced files with `full`,
+	otherwise those with a thumbnail missing (new THUMB_SIZES/THUMB_FORMATS),
+	older than the cover file, or without cover_variant rows.
+	"""
+	config = current_app.config
+	upload_dir = Path(config["UPLOAD_FOLDER"])
+	on_disk = {}
+	for root, _, names in os.walk(upload_dir):
+		for name in names:
+			if not name.startswith("."):  # .<name>.<uuid>.tmp: write in progress
+				path = Path(root) / name
+				on_disk[path.relative_to(upload_dir).as_posix()] = path.stat().st_mtime
+	referenced = set(db.session.scalars(select(Livre.lien_couverture).where(Livre.lien_couverture.is_not(None)).distinct()))
+	recorded = set(db.session.scalars(select(CoverVariant.filename).distinct()))
+	sizes = config["THUMB_SIZES"]
+	formats = available_formats(config["THUMB_FORMATS"])
+
+	audit = CoverAudit(files=len(on_disk))
+	audit.orphans = sorted(on_disk.keys() - referenced)
+	audit.missing = sorted(referenced - on_disk.keys())
+	audit.stale = sorted(
+		filename for filename in referenced & on_disk.keys()
+		if full or filename not in recorded
+		or not _thumbnails_current(filename, on_disk[filename], config["THUMB_ROOT"], sizes, formats)
+	)
+	return audit
+
+
+def _thumbnail_job(upload_dir: str, filename: str, thumb_root: str, sizes: tuple, formats: tuple) -> Optional[list[Thumbnail]]:
+	# runs in a pool process: formats are resolved there (registers the AVIF plugin)
+	try:
+		return make_thumbnails(upload_dir, filename, thumb_root, sizes, available_formats(formats))
+	except Exception:
+		log.exception("Thumbnails failed for %s", filename)
+		return None
+
+
+def rebuild_thumbnails(filenames: list[str], workers: int = 0, commit_every: int = 100) -> tuple[int, int]:
+	"""Remake the thumbnails of `filenames` across `workers` processes (inline when <= 1).
+
+	Images are decoded and encoded in the pool; cover_variant rows are written
+	here and committed every `commit_every` covers, so an interrupted run keeps
+	its progress and the next incremental audit skips it.
+	Returns (covers done, failures).
+	"""
+	config = current_app.config
+	upload_dir, thumb_root = config["UPLOAD_FOLDER"], config["THUMB_ROOT"]
+	sizes, formats = tuple(config["THUMB_SIZES"]), tuple(config["THUMB_FORMATS"])
+	pool = None
+	if workers <= 1:
+		results = ((f, _thumbnail_job(upload_dir, f, thumb_root, sizes, formats)) for f in filenames)
+	else:
+		# spawn: forked children would inherit the app's database connections
+		pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+		results = zip(filenames, pool.map(
+			_thumbnail_job, repeat(upload_dir), filenames, repeat(thumb_root), repeat(sizes), repeat(formats), chunksize=8,
+		))
+	done = failed = 0
+	try:
+		for filename, thumbs in results:
+			if thumbs is None:
+				failed += 1
+				continue
+			record_thumbnails(filename, thumbs)
+			done += 1
+			if done % commit_every == 0:
+				db.session.commit()
+		# variants may differ while covers stay ready: rendered <picture>s are stale
+		invalidate_fragments()
+		db.session.commit()
+	finally:
+		if pool is not None:
+			pool.shutdown(cancel_futures=True)
+	return done, failed
+
+
+def _run(app: Flask, filename: str) -> None:
+	with app.app_context():
+		generate_thumbnails(filename)
+
+
+def schedule_thumbnails(filename: str) -> None:
+	"""Queue thumbnail generation for a committed cover (inline when THUMB_WORKERS is 0).
+
+	Until it is done, `cover_url` serves the placeholder.
+	"""
+	workers = current_app.config["THUMB_WORKERS"]
+	if workers <= 0:
+		generate_thumbnails(filename)
+		return
+	future = _get_executor(workers).submit(_run, current_app._get_current_object(), filename)
+	_pending.add(future)
+	future.add_done_callback(_pending.discard)
+
+
+def wait_for_thumbnails(timeout: Optional[float] = None) -> None:
+	"""Block until the queued thumbnails are written (tests, CLI)."""
+	wait(list(_pending), timeout=timeout)
+
+
+def cover_url(livre: Livre, size: int = 256, fmt: Optional[str] = None) -> str:
+	"""Thumbnail URL (files blueprint) of the closest configured size, or the placeholder while not ready."""
+	if not livre.lien_couverture or not livre.couverture_prete:
+		return url_for("static", filename=PLACEHOLDER)
+	sizes = current_app.config["THUMB_SIZES"]
+	size = min((s for s in sizes if s >= size), default=max(sizes))
+	name = livre.lien_couverture if fmt is None else Path(livre.lien_couverture).with_suffix(f".{EXTENSIONS[fmt.upper()]}").as_posix()
+	return url_for("files.thumbnail", size=size, filename=name)
+
+
+def source_file(filename: str) -> Optional[Path]:
+	"""Stored cover behind a thumbnail name (same relative path and stem, any extension)."""
+	rel = Path(filename)
+	if rel.is_absolute() or ".." in rel.parts:
+		return None
+	folder = Path(current_app.config["UPLOAD_FOLDER"]) / rel.parent
+	return next((p for p in sorted(folder.glob(f"{rel.stem}.*")) if not p.name.startswith(".")), None)
+
+
+def thumbnail_file(size: int, filename: str) -> Optional[Path]:
+	"""File for /files/thumbs/<size>/<filename>, made on demand if missing.
+
+	Thumbnails written by `generate_thumbnails` are used as they are. Other
+	sizes (multiples of SIZE_STEP up to COVER_MAX_SIZE) and formats are rendered
+	on the first request into COVER_CACHE_FOLDER, which keeps at most
+	COVER_CACHE_MAX_FILES files (oldest removed first). None for an unknown
+	cover, size or format.
+	"""
+	config = current_app.config
+	made = thumb_path(config["THUMB_ROOT"], size, filename)
+	if made.is_file():
+		return made
+	if size <= 0 or size % SIZE_STEP or size > config["COVER_MAX_SIZE"]:
+		return None
+	source = source_file(filename)
+	if source is None:
+		return None
+	ext = Path(filename).suffix.lstrip(".").lower()
+	if ext == source.suffix.lstrip(".").lower():
+		fmt = None
+	else:
+		fmt = next((f for f in available_formats(config["THUMB_FORMATS"]) if EXTENSIONS[f] == ext), None)
+		if fmt is None:
+			return None
+	cached = thumb_path(config["COVER_CACHE_FOLDER"], size, filename)
+	if not cached.is_file():
+		write_thumbnail(source, size, fmt, cached)
+		_count_cached(config["COVER_CACHE_FOLDER"], config["COVER_CACHE_MAX_FILES"])
+	return cached
+
+
+def _count_cached(root: str, max_files: int) -> None:
+	"""Count one more on-demand thumbnail; over the limit, drop the oldest tenth."""
+	with _cache_lock:
+		if root in _cache_files:
+			_cache_files[root] += 1
+		else:
+			_cache_files[root] = sum(len(files) for _, _, files in os.walk(root))
+		if _cache_files[root] <= max_files:
+			return
+		paths = sorted(
+			(p for p in Path(root).rglob("*") if p.is_file()),
+			key=lambda p: p.stat().st_mtime,
+		)
+		keep = max_files - max_files // 10
+		for p in paths[:max(len(paths) - keep, 0)]:
+			p.unlink(missing_ok=True)
+		_cache_files[root] = min(len(paths), keep)
+
+
+def cover_etag(filename: str, size: Optional[int] = None) -> Optional[str]:
+	"""Strong ETag of a content-addressed cover (or one of its thumbnails); None for legacy names."""
+	rel = Path(filename)
+	if not CONTENT_HASH.fullmatch(rel.stem):
+		return None
+	return f"{rel.stem}-{size or 'orig'}-{rel.suffix.lstrip('.')}"
+
+
+def cover_variants(filenames: Iterable[Optional[str]]) -> dict[str, list[CoverVariant]]:
+	"""Thumbnails of several covers in one query (catalog pages), smallest first."""
+	names = {f for f in filenames if f}
+	found: dict[str, list[CoverVariant]] = {name: [] for name in names}
+	if names:
+		for v in db.session.scalars(
+			select(CoverVariant).where(CoverVariant.filename.in_(names)).order_by(CoverVariant.size)
+		):
+			found[v.filename].append(v)
+	return found
+
+
+def cover_picture(livre: Livre, sizes: str, variants: Optional[dict] = None, **attrs) -> Markup:
+	"""<picture> with one srcset per format (AVIF, WebP, then the cover's own), for a box of `sizes`.
+
+	`variants` is `cover_variants(...)` for the page's books; without it the
+	livre's variants are queried on their own. Falls back to a plain <img>
+	(placeholder, or covers made before variants were recorded).
+	"""
+	if variants is None:
+		variants = cover_variants([livre.lien_couverture]) if livre.couverture_prete else {}
+	own = variants.get(livre.lien_couverture) if livre.couverture_prete else None
+	img_attrs = "".join(f' {k.rstrip("_")}="{escape(v)}"' for k, v in attrs.items())
+	if not own:
+		return Markup(f'<img src="{escape(cover_url(livre))}"{img_attrs}>')
+
+	by_format: dict[str, list[CoverVariant]] = {}
+	for v in own:
+		by_format.setdefault(v.format, []).append(v)
+
+	def srcset(fmt: str, original: bool) -> str:
+		return ", ".join(
+			f"{cover_url(livre, v.size, None if original else fmt)} {v.width}w" for v in by_format[fmt]
+		)
+
+	ext = Path(livre.lien_couverture).suffix.lstrip(".").lower()
+	source_format = "jpeg" if ext in ("jpg", "jpeg") else ext
+	if source_format not in by_format:
+		return Markup(f'<img src="{escape(cover_url(livre))}"{img_attrs}>')
+	sources = "".join(
+		f'<source type="image/{fmt}" srcset="{escape(srcset(fmt, False))}" sizes="{escape(sizes)}">'
+		for fmt in ("avif", "webp")
+		if fmt in by_format and fmt != source_format
+	)
+	smallest = by_format[source_format][0]
+	return Markup(
+		f'<picture>{sources}<img src="{escape(cover_url(livre, smallest.size))}" '
+		f'srcset="{escape(srcset(source_format, True))}" sizes="{escape(sizes)}" '
+		f'width="{smallest.width}" height="{smallest.height}"{img_attrs}></picture>'
+	)
+
+
+def pending_covers(include_ready: bool = False) -> list[str]:
+	"""Cover files without thumbnails (or all cover files)."""
+	stmt = select(Livre.lien_couverture).where(Livre.lien_couverture.is_not(None)).distinct().order_by(Livre.lien_couverture)
+	if not include_ready:
+		stmt = stmt.where(Livre.couverture_prete.is_(False))
+	return list(db.session.scalars(stmt))
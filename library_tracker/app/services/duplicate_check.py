@@ -1,13 +1,202 @@
 from __future__ import annotations
 
-from typing import Iterable
+import hashlib
+import random
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from flask import current_app
+from sqlalchemy import delete, insert, or_, select, tuple_
+from sqlalchemy.engine import Connection
 
 from ..extensions import db
-from ..models.books import Livre
+from ..models.books import Livre, LivreAuteur
+from ..models.dedup import LivreSignature, LivreTitleKey
+from .catalog_events import CatalogChanges, on_flush
+from .search import tokens
+
+
+ARTICLES = {"le", "la", "les", "l", "un", "une", "des", "the", "a", "an"}
+
+# LSH: BANDS bands of ROWS min-hashes each. Two titles whose trigram sets have
+# Jaccard similarity s share at least one band with probability 1 - (1 - s^ROWS)^BANDS
+# (s=0.5: 0.74, s=0.7: 0.98, s=0.3: 0.24).
+BANDS = 10
+ROWS = 3
+_PRIME = (1 << 61) - 1
+_rnd = random.Random(0x11B7A7)
+_PERMUTATIONS = [(_rnd.randrange(1, _PRIME), _rnd.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+
+def title_key(titre: Optional[str]) -> str:
+	"""Folded words without a leading article ("L'Hypérion" -> "hyperion")."""
+	words = tokens(titre)
+	if len(words) > 1 and words[0] in ARTICLES:
+		words = words[1:]
+	return " ".join(words)
+
+
+def trigrams(key: str) -> set[str]:
+	padded = f"  {key} "
+	return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _hash64(value: str) -> int:
+	return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def band_buckets(key: str) -> list[int]:
+	"""One signed 64-bit bucket per band (fits an SQL BIGINT)."""
+	hashes = [_hash64(t) for t in trigrams(key)]
+	if not hashes:
+		return []
+	signature = [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+	buckets = []
+	for band in range(BANDS):
+		rows = signature[band * ROWS:(band + 1) * ROWS]
+		digest = hashlib.blake2b(repr(rows).encode(), digest_size=8).digest()
+		buckets.append(int.from_bytes(digest, "big", signed=True))
+	return buckets
+
+
+def title_similarity(a: str, b: str) -> float:
+	"""Mean of trigram Jaccard and containment (a title contained in the other scores high)."""
+	return gram_similarity(trigrams(a), trigrams(b))
+
+
+def gram_similarity(ta: set[str], tb: set[str]) -> float:
+	if not ta or not tb:
+		return 0.0
+	common = len(ta & tb)
+	return (common / (len(ta) + len(tb) - common) + common / min(len(ta), len(tb))) / 2
+
+
+def score(titre_sim: float, auteurs: set, other_auteurs: set, editeur_id, other_editeur_id) -> float:
+	"""Combine title, author and editeur evidence into 0..1.
 
+	Signals missing on either side are left out and the weights renormalised,
+	so a bare title can still reach 1.0.
+	"""
+	parts = [(0.6, titre_sim)]
+	if auteurs and other_auteurs:
+		parts.append((0.3, len(auteurs & other_auteurs) / len(auteurs | other_auteurs)))
+	if editeur_id and other_editeur_id:
+		parts.append((0.1, 1.0 if int(editeur_id) == int(other_editeur_id) else 0.0))
+	return sum(w * v for w, v in parts) / sum(w for w, _ in parts)
 
-def find_potential_duplicates(titre: str) -> list[Livre]:
+
+def index_livres(connection: Connection, livre_ids: Iterable[int], chunk_size: int = 500) -> None:
+	"""(Re)compute title keys and LSH bands for the given books."""
+	ids = [i for i in livre_ids if i is not None]
+	for start in range(0, len(ids), chunk_size):
+		chunk = ids[start:start + chunk_size]
+		delete_livres(connection, chunk)
+		keys, bands = [], []
+		for livre_id, titre in connection.execute(select(Livre.id, Livre.titre).where(Livre.id.in_(chunk))):
+			key = title_key(titre)
+			keys.append({"livre_id": livre_id, "title_key": key})
+			bands += [{"livre_id": livre_id, "band": band, "bucket": bucket} for band, bucket in enumerate(band_buckets(key))]
+		if keys:
+			connection.execute(insert(LivreTitleKey.__table__), keys)
+		if bands:
+			connection.execute(insert(LivreSignature.__table__), bands)
+
+
+def delete_livres(connection: Connection, livre_ids: Iterable[int]) -> None:
+	ids = list(livre_ids)
+	if not ids:
+		return
+	connection.execute(delete(LivreTitleKey.__table__).where(LivreTitleKey.livre_id.in_(ids)))
+	connection.execute(delete(LivreSignature.__table__).where(LivreSignature.livre_id.in_(ids)))
+
+
+def rebuild_index(connection: Connection) -> int:
+	connection.execute(delete(LivreTitleKey.__table__))
+	connection.execute(delete(LivreSignature.__table__))
+	ids = list(connection.execute(select(Livre.id)).scalars())
+	index_livres(connection, ids)
+	return len(ids)
+
+
+@on_flush
+def _sync_index(connection: Connection, changes: CatalogChanges) -> None:
+	delete_livres(connection, changes.deleted_livres)
+	# keys depend on the title only: renamed references leave them as they are
+	index_livres(connection, changes.titles)
+
+
+@dataclass
+class DuplicateCandidate:
+	livre_id: int
+	titre: str
+	score: float
+
+
+def duplicate_candidates(
+	titre: str,
+	auteur_ids: Iterable[int] = (),
+	editeur_id: Optional[int] = None,
+	exclude_id: Optional[int] = None,
+	limit: int = 10,
+) -> list[DuplicateCandidate]:
+	"""Books likely to be the same as (titre, auteurs, editeur), best first.
+
+	Candidates come from index lookups only: same title key, title keys starting
+	with this one, or a shared LSH band (at most DUPLICATE_MAX_CANDIDATES rows);
+	they are then scored in Python.
+	"""
+	key = title_key(titre)
+	if not key:
+		return []
+	max_candidates = current_app.config["DUPLICATE_MAX_CANDIDATES"]
+	buckets = list(enumerate(band_buckets(key)))
+	by_key = select(LivreTitleKey.livre_id).where(
+		or_(
+			LivreTitleKey.title_key == key,
+			# prefix as a range so the title_key index is used
+			(LivreTitleKey.title_key > key + " ") & (LivreTitleKey.title_key < key + " \uffff"),
+		)
+	).limit(max_candidates)
+	by_band = select(LivreSignature.livre_id).where(
+		tuple_(LivreSignature.band, LivreSignature.bucket).in_(buckets)
+	).limit(max_candidates)
+	ids = set(db.session.execute(by_key).scalars()) | set(db.session.execute(by_band).scalars())
+	ids.discard(exclude_id)
+	if not ids:
+		return []
+
+	rows = db.session.execute(
+		select(Livre.id, Livre.titre, Livre.editeur_id, LivreTitleKey.title_key)
+		.join(LivreTitleKey, LivreTitleKey.livre_id == Livre.id)
+		.where(Livre.id.in_(ids))
+	).all()
+	other_auteurs: dict[int, set[int]] = {}
+	for livre_id, auteur_id in db.session.execute(
+		select(LivreAuteur.livre_id, LivreAuteur.auteur_id).where(LivreAuteur.livre_id.in_(ids))
+	):
+		other_auteurs.setdefault(livre_id, set()).add(auteur_id)
+
+	auteurs = {int(a) for a in auteur_ids if a}
+	threshold = current_app.config["DUPLICATE_MIN_SCORE"]
+	found = []
+	for livre_id, other_titre, other_editeur_id, other_key in rows:
+		s = score(title_similarity(key, other_key), auteurs, other_auteurs.get(livre_id, set()), editeur_id, other_editeur_id)
+		if s >= threshold:
+			found.append(DuplicateCandidate(livre_id, other_titre, round(s, 3)))
+	found.sort(key=lambda c: (-c.score, c.livre_id))
+	return found[:limit]
+
+
+def find_potential_duplicates(
+	titre: str,
+	auteur_ids: Iterable[int] = (),
+	editeur_id: Optional[int] = None,
+	exclude_id: Optional[int] = None,
+) -> list[Livre]:
 	if not titre:
 		return []
-	q = db.session.query(Livre).filter(Livre.titre.ilike(f"%{titre.strip()}%"))
-	return list(q.limit(10))
+	candidates = duplicate_candidates(titre.strip(), auteur_ids, editeur_id, exclude_id)
+	if not candidates:
+		return []
+	livres = {l.id: l for l in db.session.query(Livre).filter(Livre.id.in_([c.livre_id for c in candidates]))}
+	return [livres[c.livre_id] for c in candidates if c.livre_id in livres]
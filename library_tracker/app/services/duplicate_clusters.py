@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import groupby
+from typing import Callable, Iterable, Iterator, Optional
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, tuple_
+
+from ..extensions import db
+from ..models.core import Auteur
+from ..models.books import Livre, LivreAuteur
+from ..models.dedup import (
+	DuplicateCluster,
+	DuplicateClusterMember,
+	DuplicatePair,
+	DuplicateRun,
+	LivreSignature,
+	LivreTitleKey,
+)
+from .duplicate_check import BANDS, band_buckets, gram_similarity, score, trigrams
+from .search import tokens
+
+
+KINDS = ("livre", "auteur")
+
+# Buckets holding more than MAX_BLOCK records carry little information (a
+# pattern shared by many titles). Their records are compared once, together,
+# as a sorted neighbourhood: each against the next WINDOW ones in key order.
+MAX_BLOCK = 100
+WINDOW = 20
+CROWDED = (BANDS, 0)
+
+# ((band, bucket), record ids): records sharing an LSH bucket
+Block = tuple[tuple[int, int], list[int]]
+# per record: (key, auteur ids, editeur id)
+Features = tuple[str, frozenset, Optional[int]]
+
+
+def auteur_key(prenom: Optional[str], nom: Optional[str]) -> str:
+	"""Folded name words in sorted order ("Hugo, Victor" and "Victor Hugo" match)."""
+	return " ".join(sorted(tokens(f"{prenom or ''} {nom or ''}")))
+
+
+def score_blocks(blocks: list[list[int]], features: dict[int, Features], min_score: float) -> tuple[list[tuple[int, int, float]], int]:
+	"""Pairs scoring at least `min_score` within each block, and the number of comparisons.
+
+	Pure function: runs in the worker processes.
+	"""
+	grams = {i: trigrams(f[0]) for i, f in features.items()}
+	compared: set[tuple[int, int]] = set()
+	pairs = []
+	for block in blocks:
+		members = sorted(block, key=lambda i: (features[i][0], i))
+		span = len(members) if len(members) <= MAX_BLOCK else WINDOW + 1
+		for x, a in enumerate(members):
+			_, auteurs_a, editeur_a = features[a]
+			for b in members[x + 1:x + span]:
+				pair = (a, b) if a < b else (b, a)
+				if pair in compared:
+					continue
+				compared.add(pair)
+				_, auteurs_b, editeur_b = features[b]
+				s = score(gram_similarity(grams[a], grams[b]), auteurs_a, auteurs_b, editeur_a, editeur_b)
+				if s >= min_score:
+					pairs.append((*pair, round(s, 3)))
+	return pairs, len(compared)
+
+
+def _blocks(buckets: Iterable[tuple[tuple[int, int], list[int]]]) -> list[Block]:
+	"""Blocks in bucket order, crowded buckets merged into one last block."""
+	blocks, crowded = [], set()
+	for key, ids in buckets:
+		if len(ids) > MAX_BLOCK:
+			crowded.update(ids)
+		elif len(ids) > 1:
+			blocks.append((key, ids))
+	if len(crowded) > 1:
+		blocks.append((CROWDED, sorted(crowded)))
+	return blocks
+
+
+def _in_chunks(ids: Iterable[int], size: int = 5000) -> Iterator[list[int]]:
+	ids = list(ids)
+	for start in range(0, len(ids), size):
+		yield ids[start:start + size]
+
+
+def livre_blocks() -> list[Block]:
+	"""Books sharing a (band, bucket) of `livre_signature`."""
+	rows = db.session.execute(
+		select(LivreSignature.band, LivreSignature.bucket, LivreSignature.livre_id)
+		.where(tuple_(LivreSignature.band, LivreSignature.bucket).in_(
+			select(LivreSignature.band, LivreSignature.bucket)
+			.group_by(LivreSignature.band, LivreSignature.bucket)
+			.having(func.count() > 1)
+		))
+		.order_by(LivreSignature.band, LivreSignature.bucket, LivreSignature.livre_id)
+	)
+	return _blocks((key, [r[2] for r in group]) for key, group in groupby(rows, key=lambda r: (r[0], r[1])))
+
+
+def livre_features(ids: Iterable[int]) -> dict[int, Features]:
+	keys: dict[int, tuple[str, Optional[int]]] = {}
+	auteurs: dict[int, set[int]] = {}
+	for chunk in _in_chunks(ids):
+		for livre_id, key, editeur_id in db.session.execute(
+			select(LivreTitleKey.livre_id, LivreTitleKey.title_key, Livre.editeur_id)
+			.join(Livre, Livre.id == LivreTitleKey.livre_id)
+			.where(LivreTitleKey.livre_id.in_(chunk))
+		):
+			keys[livre_id] = (key, editeur_id)
+		for livre_id, auteur_id in db.session.execute(
+			select(LivreAuteur.livre_id, LivreAuteur.auteur_id).where(LivreAuteur.livre_id.in_(chunk))
+		):
+			auteurs.setdefault(livre_id, set()).add(auteur_id)
+	return {i: (key, frozenset(auteurs.get(i, ())), editeur_id) for i, (key, editeur_id) in keys.items()}
+
+
+def auteur_blocks() -> list[Block]:
+	"""Authors sharing an LSH bucket of their name key (computed here, authors are few)."""
+	buckets: dict[tuple[int, int], list[int]] = {}
+	for auteur_id, prenom, nom in db.session.execute(select(Auteur.id, Auteur.prenom, Auteur.nom).order_by(Auteur.id)):
+		for band, bucket in enumerate(band_buckets(auteur_key(prenom, nom))):
+			buckets.setdefault((band, bucket), []).append(auteur_id)
+	return _blocks(sorted(buckets.items()))
+
+
+def auteur_features(ids: Iterable[int]) -> dict[int, Features]:
+	features = {}
+	for chunk in _in_chunks(ids):
+		for auteur_id, prenom, nom in db.session.execute(
+			select(Auteur.id, Auteur.prenom, Auteur.nom).where(Auteur.id.in_(chunk))
+		):
+			features[auteur_id] = (auteur_key(prenom, nom), frozenset(), None)
+	return features
+
+
+SOURCES: dict[str, tuple[Callable[[], list[Block]], Callable[[Iterable[int]], dict[int, Features]]]] = {
+	"livre": (livre_blocks, livre_features),
+	"auteur": (auteur_blocks, auteur_features),
+}
+
+
+def _scored_batches(
+	batches: Iterator[tuple[list[Block], dict[int, Features]]],
+	min_score: float,
+	workers: int,
+) -> Iterator[tuple[list[Block], tuple[list, int]]]:
+	"""(batch, score_blocks result) in input order, scored by `workers` processes when > 1."""
+	if workers <= 1:
+		for batch, features in batches:
+			yield batch, score_blocks([ids for _, ids in batch], features, min_score)
+		return
+	# spawn: forked children would inherit the app's database connections
+	pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+	try:
+		pending = deque()
+		for batch, features in batches:
+			pending.append((batch, pool.submit(score_blocks, [ids for _, ids in batch], features, min_score)))
+			if len(pending) >= 2 * workers:
+				batch, future = pending.popleft()
+				yield batch, future.result()
+		while pending:
+			batch, future = pending.popleft()
+			yield batch, future.result()
+	finally:
+		pool.shutdown(cancel_futures=True)
+
+
+def open_run(kind: str, min_score: Optional[float] = None, restart: bool = False) -> DuplicateRun:
+	"""The unfinished run of `kind` with the same threshold, or a new one."""
+	min_score = current_app.config["DUPLICATE_CLUSTER_MIN_SCORE"] if min_score is None else min_score
+	run = db.session.scalars(
+		select(DuplicateRun).where(DuplicateRun.kind == kind).order_by(DuplicateRun.id.desc()).limit(1)
+	).first()
+	if run is None or restart or run.status == "done" or run.min_score != min_score:
+		if run is not None and run.status != "done":
+			run.status = "interrupted"
+		run = DuplicateRun(kind=kind, min_score=min_score, status="running")
+		db.session.add(run)
+	run.status = "running"
+	db.session.commit()
+	return run
+
+
+def cluster_duplicates(
+	kind: str,
+	min_score: Optional[float] = None,
+	workers: Optional[int] = None,
+	batch_blocks: int = 2000,
+	restart: bool = False,
+) -> DuplicateRun:
+	"""Cluster the whole catalog's likely duplicates (books or authors) for review.
+
+	Candidates come from blocking (records sharing an LSH bucket), so the work
+	grows with the number of near-identical records rather than n². Blocks are
+	scored in batches, in parallel across processes; pairs above `min_score`
+	are committed with a checkpoint after every batch, and an interrupted run
+	resumes after its last committed block. Connected pairs (union-find) make
+	the clusters.
+	"""
+	if kind not in SOURCES:
+		raise ValueError(f"Unknown duplicate kind: {kind}")
+	workers = current_app.config["DUPLICATE_CLUSTER_WORKERS"] if workers is None else workers
+	load_blocks, load_features = SOURCES[kind]
+	run = open_run(kind, min_score, restart)
+	started, elapsed = time.perf_counter(), run.elapsed
+
+	blocks = load_blocks()
+	if run.position:
+		checkpoint = (run.last_band, run.last_bucket)
+		blocks = [b for b in blocks if b[0] > checkpoint]
+	seen = set(db.session.execute(
+		select(DuplicatePair.left_id, DuplicatePair.right_id).where(DuplicatePair.run_id == run.id)
+	).tuples())
+
+	def batches() -> Iterator[tuple[list[Block], dict[int, Features]]]:
+		for start in range(0, len(blocks), batch_blocks):
+			batch = blocks[start:start + batch_blocks]
+			yield batch, load_features({i for _, ids in batch for i in ids})
+
+	try:
+		for batch, (pairs, comparisons) in _scored_batches(batches(), run.min_score, workers):
+			new = [(a, b, s) for a, b, s in pairs if (a, b) not in seen]
+			if new:
+				db.session.execute(
+					insert(DuplicatePair.__table__),
+					[{"run_id": run.id, "left_id": a, "right_id": b, "score": s} for a, b, s in new],
+				)
+				seen.update((a, b) for a, b, _ in new)
+			run.position += len(batch)
+			run.last_band, run.last_bucket = batch[-1][0]
+			run.comparisons += comparisons
+			run.elapsed = elapsed + time.perf_counter() - started
+			db.session.commit()
+		write_clusters(run)
+		run.status = "done"
+		run.elapsed = elapsed + time.perf_counter() - started
+		run.finished_at = datetime.utcnow()
+		db.session.commit()
+	except BaseException:
+		db.session.rollback()
+		run.status = "interrupted"
+		run.elapsed = elapsed + time.perf_counter() - started
+		db.session.commit()
+		raise
+	return run
+
+
+def write_clusters(run: DuplicateRun) -> None:
+	"""Replace the run's clusters with the connected components of its pairs.
+
+	A cluster whose members were all dismissed in an earlier run of the same
+	kind starts dismissed.
+	"""
+	parent: dict[int, int] = {}
+
+	def find(x: int) -> int:
+		parent.setdefault(x, x)
+		while parent[x] != x:
+			parent[x] = parent[parent[x]]
+			x = parent[x]
+		return x
+
+	pairs = db.session.execute(
+		select(DuplicatePair.left_id, DuplicatePair.right_id, DuplicatePair.score).where(DuplicatePair.run_id == run.id)
+	).all()
+	for a, b, _ in pairs:
+		ra, rb = find(a), find(b)
+		if ra != rb:
+			parent[max(ra, rb)] = min(ra, rb)
+	members: dict[int, list[int]] = {}
+	for x in list(parent):
+		members.setdefault(find(x), []).append(x)
+	scores: dict[int, list[float]] = {}
+	for a, _, s in pairs:
+		scores.setdefault(find(a), []).append(s)
+
+	dismissed = {
+		frozenset(ids)
+		for ids in _cluster_members(
+			select(DuplicateCluster.id)
+			.join(DuplicateRun, DuplicateRun.id == DuplicateCluster.run_id)
+			.where(DuplicateRun.kind == run.kind, DuplicateCluster.status == "dismissed")
+		).values()
+	}
+	previous = select(DuplicateCluster.id).where(DuplicateCluster.run_id == run.id)
+	db.session.execute(delete(DuplicateClusterMember.__table__).where(DuplicateClusterMember.cluster_id.in_(previous)))
+	db.session.execute(delete(DuplicateCluster.__table__).where(DuplicateCluster.run_id == run.id))
+	for root in sorted(members):
+		ids = sorted(members[root])
+		db.session.add(DuplicateCluster(
+			run_id=run.id,
+			kind=run.kind,
+			size=len(ids),
+			max_score=max(scores[root]),
+			min_score=min(scores[root]),
+			status="dismissed" if frozenset(ids) in dismissed else "pending",
+			members=[DuplicateClusterMember(entity_id=i) for i in ids],
+		))
+	run.clusters = len(members)
+	db.session.flush()
+
+
+def _cluster_members(cluster_ids) -> dict[int, list[int]]:
+	found: dict[int, list[int]] = {}
+	for cluster_id, entity_id in db.session.execute(
+		select(DuplicateClusterMember.cluster_id, DuplicateClusterMember.entity_id)
+		.where(DuplicateClusterMember.cluster_id.in_(cluster_ids))
+		.order_by(DuplicateClusterMember.cluster_id, DuplicateClusterMember.entity_id)
+	):
+		found.setdefault(cluster_id, []).append(entity_id)
+	return found
+
+
+def run_clusters(run: DuplicateRun, limit: Optional[int] = None) -> list[tuple[DuplicateCluster, list[int]]]:
+	"""Clusters of a run with their member ids, largest and strongest first."""
+	stmt = (
+		select(DuplicateCluster)
+		.where(DuplicateCluster.run_id == run.id)
+		.order_by(DuplicateCluster.size.desc(), DuplicateCluster.max_score.desc(), DuplicateCluster.id)
+	)
+	if limit:
+		stmt = stmt.limit(limit)
+	clusters = db.session.scalars(stmt).all()
+	members = _cluster_members([c.id for c in clusters])
+	return [(c, members.get(c.id, [])) for c in clusters]
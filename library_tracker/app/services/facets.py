@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from flask import current_app
+from sqlalchemy import String, cast, delete, func, insert, literal, select, tuple_, union_all, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from ..extensions import db
+from ..models.core import Editeur, Emplacement, Genre, Langue, Serie
+from ..models.books import Livre, livre_genre
+from ..models.facets import FacetCount, LivreFacet
+from .catalog_events import CatalogChanges, on_flush
+from .refdata import get_refs
+
+
+# facet -> (catalog.home query parameter, refdata list naming its values)
+FACETS = {
+	"genre": ("genre_id", "genres"),
+	"editeur": ("editeur_id", "editeurs"),
+	"serie": ("serie_id", "series"),
+	"langue": ("langue_id", "langues"),
+	"zone": ("zone", None),
+}
+
+
+@dataclass
+class FacetValue:
+	value: str
+	label: str
+	count: int
+	selected: bool = False
+	# catalog URL with this value selected (or removed, when selected)
+	url: Optional[str] = None
+
+
+def _facet_rows(livre_ids: Optional[list[int]] = None) -> Select:
+	"""(livre_id, facet, value) of the given books (all books when None).
+
+	Inner joins on the referenced rows: a dangling id is not a facet value.
+	"""
+	def restrict(stmt, column):
+		return stmt if livre_ids is None else stmt.where(column.in_(livre_ids))
+
+	selects = [restrict(
+		select(livre_genre.c.livre_id, literal("genre"), cast(livre_genre.c.genre_id, String))
+		.join(Genre, Genre.id == livre_genre.c.genre_id),
+		livre_genre.c.livre_id,
+	)]
+	for facet, model, column in (
+		("editeur", Editeur, Livre.editeur_id),
+		("serie", Serie, Livre.serie_id),
+		("langue", Langue, Livre.langue_id),
+	):
+		selects.append(restrict(
+			select(Livre.id, literal(facet), cast(column, String)).join(model, model.id == column),
+			Livre.id,
+		))
+	selects.append(restrict(
+		select(Livre.id, literal("zone"), Emplacement.zone)
+		.join(Emplacement, Emplacement.id == Livre.emplacement_id)
+		.where(Emplacement.zone.is_not(None), Emplacement.zone != ""),
+		Livre.id,
+	))
+	return union_all(*selects)
+
+
+def _apply_counts(connection: Connection, delta: Counter) -> None:
+	changed = [(key, n) for key, n in delta.items() if n]
+	for (facet, value), n in changed:
+		updated = connection.execute(
+			update(FacetCount.__table__)
+			.where(FacetCount.facet == facet, FacetCount.value == value)
+			.values(count=FacetCount.count + n)
+		)
+		if not updated.rowcount:
+			connection.execute(insert(FacetCount.__table__).values(facet=facet, value=value, count=n))
+	if changed:
+		connection.execute(delete(FacetCount.__table__).where(
+			tuple_(FacetCount.facet, FacetCount.value).in_([key for key, _ in changed]), FacetCount.count <= 0,
+		))
+
+
+def _current_counts(connection: Connection, livre_ids: list[int]) -> Counter:
+	return Counter({
+		(facet, value): n
+		for facet, value, n in connection.execute(
+			select(LivreFacet.facet, LivreFacet.value, func.count())
+			.where(LivreFacet.livre_id.in_(livre_ids))
+			.group_by(LivreFacet.facet, LivreFacet.value)
+		)
+	})
+
+
+def index_livres(connection: Connection, livre_ids: Iterable[int], chunk_size: int = 500) -> None:
+	"""(Re)compute the facet values of the given books and adjust facet_count by the difference."""
+	ids = [i for i in livre_ids if i is not None]
+	for start in range(0, len(ids), chunk_size):
+		chunk = ids[start:start + chunk_size]
+		delta = Counter()
+		delta.subtract(_current_counts(connection, chunk))
+		connection.execute(delete(LivreFacet.__table__).where(LivreFacet.livre_id.in_(chunk)))
+		rows = [{"livre_id": livre_id, "facet": facet, "value": value} for livre_id, facet, value in connection.execute(_facet_rows(chunk))]
+		if rows:
+			connection.execute(insert(LivreFacet.__table__), rows)
+		delta.update((r["facet"], r["value"]) for r in rows)
+		_apply_counts(connection, delta)
+
+
+def delete_livres(connection: Connection, livre_ids: Iterable[int]) -> None:
+	ids = list(livre_ids)
+	if not ids:
+		return
+	delta = Counter()
+	delta.subtract(_current_counts(connection, ids))
+	connection.execute(delete(LivreFacet.__table__).where(LivreFacet.livre_id.in_(ids)))
+	_apply_counts(connection, delta)
+
+
+def rebuild_facets(connection: Connection) -> int:
+	"""Recompute livre_facet and facet_count from scratch (set-based). Returns the number of facet rows."""
+	connection.execute(delete(LivreFacet.__table__))
+	connection.execute(delete(FacetCount.__table__))
+	connection.execute(insert(LivreFacet.__table__).from_select(["livre_id", "facet", "value"], _facet_rows()))
+	connection.execute(insert(FacetCount.__table__).from_select(
+		["facet", "value", "count"],
+		select(LivreFacet.facet, LivreFacet.value, func.count()).group_by(LivreFacet.facet, LivreFacet.value),
+	))
+	return connection.execute(select(func.count()).select_from(LivreFacet.__table__)).scalar_one()
+
+
+@on_flush
+def _sync_facets(connection: Connection, changes: CatalogChanges) -> None:
+	delete_livres(connection, changes.deleted_livres)
+	index_livres(connection, changes.livres)
+
+
+def facet_counts(livre_ids: Optional[Select] = None, limit: Optional[int] = None) -> dict[str, list[FacetValue]]:
+	"""Most frequent values of each facet with their book counts, best first.
+
+	Without `livre_ids` (a select of Livre.id: the current filtered query) the
+	counts come from facet_count, one indexed top-`limit` read per facet;
+	otherwise from one grouped scan of livre_facet for those books.
+	"""
+	limit = current_app.config["FACET_LIMIT"] if limit is None else limit
+	found: dict[str, list[tuple[str, int]]] = {facet: [] for facet in FACETS}
+	if livre_ids is None:
+		for facet in FACETS:
+			found[facet] = list(db.session.execute(
+				select(FacetCount.value, FacetCount.count)
+				.where(FacetCount.facet == facet, FacetCount.count > 0)
+				.order_by(FacetCount.count.desc(), FacetCount.value)
+				.limit(limit)
+			))
+	else:
+		for facet, value, n in db.session.execute(
+			select(LivreFacet.facet, LivreFacet.value, func.count())
+			.where(LivreFacet.livre_id.in_(livre_ids))
+			.group_by(LivreFacet.facet, LivreFacet.value)
+		):
+			found[facet].append((value, n))
+		for facet, values in found.items():
+			values.sort(key=lambda v: (-v[1], v[0]))
+			del values[limit:]
+
+	facets = {}
+	for facet, values in found.items():
+		refs = FACETS[facet][1]
+		labels = {str(r["id"]): r["nom"] for r in get_refs(refs)} if refs else {}
+		facets[facet] = [FacetValue(value, labels.get(value, value), n) for value, n in values]
+	return facets
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable, Optional
+
+from flask import current_app
+from markupsafe import Markup
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+
+from ..extensions import db
+from ..models.summary import LivreSummary
+from .cache import bump_version, cache_version, get_cache
+
+
+VERSION_NAME = "fragments"
+
+
+class Fragments(dict):
+	"""Cached HTML by livre id, with the current stamp of every requested book."""
+
+	def __init__(self, kind: str, stamps: dict[int, str]) -> None:
+		super().__init__()
+		self.kind = kind
+		self.stamps = stamps
+
+
+def _key(kind: str, livre_id: int, generation: int) -> str:
+	return f"fragment:{generation}:{kind}:{livre_id}"
+
+
+def _stamp(livre: Any, revision: int) -> str:
+	# livre_summary.revision moves whenever the book or a row it references
+	# changes (in the writing transaction, seen by every process); cover
+	# readiness changes by bulk update, outside the summary
+	return f"{revision}|{livre.updated_at.isoformat()}|{livre.lien_couverture or ''}|{int(bool(livre.couverture_prete))}"
+
+
+def get_fragments(kind: str, livres: Iterable[Any]) -> Fragments:
+	"""Cached HTML of the given books still matching their stamp, by id.
+
+	One read of livre_summary revisions, one cache read.
+	"""
+	livres = list(livres)
+	if not current_app.config["FRAGMENT_CACHE"] or not livres:
+		return Fragments(kind, {})
+	revisions = {
+		livre_id: revision for livre_id, revision in db.session.execute(
+			select(LivreSummary.livre_id, LivreSummary.revision).where(LivreSummary.livre_id.in_([l.id for l in livres]))
+		)
+	}
+	fragments = Fragments(kind, {l.id: _stamp(l, revisions[l.id]) for l in livres if l.id in revisions})
+	generation = cache_version(VERSION_NAME)
+	wanted = {_key(kind, livre_id, generation): livre_id for livre_id in fragments.stamps}
+	for key, (stamp, html) in get_cache().get_many(list(wanted)).items():
+		livre_id = wanted[key]
+		if stamp == fragments.stamps[livre_id]:
+			fragments[livre_id] = Markup(html)
+	return fragments
+
+
+def cached_fragment(kind: str, livre: Any, found: Optional[Fragments] = None, caller: Callable = None) -> Markup:
+	"""Jinja call block: the fragment from `found` (get_fragments), else its body rendered and stored.
+
+		{% call cached_fragment("row", livre, rows) %}...{% endcall %}
+	"""
+	if found is not None and livre.id in found:
+		return found[livre.id]
+	html = caller()
+	stamp = found.stamps.get(livre.id) if found is not None else None
+	if stamp is not None:
+		get_cache().set(
+			_key(kind, livre.id, cache_version(VERSION_NAME)),
+			(stamp, str(html)),
+			ttl=current_app.config["FRAGMENT_CACHE_TTL"],
+		)
+	return Markup(html)
+
+
+def invalidate_fragments(connection: Optional[Connection] = None) -> None:
+	"""Drop every fragment when the current transaction commits (covers re-rendered in bulk)."""
+	bump_version(connection if connection is not None else db.session.connection(), VERSION_NAME)
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import hashlib
 import imghdr
+import importlib.util
 import os
 import uuid
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterable, Optional
 
 from PIL import Image
 from werkzeug.utils import secure_filename
@@ -21,14 +24,31 @@ def guess_extension(file_bytes: bytes) -> Optional[str]:
 	return kind
 
 
-def save_image_and_thumbnail(
-	*,
-	file_storage,
-	upload_dir: str,
-	thumb_dir: str,
-	allowed_ext: set[str],
-	max_side: int = 256,
-) -> Tuple[str, str]:
+def content_name(data: bytes, ext: str) -> str:
+	"""Content-addressed relative path: BLAKE2b-128 of the bytes, sharded on
+	its first two bytes ("3f/a0/3fa0...e1.jpg") to keep directories small."""
+	digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+	return f"{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+
+
+def store_cover_bytes(data: bytes, ext: str, upload_dir: str) -> str:
+	"""Write `data` under its content name unless that blob already exists."""
+	name = content_name(data, ext)
+	path = Path(upload_dir) / name
+	if not path.exists():
+		path.parent.mkdir(parents=True, exist_ok=True)
+		# write then rename: a concurrent upload of the same bytes never sees a partial file
+		tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+		tmp.write_bytes(data)
+		os.replace(tmp, path)
+	return name
+
+
+def save_cover(*, file_storage, upload_dir: str, allowed_ext: set[str]) -> str:
+	"""Validate and store an uploaded cover; returns its content-addressed name.
+
+	Identical images share one file. Thumbnails are made separately.
+	"""
 	filename = secure_filename(file_storage.filename or "")
 	original_bytes = file_storage.read()
 	file_storage.stream.seek(0)
@@ -36,34 +56,118 @@ def save_image_and_thumbnail(
 	ext = guess_extension(original_bytes) or (filename.rsplit(".", 1)[1].lower() if "." in filename else None)
 	if not ext or ext not in allowed_ext:
 		raise ValueError("Format d'image non autorisé.")
+	return store_cover_bytes(original_bytes, ext, upload_dir)
+
+
+# Pillow format name -> file extension; encoder settings per format
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "AVIF": "avif", "GIF": "gif"}
+SAVE_OPTIONS = {
+	"JPEG": {"quality": 82, "optimize": True, "progressive": True},
+	"PNG": {"optimize": True},
+	"WEBP": {"quality": 78, "method": 4},
+	"AVIF": {"quality": 55, "speed": 6},
+}
 
-	uid = uuid.uuid4().hex
-	base_name = f"{uid}.{ext}"
 
-	upload_path = Path(upload_dir)
-	upload_path.mkdir(parents=True, exist_ok=True)
-	thumb_path = Path(thumb_dir)
-	thumb_path.mkdir(parents=True, exist_ok=True)
+@dataclass
+class Thumbnail:
+	size: int
+	format: str
+	width: int
+	height: int
+	bytes: int
+	path: Path
 
-	image_path = upload_path / base_name
-	thumb_file_path = thumb_path / base_name
 
-	file_storage.save(image_path.as_posix())
+def available_formats(formats: Iterable[str]) -> list[str]:
+	"""Pillow format names among `formats` ("webp", "avif") this install can encode.
 
-	# Generate thumbnail
-	with Image.open(image_path.as_posix()) as img:
-		img.thumbnail((max_side, max_side))
-		img.save(thumb_file_path.as_posix())
+	AVIF needs Pillow >= 11.3 or the optional pillow-avif-plugin package.
+	"""
+	Image.init()
+	wanted = [f.strip().upper() for f in formats if f.strip()]
+	if "AVIF" in wanted and "AVIF" not in Image.SAVE and importlib.util.find_spec("pillow_avif"):
+		import pillow_avif  # noqa: F401  registers the AVIF encoder
+	return [f for f in wanted if f in Image.SAVE and f in EXTENSIONS]
 
-	return image_path.name, thumb_file_path.name
+
+def thumb_path(thumb_root: str, size: int, filename: str, fmt: Optional[str] = None) -> Path:
+	"""Thumbnail file: the cover's relative path, with the extension of `fmt` if given."""
+	name = Path(filename) if fmt is None else Path(filename).with_suffix(f".{EXTENSIONS[fmt]}")
+	return Path(thumb_root) / str(size) / name
+
+
+def _encodable(img: Image.Image, fmt: str) -> Image.Image:
+	"""`img` in a mode the `fmt` encoder accepts."""
+	if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+		return img.convert("RGB")
+	if fmt in ("WEBP", "AVIF") and img.mode not in ("RGB", "RGBA"):
+		return img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+	return img
+
+
+def make_thumbnails(
+	upload_dir: str,
+	filename: str,
+	thumb_root: str,
+	sizes: Iterable[int],
+	formats: Iterable[str] = (),
+) -> list[Thumbnail]:
+	"""Write one thumbnail per size (longest side) in the cover's format and in each of `formats`.
+
+	The image is decoded once; JPEG decoding goes through `Image.draft()`,
+	which lets the decoder scale down by 1/2..1/8 while reading instead of
+	decoding every full-size pixel.
+	"""
+	sizes = sorted(set(sizes), reverse=True)
+	written = []
+	with Image.open(Path(upload_dir) / filename) as img:
+		source_format = img.format
+		img.draft("RGB", (sizes[0], sizes[0]))
+		img = img.copy()
+		variants = [(source_format, None)] + [(f, f) for f in formats if f != source_format]
+		# largest first: each size is reduced from the previous one
+		for size in sizes:
+			img.thumbnail((size, size), reducing_gap=3.0)
+			for fmt, suffix in variants:
+				out = _encodable(img, fmt)
+				path = thumb_path(thumb_root, size, filename, suffix)
+				path.parent.mkdir(parents=True, exist_ok=True)
+				out.save(path, format=fmt, **SAVE_OPTIONS.get(fmt, {}))
+				written.append(Thumbnail(size, fmt.lower(), out.width, out.height, path.stat().st_size, path))
+	return written
+
+
+def write_thumbnail(source: Path, size: int, fmt: Optional[str], dest: Path) -> None:
+	"""One thumbnail of `source` (in its own format when `fmt` is None), written atomically to `dest`."""
+	with Image.open(source) as img:
+		fmt = fmt or img.format
+		img.draft("RGB", (size, size))
+		img = img.copy()
+	img.thumbnail((size, size), reducing_gap=3.0)
+	dest.parent.mkdir(parents=True, exist_ok=True)
+	tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.tmp")
+	try:
+		_encodable(img, fmt).save(tmp, format=fmt, **SAVE_OPTIONS.get(fmt, {}))
+		os.replace(tmp, dest)
+	finally:
+		tmp.unlink(missing_ok=True)
 
 
-def delete_cover_files(filename: Optional[str], upload_dir: str, thumb_dir: str) -> None:
+def delete_cover_files(filename: Optional[str], upload_dir: str, *thumb_roots: str) -> None:
 	if not filename:
 		return
 	try:
-		for base in [upload_dir, thumb_dir]:
-			p = Path(base) / filename
+		paths = [Path(upload_dir) / filename]
+		rel = Path(filename)
+		for thumb_root in thumb_roots:
+			if not Path(thumb_root).is_dir():
+				continue
+			# the cover's own name plus its other-format variants (same stem)
+			for d in Path(thumb_root).iterdir():
+				if d.is_dir():
+					paths += (d / rel.parent).glob(f"{rel.stem}.*")
+		for p in paths:
 			if p.exists():
 				p.unlink(missing_ok=True)
 	except Exception:
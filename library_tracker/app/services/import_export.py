@@ -1,12 +1,35 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, Tuple
+import csv
+import hashlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import chain, islice
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
+from uuid import uuid4
+
+from flask import current_app, g
+from sqlalchemy import delete, insert, select, update
 
 from ..extensions import db
 from ..models.core import Auteur, Editeur, Langue, Genre, Serie, Emplacement
-from ..models.books import Livre, LivreAuteur
+from ..models.books import Livre, LivreAuteur, livre_genre
 from ..models.anthologies import Oeuvre, LivreOeuvre
+from ..models.imports import ImportRun
+from .catalog_events import CatalogChanges, publish
+from .loading import loader_options
+from .summary import iter_summary_rows
 
 
 @dataclass
@@ -15,128 +38,751 @@ class ImportResult:
 	updated: int = 0
 	skipped: int = 0
 	errors: list[str] = None
+	elapsed: float = 0.0
 
 	def __post_init__(self) -> None:
 		if self.errors is None:
 			self.errors = []
 
+	@property
+	def rows(self) -> int:
+		return self.created + self.updated + self.skipped
 
-def _get_or_create(model, defaults=None, **kwargs):
-	obj = db.session.query(model).filter_by(**kwargs).first()
-	if obj:
-		return obj, False
-	obj = model(**{**kwargs, **(defaults or {})})
-	db.session.add(obj)
-	return obj, True
+	@property
+	def rows_per_second(self) -> float:
+		return self.rows / self.elapsed if self.elapsed else 0.0
 
 
-def import_books_from_csv(rows: Iterable[dict]) -> ImportResult:
-	"""Import books from dictionaries, creating missing reference data.
+@dataclass
+class BookRecord:
+	"""One CSV row, parsed and normalised (no database access)."""
+	line: int
+	titre: str
+	editeur: Optional[str] = None
+	langue: Optional[str] = None
+	serie: Optional[str] = None
+	numero_serie: Optional[int] = None
+	emplacement: Optional[tuple] = None  # (zone, colonne, etage)
+	genres: list[str] = field(default_factory=list)
+	auteurs: list[tuple] = field(default_factory=list)  # (prenom, nom, role)
+	oeuvres: list[tuple] = field(default_factory=list)  # (ordre, titre, pages)
 
-	Columns expected similar to export: id, titre, editeur, langue, serie, numero_serie, emplacement,
-	"auteurs" ("Nom Prenom (role); ..."), "genres" ("Genre1, Genre2"), "oeuvres" ("1 Title (pages); ...").
+
+def _clean(value) -> Optional[str]:
+	return (value or "").strip() or None
+
+
+def parse_emplacement(value: Optional[str]) -> Optional[tuple]:
+	"""Parse "zone C{colonne} E{etage}" or "C{colonne} E{etage}"."""
+	if not value:
+		return None
+	zone = None
+	col = None
+	etg = None
+	for p in value.split():
+		if p.startswith("C") and p[1:].isdigit():
+			col = int(p[1:])
+		elif p.startswith("E"):
+			etg = p[1:]
+		else:
+			zone = (zone + " " + p).strip() if zone else p
+	if col is None or etg is None:
+		return None
+	return zone, col, etg
+
+
+def parse_auteurs(value: Optional[str]) -> list[tuple]:
+	"""Parse "Prenom Nom (role); Nom (role); ..." into (prenom, nom, role)."""
+	auteurs = []
+	seen = set()
+	for part in [p.strip() for p in (value or "").split(";") if p.strip()]:
+		role = None
+		if part.endswith(")") and "(" in part:
+			name, role = part.rsplit("(", 1)
+			part = name.strip()
+			role = role[:-1].strip() or None
+		names = part.split()
+		if not names:
+			continue
+		nom = names[-1]
+		prenom = " ".join(names[:-1]) if len(names) > 1 else None
+		if (nom, prenom) in seen:
+			continue
+		seen.add((nom, prenom))
+		auteurs.append((prenom, nom, role))
+	return auteurs
+
+
+def parse_oeuvres(value: Optional[str]) -> list[tuple]:
+	"""Parse "1 Title (pages); Title; ..." into (ordre, titre, pages)."""
+	oeuvres = []
+	seen = set()
+	for o in [p.strip() for p in (value or "").split(";") if p.strip()]:
+		ordre = None
+		pages = None
+		if ")" in o and "(" in o:
+			t, pages = o.rsplit("(", 1)
+			pages = pages[:-1].strip() or None
+			o = t.strip()
+		first, _, rest = o.partition(" ")
+		if first.isdigit() and rest:
+			ordre = int(first)
+			o = rest.strip()
+		if o and o not in seen:
+			seen.add(o)
+			oeuvres.append((ordre, o, pages))
+	return oeuvres
+
+
+def parse_row(row: dict, line: int) -> Optional[BookRecord]:
+	"""Normalise one CSV dict; returns None for rows without a title."""
+	titre = _clean(row.get("titre"))
+	if not titre:
+		return None
+	numero_serie = row.get("numero_serie") or None
+	return BookRecord(
+		line=line,
+		titre=titre,
+		editeur=_clean(row.get("editeur")),
+		langue=_clean(row.get("langue")),
+		serie=_clean(row.get("serie")),
+		numero_serie=int(numero_serie) if str(numero_serie).isdigit() else None,
+		emplacement=parse_emplacement(_clean(row.get("emplacement"))),
+		genres=list(dict.fromkeys(g.strip() for g in (row.get("genres") or "").split(",") if g.strip())),
+		auteurs=parse_auteurs(row.get("auteurs")),
+		oeuvres=parse_oeuvres(row.get("oeuvres")),
+	)
+
+
+# kind -> (model, natural key columns); small tables are loaded once up front,
+# auteurs/oeuvres are resolved per chunk with IN queries.
+REF_KINDS = {
+	"editeur": (Editeur, ("nom",)),
+	"langue": (Langue, ("nom",)),
+	"serie": (Serie, ("nom",)),
+	"genre": (Genre, ("nom",)),
+	"emplacement": (Emplacement, ("zone", "colonne", "etage")),
+	"auteur": (Auteur, ("nom", "prenom")),
+	"oeuvre": (Oeuvre, ("titre",)),
+}
+PRELOADED = ("editeur", "langue", "serie", "genre", "emplacement")
+
+
+class RefResolver:
+	"""Maps natural keys (nom, (zone, colonne, etage), ...) to ids in memory.
+
+	Missing entities are inserted in bulk, one INSERT ... RETURNING per kind and
+	chunk, instead of one SELECT (+ INSERT) per value and row.
 	"""
-	res = ImportResult()
-	for row in rows:
+
+	def __init__(self) -> None:
+		self.ids: dict[str, dict[tuple, int]] = {kind: {} for kind in REF_KINDS}
+		self.created: dict[str, set[int]] = {}
+		for kind in PRELOADED:
+			self._load(kind)
+
+	def _load(self, kind: str, keys: Optional[set] = None) -> None:
+		model, columns = REF_KINDS[kind]
+		cols = [getattr(model, c) for c in columns]
+		stmt = select(model.id, *cols).order_by(model.id)
+		if keys is not None:
+			stmt = stmt.where(cols[0].in_({k[0] for k in keys}))
+		known = self.ids[kind]
+		for row in db.session.execute(stmt):
+			key = tuple(row[1:])
+			if keys is None or key in keys:
+				known.setdefault(key, row[0])
+
+	def resolve(self, kind: str, keys: set) -> None:
+		missing = {k for k in keys if k not in self.ids[kind]}
+		if not missing:
+			return
+		if kind not in PRELOADED:
+			self._load(kind, missing)
+			missing = {k for k in missing if k not in self.ids[kind]}
+		if not missing:
+			return
+		model, columns = REF_KINDS[kind]
+		stmt = insert(model).returning(model.id, *(getattr(model, c) for c in columns))
+		rows = db.session.execute(stmt, [dict(zip(columns, key)) for key in missing])
+		for row in rows:
+			self.ids[kind][tuple(row[1:])] = row[0]
+			self.created.setdefault(model.__tablename__, set()).add(row[0])
+
+	def get(self, kind: str, key: Optional[tuple]) -> Optional[int]:
+		return self.ids[kind].get(key) if key is not None else None
+
+	def forget(self) -> None:
+		"""Drop per-chunk lookups (authors, oeuvres) so memory stays bounded."""
+		for kind in REF_KINDS:
+			if kind not in PRELOADED:
+				self.ids[kind].clear()
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+	it = iter(iterable)
+	while chunk := list(islice(it, size)):
+		yield chunk
+
+
+@dataclass
+class ParsedChunk:
+	records: list[BookRecord]
+	skipped: int
+	errors: list[str]
+	last_line: int
+
+
+def parse_chunk(lines: list[tuple[int, dict]]) -> ParsedChunk:
+	"""Parse (line, row) pairs; pure, so it can run in a worker process."""
+	parsed = ParsedChunk([], 0, [], lines[-1][0])
+	for line, row in lines:
 		try:
-			title = (row.get("titre") or "").strip()
-			if not title:
-				res.skipped += 1
-				continue
-
-			editeur_name = (row.get("editeur") or "").strip() or None
-			langue_name = (row.get("langue") or "").strip() or None
-			serie_name = (row.get("serie") or "").strip() or None
-			numero_serie = row.get("numero_serie") or None
-			numero_serie = int(numero_serie) if str(numero_serie).isdigit() else None
-			emp = (row.get("emplacement") or "").strip() or None
-
-			editeur = None
-			if editeur_name:
-				editeur, _ = _get_or_create(Editeur, nom=editeur_name)
-			langue = None
-			if langue_name:
-				langue, _ = _get_or_create(Langue, nom=langue_name)
-			serie = None
-			if serie_name:
-				serie, _ = _get_or_create(Serie, nom=serie_name)
-			emplacement = None
-			if emp:
-				# expected format: "zone C{colonne} E{etage}" or "C{colonne} E{etage}"
-				zone = None
-				col = None
-				etg = None
-				parts = emp.split()
-				for p in parts:
-					if p.startswith("C") and p[1:].isdigit():
-						col = int(p[1:])
-					elif p.startswith("E"):
-						etg = p[1:]
-					else:
-						zone = (zone + " " + p).strip() if zone else p
-				if col is not None and etg is not None:
-					emplacement, _ = _get_or_create(Emplacement, colonne=col, etage=etg, zone=zone)
-
-			livre = db.session.query(Livre).filter(Livre.titre == title).first()
-			created = False
-			if not livre:
-				livre = Livre(titre=title)
-				db.session.add(livre)
-				created = True
-
-			livre.editeur = editeur
-			livre.langue = langue
-			livre.serie = serie
-			livre.numero_serie = numero_serie
-			livre.emplacement = emplacement
-
-			# genres
-			genres_list = [g.strip() for g in (row.get("genres") or "").split(",") if g.strip()]
-			livre.genres = []
-			for gname in genres_list:
-				g, _ = _get_or_create(Genre, nom=gname)
-				livre.genres.append(g)
-
-			# auteurs: "Prenom Nom (role); ..." or "Nom (role)"
-			auteurs_val = row.get("auteurs") or ""
-			livre.livre_auteurs.clear()
-			for part in [p.strip() for p in auteurs_val.split(";") if p.strip()]:
-				role = None
-				if part.endswith(")") and "(" in part:
-					name, role = part.rsplit("(", 1)
-					part = name.strip()
-					role = role[:-1].strip()
-				names = part.split()
-				nom = names[-1]
-				prenom = " ".join(names[:-1]) if len(names) > 1 else None
-				auteur, _ = _get_or_create(Auteur, nom=nom, prenom=prenom)
-				livre.livre_auteurs.append(LivreAuteur(auteur=auteur, role=role))
-
-			# oeuvres: "1 Title (pages); ..."
-			livre.livre_oeuvres.clear()
-			for o in [p.strip() for p in (row.get("oeuvres") or "").split(";") if p.strip()]:
-				ordre = None
-				pages = None
-				if ")" in o and "(" in o:
-					t, pages = o.rsplit("(", 1)
-					pages = pages[:-1].strip()
-					o = t.strip()
-				if o and o[0].isdigit():
-					first, _, rest = o.partition(" ")
-					if first.isdigit():
-						ordre = int(first)
-						o = rest
-					oeuvre, _ = _get_or_create(Oeuvre, titre=o)
-					livre.livre_oeuvres.append(LivreOeuvre(livre=livre, oeuvre=oeuvre, ordre=ordre, pages=pages))
-
-			if created:
-				res.created += 1
-			else:
-				res.updated += 1
+			record = parse_row(row, line)
 		except Exception as exc:
-			res.errors.append(str(exc))
+			parsed.errors.append(f"Ligne {line}: {exc}")
+			parsed.skipped += 1
+			continue
+		if record is None:
+			parsed.skipped += 1
+		else:
+			parsed.records.append(record)
+	return parsed
+
+
+def parse_chunks(lines: Iterable[tuple[int, dict]], chunk_size: int, workers: int = 0) -> Iterator[ParsedChunk]:
+	"""Parsed chunks in input order, computed by `workers` processes when > 1.
+
+	At most 2 * workers chunks are in flight, so a slow writer keeps memory
+	bounded. Inputs of a single chunk are parsed inline (no pool start-up).
+	"""
+	chunks = _chunks(lines, chunk_size)
+	head = list(islice(chunks, 2))
+	if workers <= 1 or len(head) < 2:
+		yield from map(parse_chunk, head)
+		yield from map(parse_chunk, chunks)
+		return
+	# spawn: forked children would inherit the app's database connections
+	pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+	try:
+		pending = deque()
+		for chunk in chain(head, chunks):
+			pending.append(pool.submit(parse_chunk, chunk))
+			if len(pending) >= 2 * workers:
+				yield pending.popleft().result()
+		while pending:
+			yield pending.popleft().result()
+	finally:
+		pool.shutdown(cancel_futures=True)
+
+
+def _write_chunk(records: list[BookRecord], resolver: RefResolver, res: ImportResult) -> CatalogChanges:
+	"""Upsert one chunk of parsed books with set-based statements."""
+	resolver.resolve("editeur", {(r.editeur,) for r in records if r.editeur})
+	resolver.resolve("langue", {(r.langue,) for r in records if r.langue})
+	resolver.resolve("serie", {(r.serie,) for r in records if r.serie})
+	resolver.resolve("emplacement", {r.emplacement for r in records if r.emplacement})
+	resolver.resolve("genre", {(g,) for r in records for g in r.genres})
+	resolver.resolve("auteur", {(nom, prenom) for r in records for prenom, nom, _ in r.auteurs})
+	resolver.resolve("oeuvre", {(titre,) for r in records for _, titre, _ in r.oeuvres})
+
+	# existing books are matched on exact title (first by id, as before)
+	titles = {r.titre for r in records}
+	existing: dict[str, int] = {}
+	for livre_id, titre in db.session.execute(select(Livre.id, Livre.titre).where(Livre.titre.in_(titles)).order_by(Livre.id)):
+		existing.setdefault(titre, livre_id)
+
+	# last row wins when a title repeats; repeats count as updates
+	final: dict[str, BookRecord] = {}
+	for r in records:
+		if r.titre in existing or r.titre in final:
+			res.updated += 1
+		else:
+			res.created += 1
+		final[r.titre] = r
+
+	now = datetime.utcnow()
+
+	def values(r: BookRecord) -> dict:
+		return {
+			"editeur_id": resolver.get("editeur", (r.editeur,) if r.editeur else None),
+			"langue_id": resolver.get("langue", (r.langue,) if r.langue else None),
+			"serie_id": resolver.get("serie", (r.serie,) if r.serie else None),
+			"numero_serie": r.numero_serie,
+			"emplacement_id": resolver.get("emplacement", r.emplacement),
+			"updated_at": now,
+		}
+
+	ids: dict[str, int] = {}
+	new = [r for t, r in final.items() if t not in existing]
+	if new:
+		stmt = insert(Livre).returning(Livre.id, Livre.titre)
+		for livre_id, titre in db.session.execute(stmt, [{"titre": r.titre, "created_at": now, **values(r)} for r in new]):
+			ids[titre] = livre_id
+	updated = [r for t, r in final.items() if t in existing]
+	if updated:
+		db.session.execute(update(Livre), [{"id": existing[r.titre], **values(r)} for r in updated])
+		ids.update({r.titre: existing[r.titre] for r in updated})
+		# relations are replaced wholesale, as the row-by-row importer did
+		updated_ids = [existing[r.titre] for r in updated]
+		for stmt in (
+			delete(LivreAuteur).where(LivreAuteur.livre_id.in_(updated_ids)),
+			delete(LivreOeuvre).where(LivreOeuvre.livre_id.in_(updated_ids)),
+			livre_genre.delete().where(livre_genre.c.livre_id.in_(updated_ids)),
+		):
+			db.session.execute(stmt, execution_options={"synchronize_session": False})
+
+	genre_rows, auteur_rows, oeuvre_rows = [], [], []
+	for titre, r in final.items():
+		livre_id = ids[titre]
+		genre_rows += [{"livre_id": livre_id, "genre_id": resolver.get("genre", (g,))} for g in r.genres]
+		auteur_rows += [
+			{"livre_id": livre_id, "auteur_id": resolver.get("auteur", (nom, prenom)), "role": role}
+			for prenom, nom, role in r.auteurs
+		]
+		oeuvre_rows += [
+			{"livre_id": livre_id, "oeuvre_id": resolver.get("oeuvre", (o,)), "ordre": ordre, "pages": pages}
+			for ordre, o, pages in r.oeuvres
+		]
+	# Core inserts: the ORM bulk path splits executemany batches on NULL roles/pages
+	for table, values_list in (
+		(livre_genre, genre_rows),
+		(LivreAuteur.__table__, auteur_rows),
+		(LivreOeuvre.__table__, oeuvre_rows),
+	):
+		if values_list:
+			db.session.execute(table.insert(), values_list)
+
+	# existing books are matched on their title: only new ones bring a title
+	return CatalogChanges(livres=set(ids.values()), titles={ids[r.titre] for r in new})
+
+
+def _write_records(records: list[BookRecord], resolver: RefResolver, res: ImportResult) -> RefResolver:
+	"""Write `records` in a savepoint; when the database rejects them, write each
+	half again, so only the failing rows are skipped, each reported by line.
+
+	Returns the resolver to go on with (a fresh one after a rollback).
+	"""
+	counts = (res.created, res.updated)
+	savepoint = db.session.begin_nested()
+	try:
+		changes = _write_chunk(records, resolver, res)
+		for table, ids in resolver.created.items():
+			changes.refs.setdefault(table, set()).update(ids)
+		publish(db.session, changes)
+		savepoint.commit()
+	except Exception as exc:
+		savepoint.rollback()
+		# ids inserted in the rolled back savepoint are gone
+		resolver = RefResolver()
+		res.created, res.updated = counts
+		if len(records) == 1:
 			res.skipped += 1
-		db.session.flush()
+			res.errors.append(f"Ligne {records[0].line}: {exc}")
+		else:
+			middle = len(records) // 2
+			resolver = _write_records(records[:middle], resolver, res)
+			resolver = _write_records(records[middle:], resolver, res)
+	resolver.created = {}
+	return resolver
+
+
+def import_books_from_csv(
+	rows: Iterable[dict],
+	chunk_size: Optional[int] = None,
+	run: Optional[ImportRun] = None,
+	parse_workers: Optional[int] = None,
+) -> ImportResult:
+	"""Import books from dictionaries, creating missing reference data.
+
+	Columns expected similar to export: id, titre, editeur, langue, serie, numero_serie, emplacement,
+	"auteurs" ("Nom Prenom (role); ..."), "genres" ("Genre1, Genre2"), "oeuvres" ("1 Title (pages); ...").
+
+	Rows are parsed, then written `chunk_size` at a time (IMPORT_CHUNK_SIZE by
+	default) with bulk INSERT/UPDATE statements; reference data is resolved in
+	memory. A chunk that fails at the database level is split until the failing
+	rows are isolated: those are skipped with one error per line.
+	With `parse_workers` > 1 (IMPORT_PARSE_WORKERS) parsing runs in a process
+	pool ahead of this single writer.
+
+	Without `run` everything is committed at the end. With `run` the import
+	streams: each chunk is committed together with the run's checkpoint and the
+	session is emptied, and `rows` must start at `run.position`.
+	"""
+	chunk_size = chunk_size or current_app.config["IMPORT_CHUNK_SIZE"]
+	if run is None:
+		res = ImportResult()
+		position = 0
+	else:
+		res = run_result(run)
+		position = run.position
+	elapsed = res.elapsed
+	started = time.perf_counter()
+	resolver = RefResolver()
+
+	parse_workers = current_app.config["IMPORT_PARSE_WORKERS"] if parse_workers is None else parse_workers
+	lines = enumerate(rows, start=position + 2)  # line 1 is the CSV header
+	for parsed in parse_chunks(lines, chunk_size, parse_workers):
+		records = parsed.records
+		res.skipped += parsed.skipped
+		res.errors.extend(parsed.errors)
+
+		if records:
+			resolver = _write_records(records, resolver, res)
+			resolver.forget()
+
+		res.elapsed = elapsed + time.perf_counter() - started
+		if run is not None:
+			_checkpoint(run, res, parsed.last_line - 1)
 
 	db.session.commit()
+	res.elapsed = elapsed + time.perf_counter() - started
 	return res
+
+
+def run_result(run: ImportRun) -> ImportResult:
+	return ImportResult(run.created, run.updated, run.skipped, run.errors, run.elapsed)
+
+
+def _checkpoint(run: ImportRun, res: ImportResult, position: int) -> None:
+	run.position = position
+	run.created, run.updated, run.skipped = res.created, res.updated, res.skipped
+	run.errors = res.errors
+	run.elapsed = res.elapsed
+	db.session.commit()
+	# keep the identity map from growing with the file; the logged-in user (web
+	# imports) and the run itself stay attached
+	keep = (run, g.get("_login_user"))
+	for obj in list(db.session):
+		if not any(obj is k for k in keep):
+			db.session.expunge(obj)
+
+
+def file_digest(path: str) -> str:
+	h = hashlib.sha256()
+	with open(path, "rb") as fh:
+		for block in iter(lambda: fh.read(1 << 20), b""):
+			h.update(block)
+	return h.hexdigest()
+
+
+def store_import_file(stream: BinaryIO) -> str:
+	"""Save an uploaded CSV under IMPORT_FOLDER, named after its content hash."""
+	folder = Path(current_app.config["IMPORT_FOLDER"])
+	folder.mkdir(parents=True, exist_ok=True)
+	h = hashlib.sha256()
+	tmp = folder / f".upload-{uuid4().hex}"
+	with open(tmp, "wb") as fh:
+		for block in iter(lambda: stream.read(1 << 20), b""):
+			h.update(block)
+			fh.write(block)
+	path = folder / f"{h.hexdigest()}.csv"
+	os.replace(tmp, path)
+	return path.as_posix()
+
+
+def count_records(path: str) -> int:
+	with open(path, newline="", encoding="utf-8") as fh:
+		# DictReader skips blank lines too
+		return max(sum(1 for row in csv.reader(fh) if row) - 1, 0)
+
+
+def open_import(
+	path: str,
+	filename: Optional[str] = None,
+	resume: bool = True,
+	status: str = "running",
+) -> ImportRun:
+	"""Return the unfinished run for this file's content (when resuming) or a new one.
+
+	`status="queued"` hands the run to the background worker instead.
+	"""
+	digest = file_digest(path)
+	run = None
+	if resume:
+		run = (
+			db.session.query(ImportRun)
+			.filter(ImportRun.source_hash == digest, ImportRun.status != "done")
+			.order_by(ImportRun.id.desc())
+			.first()
+		)
+	if run is None:
+		run = ImportRun(filename=filename or Path(path).name, source_path=path, source_hash=digest)
+		db.session.add(run)
+	if status == "queued" and run.status == "running":
+		# already being processed by a worker
+		return run
+	run.source_path = path
+	run.status = status
+	run.message = None
+	db.session.commit()
+	return run
+
+
+def run_import(run: ImportRun, chunk_size: Optional[int] = None, parse_workers: Optional[int] = None) -> ImportResult:
+	"""Stream `run.source_path` from its checkpoint; the run records the outcome."""
+	run.status = "running"
+	if run.total is None:
+		run.total = count_records(run.source_path)
+	db.session.commit()
+	try:
+		with open(run.source_path, newline="", encoding="utf-8") as fh:
+			reader = csv.DictReader(fh)
+			res = import_books_from_csv(islice(reader, run.position, None), chunk_size, run=run, parse_workers=parse_workers)
+	except BaseException as exc:
+		db.session.rollback()
+		run.status = "interrupted" if isinstance(exc, KeyboardInterrupt) else "failed"
+		run.message = str(exc) or exc.__class__.__name__
+		db.session.commit()
+		raise
+	run.status = "done"
+	run.finished_at = datetime.utcnow()
+	db.session.commit()
+	return res
+
+
+EXPORT_COLUMNS = [
+	"id", "titre", "editeur", "langue", "serie", "numero_serie", "emplacement",
+	"auteurs", "genres", "oeuvres",
+]
+
+
+def iter_export_livres(batch_size: Optional[int] = None) -> Iterator[Livre]:
+	"""All books by id, fetched `batch_size` at a time with their relations batch-loaded.
+
+	yield_per streams rows from the cursor (server-side on Postgres) and runs
+	the selectin loads once per batch, so memory is bounded by the batch size.
+	"""
+	batch_size = batch_size or current_app.config["EXPORT_BATCH_SIZE"]
+	stmt = select(Livre).options(*loader_options("export")).order_by(Livre.id).execution_options(yield_per=batch_size)
+	yield from db.session.scalars(stmt)
+
+
+def stream_csv(batch_size: Optional[int] = None) -> Iterator[str]:
+	"""CSV export as text chunks of `batch_size` rows, header first.
+
+	Rows are read from livre_summary alone, already formatted.
+	"""
+	batch_size = batch_size or current_app.config["EXPORT_BATCH_SIZE"]
+	buffer = io.StringIO()
+	writer = csv.writer(buffer)
+	writer.writerow(EXPORT_COLUMNS)
+	yield buffer.getvalue()
+	for chunk in _chunks(iter_summary_rows(batch_size), batch_size):
+		buffer.seek(0)
+		buffer.truncate()
+		writer.writerows(chunk)
+		yield buffer.getvalue()
+
+
+def livre_record(l: Livre) -> dict:
+	"""Nested representation used by the JSON Lines and columnar exports."""
+	emplacement = l.emplacement
+	return {
+		"id": l.id,
+		"titre": l.titre,
+		"editeur": l.editeur.nom if l.editeur else None,
+		"langue": l.langue.nom if l.langue else None,
+		"serie": l.serie.nom if l.serie else None,
+		"numero_serie": l.numero_serie,
+		"emplacement": (
+			{"zone": emplacement.zone, "colonne": emplacement.colonne, "etage": emplacement.etage}
+			if emplacement else None
+		),
+		"auteurs": [
+			{"id": la.auteur.id, "prenom": la.auteur.prenom, "nom": la.auteur.nom, "alias": la.auteur.alias, "role": la.role}
+			for la in l.livre_auteurs
+		],
+		"genres": [g.nom for g in l.genres],
+		"oeuvres": [
+			{"id": lo.oeuvre.id, "titre": lo.oeuvre.titre, "ordre": lo.ordre, "pages": lo.pages}
+			for lo in sorted(l.livre_oeuvres, key=lambda x: (x.ordre or 0))
+		],
+		"lien_couverture": l.lien_couverture,
+		"created_at": l.created_at,
+		"updated_at": l.updated_at,
+	}
+
+
+class ExportUnavailable(RuntimeError):
+	"""The export format needs an optional dependency that is not installed."""
+
+
+@dataclass(frozen=True)
+class Exporter:
+	name: str
+	label: str
+	mimetype: str
+	extension: str
+	# batch_size -> byte chunks
+	stream: Callable[[Optional[int]], Iterator[bytes]]
+	# optional module the format depends on
+	requires: Optional[str] = None
+
+	@property
+	def available(self) -> bool:
+		return self.requires is None or importlib.util.find_spec(self.requires) is not None
+
+
+EXPORTERS: dict[str, Exporter] = {}
+
+
+def exporter(name: str, label: str, mimetype: str, extension: str, requires: Optional[str] = None):
+	"""Register a streaming export format under `name` (/export/<name>, `flask export <name>`)."""
+	def register(stream):
+		EXPORTERS[name] = Exporter(name, label, mimetype, extension, stream, requires)
+		return stream
+	return register
+
+
+def get_exporter(name: str) -> Exporter:
+	exp = EXPORTERS[name]
+	if not exp.available:
+		raise ExportUnavailable(f"Export {exp.label}: module {exp.requires} requis (pip install {exp.requires})")
+	return exp
+
+
+@exporter("csv", "CSV", "text/csv", "csv")
+def _export_csv(batch_size: Optional[int] = None) -> Iterator[bytes]:
+	for chunk in stream_csv(batch_size):
+		yield chunk.encode("utf-8")
+
+
+def _json_default(value):
+	if isinstance(value, datetime):
+		return value.isoformat()
+	raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+@exporter("jsonl", "JSON Lines", "application/x-ndjson", "jsonl")
+def _export_jsonl(batch_size: Optional[int] = None) -> Iterator[bytes]:
+	batch_size = batch_size or current_app.config["EXPORT_BATCH_SIZE"]
+	for chunk in _chunks(iter_export_livres(batch_size), batch_size):
+		yield "".join(
+			json.dumps(livre_record(l), ensure_ascii=False, default=_json_default) + "\n" for l in chunk
+		).encode("utf-8")
+
+
+class _ByteSink(io.RawIOBase):
+	"""Write-only file handing out what was written so far (tell() keeps counting)."""
+
+	def __init__(self) -> None:
+		self._parts: list[bytes] = []
+		self._size = 0
+
+	def writable(self) -> bool:
+		return True
+
+	def write(self, data) -> int:
+		data = bytes(data)
+		self._parts.append(data)
+		self._size += len(data)
+		return len(data)
+
+	def tell(self) -> int:
+		return self._size
+
+	def drain(self) -> bytes:
+		data = b"".join(self._parts)
+		self._parts = []
+		return data
+
+
+def _arrow_schema():
+	import pyarrow as pa
+
+	return pa.schema([
+		("id", pa.int64()),
+		("titre", pa.string()),
+		("editeur", pa.string()),
+		("langue", pa.string()),
+		("serie", pa.string()),
+		("numero_serie", pa.int32()),
+		("emplacement", pa.struct([("zone", pa.string()), ("colonne", pa.int32()), ("etage", pa.string())])),
+		("auteurs", pa.list_(pa.struct([
+			("id", pa.int64()), ("prenom", pa.string()), ("nom", pa.string()), ("alias", pa.string()), ("role", pa.string()),
+		]))),
+		("genres", pa.list_(pa.string())),
+		("oeuvres", pa.list_(pa.struct([
+			("id", pa.int64()), ("titre", pa.string()), ("ordre", pa.int32()), ("pages", pa.string()),
+		]))),
+		("lien_couverture", pa.string()),
+		("created_at", pa.timestamp("us")),
+		("updated_at", pa.timestamp("us")),
+	])
+
+
+@exporter("parquet", "Parquet", "application/vnd.apache.parquet", "parquet", requires="pyarrow")
+def _export_parquet(batch_size: Optional[int] = None) -> Iterator[bytes]:
+	"""One Parquet row group per batch, same nested layout as the JSON Lines export."""
+	import pyarrow as pa
+	import pyarrow.parquet as pq
+
+	batch_size = batch_size or current_app.config["EXPORT_BATCH_SIZE"]
+	schema = _arrow_schema()
+	sink = _ByteSink()
+	with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+		for chunk in _chunks(iter_export_livres(batch_size), batch_size):
+			writer.write_table(pa.Table.from_pylist([livre_record(l) for l in chunk], schema=schema))
+			yield sink.drain()
+	yield sink.drain()
+
+
+# left out of snapshots: credentials, import and duplicate-review bookkeeping
+SNAPSHOT_EXCLUDED = (
+	"user", "role", "user_role", "import_run", "livre_change", "cache_version",
+	"duplicate_run", "duplicate_pair", "duplicate_cluster", "duplicate_cluster_member",
+)
+
+
+def write_sqlite_snapshot(path: str, batch_size: Optional[int] = None) -> None:
+	"""Write a consistent copy of the catalog to a new SQLite file.
+
+	SQLite databases are copied with the online backup API (a single
+	read-consistent pass); other engines are copied table by table inside one
+	REPEATABLE READ transaction. The full-text index is rebuilt in the copy.
+	"""
+	batch_size = batch_size or current_app.config["EXPORT_BATCH_SIZE"]
+	Path(path).unlink(missing_ok=True)
+	if db.engine.dialect.name == "sqlite":
+		source = db.engine.raw_connection()
+		try:
+			target = sqlite3.connect(path)
+			source.driver_connection.backup(target)
+			for table in SNAPSHOT_EXCLUDED:
+				target.execute(f'DROP TABLE IF EXISTS "{table}"')
+			target.commit()
+			target.execute("VACUUM")
+			target.close()
+		finally:
+			source.close()
+		return
+
+	from sqlalchemy import create_engine
+
+	from .search import rebuild_index
+
+	tables = [t for t in db.metadata.sorted_tables if t.name not in SNAPSHOT_EXCLUDED]
+	target_engine = create_engine(f"sqlite:///{path}")
+	try:
+		db.metadata.create_all(target_engine, tables=tables)
+		with db.engine.connect().execution_options(isolation_level="REPEATABLE READ") as source, target_engine.begin() as target:
+			for table in tables:
+				result = source.execution_options(yield_per=batch_size).execute(table.select())
+				for rows in result.partitions():
+					target.execute(table.insert(), [row._asdict() for row in rows])
+			rebuild_index(target)
+	finally:
+		target_engine.dispose()
+
+
+@exporter("sqlite", "SQLite", "application/vnd.sqlite3", "db")
+def _export_sqlite(batch_size: Optional[int] = None) -> Iterator[bytes]:
+	fd, path = tempfile.mkstemp(suffix=".db", prefix="livres-snapshot-")
+	os.close(fd)
+	try:
+		write_sqlite_snapshot(path, batch_size)
+		with open(path, "rb") as fh:
+			yield from iter(lambda: fh.read(1 << 20), b"")
+	finally:
+		Path(path).unlink(missing_ok=True)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import or_, select, update
+
+from ..extensions import db
+from ..models.imports import ImportRun
+from .import_export import open_import, run_import, run_result, store_import_file
+
+
+log = logging.getLogger(__name__)
+
+
+def enqueue_import(stream, filename: str) -> ImportRun:
+	"""Store an uploaded CSV and queue it for `flask import-worker`.
+
+	Re-uploading a file whose import was interrupted re-queues the same run,
+	which then resumes from its checkpoint.
+	"""
+	return open_import(store_import_file(stream), filename, status="queued")
+
+
+def claim_next(worker_id: str) -> Optional[ImportRun]:
+	"""Atomically take the oldest queued run, or a running one whose worker went silent.
+
+	Runs touch `updated_at` at every chunk checkpoint; a run left "running"
+	for longer than IMPORT_JOB_TIMEOUT seconds is considered abandoned and is
+	resumed from its checkpoint.
+	"""
+	stale = datetime.utcnow() - timedelta(seconds=current_app.config["IMPORT_JOB_TIMEOUT"])
+	claimable = or_(
+		ImportRun.status == "queued",
+		(ImportRun.status == "running") & (ImportRun.updated_at < stale),
+	)
+	while True:
+		candidate = db.session.execute(
+			select(ImportRun.id, ImportRun.status, ImportRun.updated_at).where(claimable).order_by(ImportRun.id).limit(1)
+		).first()
+		if candidate is None:
+			db.session.commit()
+			return None
+		# compare-and-set on the row we saw: a concurrent worker makes rowcount 0
+		claimed = db.session.execute(
+			update(ImportRun)
+			.where(
+				ImportRun.id == candidate.id,
+				ImportRun.status == candidate.status,
+				ImportRun.updated_at == candidate.updated_at,
+			)
+			.values(status="running", message=f"worker {worker_id}", updated_at=datetime.utcnow())
+			.execution_options(synchronize_session=False)
+		)
+		db.session.commit()
+		if claimed.rowcount:
+			return db.session.get(ImportRun, candidate.id, populate_existing=True)
+
+
+def job_status(run: ImportRun) -> dict:
+	res = run_result(run)
+	return {
+		"id": run.id,
+		"filename": run.filename,
+		"status": run.status,
+		"finished": run.finished,
+		"position": run.position,
+		"total": run.total,
+		"progress": run.progress,
+		"created": res.created,
+		"updated": res.updated,
+		"skipped": res.skipped,
+		"errors": len(res.errors),
+		"rows_per_second": round(res.rows_per_second),
+		"message": run.message if run.status in ("failed", "interrupted") else None,
+	}
+
+
+def _raise_interrupt(signum, frame) -> None:
+	raise KeyboardInterrupt
+
+
+def run_worker(once: bool = False, poll_interval: Optional[float] = None) -> int:
+	"""Process queued imports until interrupted (or the queue is empty with `once`).
+
+	SIGTERM stops the worker after putting its current run back in the queue;
+	the committed chunks are kept and the next worker resumes from there.
+	"""
+	poll_interval = poll_interval or current_app.config["IMPORT_WORKER_POLL"]
+	worker_id = f"{socket.gethostname()}:{os.getpid()}"
+	signal.signal(signal.SIGTERM, _raise_interrupt)
+	processed = 0
+	while True:
+		run = claim_next(worker_id)
+		if run is None:
+			if once:
+				return processed
+			time.sleep(poll_interval)
+			continue
+		log.info("Import #%s (%s) claimed by %s at row %s", run.id, run.filename, worker_id, run.position)
+		try:
+			run_import(run)
+		except KeyboardInterrupt:
+			run.status = "queued"
+			db.session.commit()
+			raise
+		except Exception:
+			log.exception("Import #%s failed", run.id)
+		processed += 1
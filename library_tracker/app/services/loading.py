@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from ..models.books import Livre, LivreAuteur
+from ..models.anthologies import LivreOeuvre
+
+
+# Loader option sets per view. Collections use selectinload (one extra
+# SELECT ... WHERE livre_id IN (...) per collection, no row multiplication, so
+# LIMIT applies to books); many-to-one references are joined into the main query.
+# Every set issues a constant number of statements regardless of page size.
+_AUTEURS = selectinload(Livre.livre_auteurs).joinedload(LivreAuteur.auteur)
+_GENRES = selectinload(Livre.genres)
+_OEUVRES = selectinload(Livre.livre_oeuvres).joinedload(LivreOeuvre.oeuvre)
+
+LOADERS = {
+	# (catalog/home.html reads its columns from livre_summary: services.summary)
+	# livre_detail.html / livre_edit.html
+	"detail": (
+		_AUTEURS,
+		_GENRES,
+		_OEUVRES,
+		joinedload(Livre.serie),
+		joinedload(Livre.emplacement),
+		joinedload(Livre.editeur),
+		joinedload(Livre.langue),
+	),
+	# exports: every relation is serialised
+	"export": (
+		_AUTEURS,
+		_GENRES,
+		_OEUVRES,
+		joinedload(Livre.serie),
+		joinedload(Livre.emplacement),
+		joinedload(Livre.editeur),
+		joinedload(Livre.langue),
+	),
+}
+
+
+def loader_options(view: str) -> tuple:
+	return LOADERS[view]
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import func, select, tuple_
+
+from ..extensions import db
+from ..models.books import Livre
+
+
+# sort name -> (column, descending); Livre.id is always the tie-breaker so the
+# (column, id) pair is unique and matches the composite indexes on livres.
+SORT_KEYS = {
+	"created_desc": (Livre.created_at, True),
+	"created_asc": (Livre.created_at, False),
+	"title_asc": (Livre.titre, False),
+	"title_desc": (Livre.titre, True),
+}
+
+
+def order_by_sort(query, sort: str):
+	column, desc = SORT_KEYS.get(sort, SORT_KEYS["created_desc"])
+	if desc:
+		return query.order_by(column.desc(), Livre.id.desc())
+	return query.order_by(column.asc(), Livre.id.asc())
+
+
+def encode_cursor(sort: str, livre: Livre) -> str:
+	column, _ = SORT_KEYS[sort]
+	value = getattr(livre, column.key)
+	if isinstance(value, datetime):
+		value = value.isoformat()
+	raw = json.dumps([sort, value, livre.id], separators=(",", ":")).encode("utf-8")
+	return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(sort: str, token: Optional[str]) -> Optional[tuple[Any, int]]:
+	"""Return (value, id) for a cursor issued for `sort`, or None if absent/invalid."""
+	if not token:
+		return None
+	try:
+		raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+		cursor_sort, value, livre_id = json.loads(raw)
+	except (ValueError, TypeError):
+		return None
+	if cursor_sort != sort or not isinstance(livre_id, int):
+		return None
+	if SORT_KEYS[sort][0] is Livre.created_at:
+		try:
+			value = datetime.fromisoformat(value)
+		except (TypeError, ValueError):
+			return None
+	return value, livre_id
+
+
+@dataclass
+class KeysetPage:
+	items: list
+	next_cursor: Optional[str] = None
+	prev_cursor: Optional[str] = None
+
+
+def keyset_paginate(query, sort: str, *, after: Optional[str] = None, before: Optional[str] = None, per_page: int = 20) -> KeysetPage:
+	"""Fetch one page of `query` seeking from a cursor instead of using OFFSET.
+
+	`after` returns the rows following the cursor in `sort` order, `before` the
+	rows preceding it. Cost is independent of how deep the page is.
+	"""
+	if sort not in SORT_KEYS:
+		sort = "created_desc"
+	column, desc = SORT_KEYS[sort]
+	key = tuple_(column, Livre.id)
+	after_key = decode_cursor(sort, after)
+	before_key = decode_cursor(sort, before) if after_key is None else None
+
+	if before_key is not None:
+		# walk backwards from the cursor, then restore display order
+		bound = tuple_(*before_key)
+		query = query.filter(key > bound if desc else key < bound)
+		query = order_by_sort(query, _reverse(sort))
+		rows = query.limit(per_page + 1).all()
+		items = list(reversed(rows[:per_page]))
+		page = KeysetPage(items=items)
+		if items:
+			page.next_cursor = encode_cursor(sort, items[-1])
+			if len(rows) > per_page:
+				page.prev_cursor = encode_cursor(sort, items[0])
+		return page
+
+	if after_key is not None:
+		bound = tuple_(*after_key)
+		query = query.filter(key < bound if desc else key > bound)
+	rows = order_by_sort(query, sort).limit(per_page + 1).all()
+	items = rows[:per_page]
+	page = KeysetPage(items=items)
+	if items:
+		if len(rows) > per_page:
+			page.next_cursor = encode_cursor(sort, items[-1])
+		if after_key is not None:
+			page.prev_cursor = encode_cursor(sort, items[0])
+	return page
+
+
+def _reverse(sort: str) -> str:
+	return {
+		"created_desc": "created_asc",
+		"created_asc": "created_desc",
+		"title_asc": "title_desc",
+		"title_desc": "title_asc",
+	}[sort]
+
+
+def approximate_count(query, cap: int) -> tuple[int, bool]:
+	"""Count matching rows, stopping at `cap`. Returns (count, exact)."""
+	ids = query.order_by(None).with_entities(Livre.id).limit(cap + 1).subquery()
+	count = db.session.execute(select(func.count()).select_from(ids)).scalar_one()
+	if count > cap:
+		return cap, False
+	return count, True
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+
+from ..extensions import db
+from ..models.core import Editeur, Langue, Genre, Serie, Emplacement
+from .cache import bump_version, cache_version, get_cache
+from .catalog_events import CatalogChanges, on_flush
+
+
+VERSION_NAME = "refs"
+
+# name -> (model, columns served, order)
+REFS = {
+	"genres": (Genre, ("id", "nom"), (Genre.nom,)),
+	"editeurs": (Editeur, ("id", "nom"), (Editeur.nom,)),
+	"series": (Serie, ("id", "nom"), (Serie.nom,)),
+	"langues": (Langue, ("id", "nom"), (Langue.nom,)),
+	"emplacements": (
+		Emplacement,
+		("id", "zone", "colonne", "etage", "description"),
+		(Emplacement.zone, Emplacement.colonne, Emplacement.etage),
+	),
+}
+# auteur: author typeahead responses are keyed on the same version stamp
+_TABLES = {model.__tablename__ for model, _, _ in REFS.values()} | {"auteur"}
+
+
+def get_refs(name: str) -> list[dict]:
+	"""Ordered reference rows as plain dicts, served from the cache when current.
+
+	Keys embed the refs version stamp, kept in the database and bumped by the
+	writing transaction, so a write from any process invalidates every list in
+	all workers. Entries also expire after REFS_CACHE_TTL seconds.
+	"""
+	cache = get_cache()
+	key = f"refs:{refs_version()}:{name}"
+	items = cache.get(key)
+	if items is None:
+		model, columns, order = REFS[name]
+		stmt = select(*(getattr(model, c) for c in columns)).order_by(*order)
+		items = [dict(zip(columns, row)) for row in db.session.execute(stmt)]
+		cache.set(key, items, ttl=current_app.config["REFS_CACHE_TTL"])
+	return items
+
+
+def get_all_refs(*names: str) -> dict[str, list[dict]]:
+	return {name: get_refs(name) for name in names}
+
+
+def refs_version() -> int:
+	return cache_version(VERSION_NAME)
+
+
+def invalidate_refs(connection: Optional[Connection] = None) -> None:
+	"""Bump the refs version (seen by every process once the transaction commits)."""
+	bump_version(connection if connection is not None else db.session.connection(), VERSION_NAME)
+
+
+@on_flush
+def _invalidate_on_flush(connection: Connection, changes: CatalogChanges) -> None:
+	touched = set(changes.refs) | set(changes.deleted_refs)
+	if touched & _TABLES:
+		invalidate_refs(connection)
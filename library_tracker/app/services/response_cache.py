@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import current_app, request, session
+from flask_login import current_user
+from sqlalchemy.engine import Connection
+from werkzeug.http import is_resource_modified
+
+from ..extensions import db
+from .cache import bump_version, cache_version, cache_version_changed_at, get_cache
+from .catalog_events import CatalogChanges, on_flush
+
+
+VERSION_NAME = "catalog"
+
+
+def catalog_version() -> int:
+	return cache_version(VERSION_NAME)
+
+
+def catalog_modified() -> Optional[datetime]:
+	"""When the catalog version was last bumped (second precision), None if never."""
+	changed_at = cache_version_changed_at(VERSION_NAME)
+	return changed_at.replace(microsecond=0, tzinfo=timezone.utc) if changed_at else None
+
+
+def bump_catalog_version(connection: Optional[Connection] = None) -> None:
+	"""Invalidate every cached page when the current transaction commits.
+
+	Writes made outside the ORM events (bulk updates) call it before committing.
+	"""
+	bump_version(connection if connection is not None else db.session.connection(), VERSION_NAME)
+
+
+@on_flush
+def _bump_on_flush(connection: Connection, changes: CatalogChanges) -> None:
+	bump_catalog_version(connection)
+
+
+def _roles_key() -> str:
+	# pages differ by role only (admin link), not by user
+	if not current_user.is_authenticated:
+		return "anon"
+	return ".".join(sorted(r.name for r in current_user.roles)) or "user"
+
+
+def cached_page(view: Callable) -> Callable:
+	"""Serve a GET view from the cache while the catalog version is unchanged.
+
+	The version lives in the database (cache_version, read once per request),
+	so a write from any process drops the pages cached by every worker.
+	Responses carry a weak ETag (catalog version + roles) and Last-Modified, so
+	browsers revalidate with If-None-Match/If-Modified-Since and get a 304
+	without the page being rendered. Requests with pending flash messages and
+	non-200 responses bypass the cache. Apply under login_required.
+	"""
+	@wraps(view)
+	def wrapped(*args, **kwargs):
+		if not current_app.config["RESPONSE_CACHE"] or session.get("_flashes"):
+			return view(*args, **kwargs)
+		version, roles = catalog_version(), _roles_key()
+		etag = f"c{version}-{roles}"
+		modified = catalog_modified()
+		response_class = current_app.response_class
+		if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+			response = response_class(status=304)
+		else:
+			cache = get_cache()
+			key = f"page:{version}:{roles}:{request.full_path}"
+			entry = cache.get(key)
+			if entry is None:
+				response = current_app.make_response(view(*args, **kwargs))
+				if response.status_code != 200 or response.is_streamed:
+					return response
+				entry = (response.get_data(), response.content_type)
+				cache.set(key, entry, ttl=current_app.config["RESPONSE_CACHE_TTL"])
+			response = response_class(entry[0], content_type=entry[1])
+		response.set_etag(etag, weak=True)
+		response.last_modified = modified
+		# always revalidate: the version changes at any write
+		response.cache_control.private = True
+		response.cache_control.no_cache = True
+		response.vary.add("Cookie")
+		return response
+	return wrapped
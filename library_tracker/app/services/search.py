@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Iterable, Optional
+
+from sqlalchemy import DDL, Float, Integer, event, select, text
+from sqlalchemy.engine import Connection
+
+from ..extensions import db
+from ..models.core import Auteur, Serie
+from ..models.books import Livre, LivreAuteur
+from ..models.anthologies import Oeuvre, LivreOeuvre
+from .catalog_events import CatalogChanges, on_flush
+
+
+# SQLite: one FTS5 row per livre (rowid = livres.id). Text is folded in Python so
+# SQLite and Postgres index exactly the same tokens.
+SQLITE_DDL = [
+	"CREATE VIRTUAL TABLE IF NOT EXISTS livre_fts USING fts5("
+	"titre, oeuvres, serie, auteurs, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+	# author typeahead (rowid = auteur.id), prefix indexes down to one letter
+	"CREATE VIRTUAL TABLE IF NOT EXISTS auteur_fts USING fts5("
+	"nom, prenom, alias, tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')",
+]
+# Postgres: tsvector columns (simple config, already folded) behind GIN indexes.
+POSTGRES_DDL = [
+	"CREATE TABLE IF NOT EXISTS livre_search ("
+	"livre_id INTEGER PRIMARY KEY REFERENCES livres(id) ON DELETE CASCADE, "
+	"document TSVECTOR NOT NULL, auteurs TSVECTOR NOT NULL)",
+	"CREATE INDEX IF NOT EXISTS ix_livre_search_document ON livre_search USING GIN (document)",
+	"CREATE INDEX IF NOT EXISTS ix_livre_search_auteurs ON livre_search USING GIN (auteurs)",
+	"CREATE TABLE IF NOT EXISTS auteur_search ("
+	"auteur_id INTEGER PRIMARY KEY REFERENCES auteur(id) ON DELETE CASCADE, document TSVECTOR NOT NULL)",
+	"CREATE INDEX IF NOT EXISTS ix_auteur_search_document ON auteur_search USING GIN (document)",
+]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fold(value: Optional[str]) -> str:
+	"""Lowercase and strip accents ("Hypérion" -> "hyperion")."""
+	if not value:
+		return ""
+	decomposed = unicodedata.normalize("NFKD", value)
+	return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokens(value: Optional[str]) -> list[str]:
+	return _WORD_RE.findall(fold(value))
+
+
+def _dialect(connection: Connection) -> str:
+	return connection.dialect.name
+
+
+def _create_index(target, connection: Connection, **kw) -> None:
+	statements = {"sqlite": SQLITE_DDL, "postgresql": POSTGRES_DDL}.get(_dialect(connection), [])
+	for stmt in statements:
+		connection.execute(DDL(stmt))
+
+
+def _drop_index(target, connection: Connection, **kw) -> None:
+	if _dialect(connection) == "sqlite":
+		connection.execute(DDL("DROP TABLE IF EXISTS livre_fts"))
+		connection.execute(DDL("DROP TABLE IF EXISTS auteur_fts"))
+	elif _dialect(connection) == "postgresql":
+		connection.execute(DDL("DROP TABLE IF EXISTS livre_search"))
+		connection.execute(DDL("DROP TABLE IF EXISTS auteur_search"))
+
+
+event.listen(db.metadata, "after_create", _create_index)
+event.listen(db.metadata, "before_drop", _drop_index)
+
+
+def _documents(connection: Connection, livre_ids: Iterable[int]) -> dict[int, dict[str, str]]:
+	ids = list(livre_ids)
+	docs: dict[int, dict[str, str]] = {}
+	if not ids:
+		return docs
+	rows = connection.execute(
+		select(Livre.id, Livre.titre, Serie.nom).outerjoin(Serie, Serie.id == Livre.serie_id).where(Livre.id.in_(ids))
+	)
+	for livre_id, titre, serie in rows:
+		docs[livre_id] = {"titre": fold(titre), "serie": fold(serie), "oeuvres": "", "auteurs": ""}
+	rows = connection.execute(
+		select(LivreAuteur.livre_id, Auteur.prenom, Auteur.nom, Auteur.alias)
+		.join(Auteur, Auteur.id == LivreAuteur.auteur_id)
+		.where(LivreAuteur.livre_id.in_(ids))
+	)
+	for livre_id, prenom, nom, alias in rows:
+		if livre_id in docs:
+			docs[livre_id]["auteurs"] += " " + fold(" ".join(p for p in (prenom, nom, alias) if p))
+	rows = connection.execute(
+		select(LivreOeuvre.livre_id, Oeuvre.titre)
+		.join(Oeuvre, Oeuvre.id == LivreOeuvre.oeuvre_id)
+		.where(LivreOeuvre.livre_id.in_(ids))
+	)
+	for livre_id, titre in rows:
+		if livre_id in docs:
+			docs[livre_id]["oeuvres"] += " " + fold(titre)
+	return docs
+
+
+def delete_livres(connection: Connection, livre_ids: Iterable[int]) -> None:
+	ids = list(livre_ids)
+	if not ids:
+		return
+	if _dialect(connection) == "sqlite":
+		connection.execute(text("DELETE FROM livre_fts WHERE rowid IN (%s)" % ",".join(str(int(i)) for i in ids)))
+	elif _dialect(connection) == "postgresql":
+		connection.execute(text("DELETE FROM livre_search WHERE livre_id = ANY(:ids)"), {"ids": ids})
+
+
+def index_livres(connection: Connection, livre_ids: Iterable[int], chunk_size: int = 500) -> None:
+	"""(Re)build index rows for the given books."""
+	dialect = _dialect(connection)
+	if dialect not in ("sqlite", "postgresql"):
+		return
+	ids = [i for i in livre_ids if i is not None]
+	for start in range(0, len(ids), chunk_size):
+		chunk = ids[start:start + chunk_size]
+		docs = _documents(connection, chunk)
+		delete_livres(connection, chunk)
+		if not docs:
+			continue
+		params = [{"id": livre_id, **doc} for livre_id, doc in docs.items()]
+		if dialect == "sqlite":
+			connection.execute(
+				text("INSERT INTO livre_fts (rowid, titre, oeuvres, serie, auteurs) VALUES (:id, :titre, :oeuvres, :serie, :auteurs)"),
+				params,
+			)
+		else:
+			connection.execute(
+				text(
+					"INSERT INTO livre_search (livre_id, document, auteurs) VALUES (:id, "
+					"setweight(to_tsvector('simple', :titre), 'A') || setweight(to_tsvector('simple', :serie), 'B') "
+					"|| setweight(to_tsvector('simple', :oeuvres), 'C'), to_tsvector('simple', :auteurs))"
+				),
+				params,
+			)
+
+
+def delete_auteurs(connection: Connection, auteur_ids: Iterable[int]) -> None:
+	ids = list(auteur_ids)
+	if not ids:
+		return
+	if _dialect(connection) == "sqlite":
+		connection.execute(text("DELETE FROM auteur_fts WHERE rowid IN (%s)" % ",".join(str(int(i)) for i in ids)))
+	elif _dialect(connection) == "postgresql":
+		connection.execute(text("DELETE FROM auteur_search WHERE auteur_id = ANY(:ids)"), {"ids": ids})
+
+
+def index_auteurs(connection: Connection, auteur_ids: Iterable[int], chunk_size: int = 500) -> None:
+	dialect = _dialect(connection)
+	if dialect not in ("sqlite", "postgresql"):
+		return
+	ids = [i for i in auteur_ids if i is not None]
+	for start in range(0, len(ids), chunk_size):
+		chunk = ids[start:start + chunk_size]
+		delete_auteurs(connection, chunk)
+		rows = connection.execute(select(Auteur.id, Auteur.nom, Auteur.prenom, Auteur.alias).where(Auteur.id.in_(chunk)))
+		params = [
+			{"id": auteur_id, "nom": fold(nom), "prenom": fold(prenom), "alias": fold(alias)}
+			for auteur_id, nom, prenom, alias in rows
+		]
+		if not params:
+			continue
+		if dialect == "sqlite":
+			connection.execute(
+				text("INSERT INTO auteur_fts (rowid, nom, prenom, alias) VALUES (:id, :nom, :prenom, :alias)"),
+				params,
+			)
+		else:
+			connection.execute(
+				text(
+					"INSERT INTO auteur_search (auteur_id, document) VALUES (:id, "
+					"setweight(to_tsvector('simple', :nom), 'A') || to_tsvector('simple', :prenom || ' ' || :alias))"
+				),
+				params,
+			)
+
+
+def rebuild_index(connection: Connection) -> int:
+	_drop_index(None, connection)
+	_create_index(None, connection)
+	ids = list(connection.execute(select(Livre.id)).scalars())
+	index_livres(connection, ids)
+	index_auteurs(connection, list(connection.execute(select(Auteur.id)).scalars()))
+	return len(ids)
+
+
+@on_flush
+def _sync_index(connection: Connection, changes: CatalogChanges) -> None:
+	delete_livres(connection, changes.deleted_livres)
+	index_livres(connection, changes.livres)
+	delete_auteurs(connection, changes.deleted_refs.get("auteur", ()))
+	index_auteurs(connection, changes.refs.get("auteur", ()))
+
+
+def _fts5_query(words: list[str], columns: str) -> str:
+	return "{%s} : (%s)" % (columns, " ".join(f'"{w}"*' for w in words))
+
+
+def _tsquery(words: list[str]) -> str:
+	return " & ".join(f"{w}:*" for w in words)
+
+
+def match_subquery(*, q: str = "", author: str = ""):
+	"""Return a subquery of (livre_id, rank) matching the search terms, or None.
+
+	Lower rank is better on every backend. Falls back to None on engines without a
+	full-text index, in which case callers keep the plain ILIKE filters.
+	"""
+	title_words = tokens(q)
+	author_words = tokens(author)
+	if not title_words and not author_words:
+		return None
+	dialect = db.engine.dialect.name
+	if dialect == "sqlite":
+		clauses = []
+		if title_words:
+			clauses.append(_fts5_query(title_words, "titre oeuvres serie"))
+		if author_words:
+			clauses.append(_fts5_query(author_words, "auteurs"))
+		stmt = text(
+			"SELECT rowid AS livre_id, bm25(livre_fts, 10.0, 2.0, 4.0, 1.0) AS rank "
+			"FROM livre_fts WHERE livre_fts MATCH :match"
+		).bindparams(match=" AND ".join(f"({c})" for c in clauses))
+	elif dialect == "postgresql":
+		conditions = []
+		params = {}
+		rank = "0"
+		if title_words:
+			conditions.append("document @@ to_tsquery('simple', :title_query)")
+			params["title_query"] = _tsquery(title_words)
+			rank = "ts_rank(document, to_tsquery('simple', :title_query))"
+		if author_words:
+			conditions.append("auteurs @@ to_tsquery('simple', :author_query)")
+			params["author_query"] = _tsquery(author_words)
+			rank += " + ts_rank(auteurs, to_tsquery('simple', :author_query))"
+		stmt = text(
+			f"SELECT livre_id, -({rank}) AS rank FROM livre_search WHERE {' AND '.join(conditions)}"
+		).bindparams(**params)
+	else:
+		return None
+	return stmt.columns(livre_id=Integer, rank=Float).subquery("search")
+
+
+def search_auteurs(term: str, limit: int = 10) -> list[dict]:
+	"""Typeahead lookup: authors whose nom/prenom/alias words start with the terms."""
+	words = tokens(term)
+	if not words:
+		return []
+	columns = (Auteur.id, Auteur.nom, Auteur.prenom, Auteur.alias)
+	dialect = db.engine.dialect.name
+	if dialect == "sqlite":
+		match = text(
+			"SELECT rowid AS auteur_id, bm25(auteur_fts, 4.0, 2.0, 1.0) AS rank FROM auteur_fts WHERE auteur_fts MATCH :match"
+		).bindparams(match=" ".join(f'"{w}"*' for w in words)).columns(auteur_id=Integer, rank=Float).subquery()
+		stmt = select(*columns).join(match, match.c.auteur_id == Auteur.id).order_by(match.c.rank, Auteur.nom)
+	elif dialect == "postgresql":
+		match = text(
+			"SELECT auteur_id, ts_rank(document, to_tsquery('simple', :query)) AS rank FROM auteur_search "
+			"WHERE document @@ to_tsquery('simple', :query)"
+		).bindparams(query=_tsquery(words)).columns(auteur_id=Integer, rank=Float).subquery()
+		stmt = select(*columns).join(match, match.c.auteur_id == Auteur.id).order_by(match.c.rank.desc(), Auteur.nom)
+	else:
+		stmt = select(*columns).where(Auteur.nom.ilike(f"{term.strip()}%")).order_by(Auteur.nom, Auteur.prenom)
+	return [
+		{"id": auteur_id, "nom": nom, "prenom": prenom, "alias": alias}
+		for auteur_id, nom, prenom, alias in db.session.execute(stmt.limit(limit))
+	]
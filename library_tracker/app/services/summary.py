@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Iterable, Iterator, Optional
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+
+from ..extensions import db
+from ..models.anthologies import LivreOeuvre, Oeuvre
+from ..models.books import Livre, LivreAuteur, livre_genre
+from ..models.core import Auteur, Editeur, Emplacement, Genre, Langue, Serie
+from ..models.summary import LivreSummary
+from .catalog_events import CatalogChanges, on_flush
+
+
+# Display formats shared by the catalog, the CSV export and the import diff
+# (parse_emplacement / the CSV import read them back).
+
+def format_auteur(prenom: Optional[str], nom: str, role: Optional[str]) -> str:
+	return f"{prenom or ''} {nom}{f' ({role})' if role else ''}".strip()
+
+
+def format_oeuvre(ordre: Optional[int], titre: str, pages: Optional[str]) -> str:
+	return f"{ordre or ''} {titre}{f' ({pages})' if pages else ''}".strip()
+
+
+def format_emplacement(zone: Optional[str], colonne: int, etage: str) -> str:
+	return f"{zone or ''} C{colonne} E{etage}".strip()
+
+
+def format_serie(nom: Optional[str], numero: Optional[int]) -> str:
+	if not nom:
+		return ""
+	return f"{nom} #{numero}" if numero else nom
+
+
+def _render(connection: Connection, livre_ids: list[int]) -> list[dict]:
+	"""livre_summary rows of the given books: four reads, whatever their number."""
+	auteurs: dict[int, list[str]] = defaultdict(list)
+	for livre_id, prenom, nom, role in connection.execute(
+		select(LivreAuteur.livre_id, Auteur.prenom, Auteur.nom, LivreAuteur.role)
+		.join(Auteur, Auteur.id == LivreAuteur.auteur_id)
+		.where(LivreAuteur.livre_id.in_(livre_ids))
+		.order_by(LivreAuteur.livre_id, LivreAuteur.auteur_id)
+	):
+		auteurs[livre_id].append(format_auteur(prenom, nom, role))
+	genres: dict[int, list[str]] = defaultdict(list)
+	for livre_id, nom in connection.execute(
+		select(livre_genre.c.livre_id, Genre.nom)
+		.join(Genre, Genre.id == livre_genre.c.genre_id)
+		.where(livre_genre.c.livre_id.in_(livre_ids))
+		.order_by(livre_genre.c.livre_id, Genre.nom)
+	):
+		genres[livre_id].append(nom)
+	oeuvres: dict[int, list[str]] = defaultdict(list)
+	for livre_id, ordre, titre, pages in connection.execute(
+		select(LivreOeuvre.livre_id, LivreOeuvre.ordre, Oeuvre.titre, LivreOeuvre.pages)
+		.join(Oeuvre, Oeuvre.id == LivreOeuvre.oeuvre_id)
+		.where(LivreOeuvre.livre_id.in_(livre_ids))
+		.order_by(LivreOeuvre.livre_id, func.coalesce(LivreOeuvre.ordre, 0), LivreOeuvre.oeuvre_id)
+	):
+		oeuvres[livre_id].append(format_oeuvre(ordre, titre, pages))
+
+	rows = []
+	for r in connection.execute(
+		select(
+			Livre.id, Livre.titre, Livre.numero_serie, Livre.created_at,
+			Editeur.nom.label("editeur"), Langue.nom.label("langue"), Serie.nom.label("serie"),
+			Emplacement.zone, Emplacement.colonne, Emplacement.etage,
+		)
+		.outerjoin(Editeur, Editeur.id == Livre.editeur_id)
+		.outerjoin(Langue, Langue.id == Livre.langue_id)
+		.outerjoin(Serie, Serie.id == Livre.serie_id)
+		.outerjoin(Emplacement, Emplacement.id == Livre.emplacement_id)
+		.where(Livre.id.in_(livre_ids))
+	):
+		rows.append({
+			"livre_id": r.id,
+			"titre": r.titre,
+			"editeur": r.editeur or "",
+			"langue": r.langue or "",
+			"serie": r.serie or "",
+			"numero_serie": r.numero_serie,
+			"serie_label": format_serie(r.serie, r.numero_serie),
+			"emplacement": format_emplacement(r.zone, r.colonne, r.etage) if r.colonne is not None else "",
+			"auteurs": "; ".join(auteurs[r.id]),
+			"genres": ", ".join(genres[r.id]),
+			"oeuvres": "; ".join(oeuvres[r.id]),
+			"created_at": r.created_at,
+		})
+	return rows
+
+
+def index_livres(connection: Connection, livre_ids: Iterable[int], chunk_size: int = 500) -> None:
+	"""Re-render the summary rows of the given books."""
+	ids = sorted(i for i in set(livre_ids) if i is not None)
+	for start in range(0, len(ids), chunk_size):
+		chunk = ids[start:start + chunk_size]
+		revisions = dict(connection.execute(
+			select(LivreSummary.livre_id, LivreSummary.revision).where(LivreSummary.livre_id.in_(chunk))
+		).all())
+		connection.execute(delete(LivreSummary.__table__).where(LivreSummary.livre_id.in_(chunk)))
+		rows = _render(connection, chunk)
+		for row in rows:
+			row["revision"] = revisions.get(row["livre_id"], 0) + 1
+		if rows:
+			connection.execute(insert(LivreSummary.__table__), rows)
+
+
+def delete_livres(connection: Connection, livre_ids: Iterable[int]) -> None:
+	ids = list(livre_ids)
+	if ids:
+		connection.execute(delete(LivreSummary.__table__).where(LivreSummary.livre_id.in_(ids)))
+
+
+def rebuild_summary(connection: Connection, chunk_size: int = 2000) -> int:
+	"""Re-render livre_summary from scratch, `chunk_size` books at a time. Returns the number of rows."""
+	# every row past any earlier revision, so no cached fragment matches anymore
+	revision = (connection.execute(select(func.max(LivreSummary.revision))).scalar() or 0) + 1
+	connection.execute(delete(LivreSummary.__table__))
+	count, last = 0, 0
+	while True:
+		ids = list(connection.execute(
+			select(Livre.id).where(Livre.id > last).order_by(Livre.id).limit(chunk_size)
+		).scalars())
+		if not ids:
+			return count
+		rows = _render(connection, ids)
+		for row in rows:
+			row["revision"] = revision
+		if rows:
+			connection.execute(insert(LivreSummary.__table__), rows)
+		count += len(rows)
+		last = ids[-1]
+
+
+@on_flush
+def _sync_summary(connection: Connection, changes: CatalogChanges) -> None:
+	delete_livres(connection, changes.deleted_livres)
+	index_livres(connection, changes.livres)
+
+
+def summaries_for(livre_ids: Iterable[int]) -> dict[int, LivreSummary]:
+	"""Summary rows of a page of books, by livre id (one read)."""
+	ids = list(livre_ids)
+	if not ids:
+		return {}
+	return {s.livre_id: s for s in db.session.scalars(select(LivreSummary).where(LivreSummary.livre_id.in_(ids)))}
+
+
+def iter_summary_rows(batch_size: Optional[int] = None) -> Iterator[tuple]:
+	"""(id, titre, editeur, ..., oeuvres) of every book by id, in EXPORT_COLUMNS order, streamed."""
+	batch_size = batch_size or current_app.config["EXPORT_BATCH_SIZE"]
+	stmt = (
+		select(
+			LivreSummary.livre_id, LivreSummary.titre, LivreSummary.editeur, LivreSummary.langue,
+			LivreSummary.serie, LivreSummary.numero_serie, LivreSummary.emplacement,
+			LivreSummary.auteurs, LivreSummary.genres, LivreSummary.oeuvres,
+		)
+		.order_by(LivreSummary.livre_id)
+		.execution_options(yield_per=batch_size)
+	)
+	yield from db.session.execute(stmt)
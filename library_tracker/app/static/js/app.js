@@ -5,3 +5,69 @@ document.addEventListener('DOMContentLoaded', () => {
 		});
 	}, 3000);
 });
+
+// Author typeahead: fills a <datalist> from /refs/auteurs/search and stores the
+// chosen author's id in the sibling hidden author_id[] input.
+document.addEventListener('DOMContentLoaded', () => {
+	document.querySelectorAll('[data-author-picker]').forEach((picker, index) => {
+		const hidden = picker.querySelector('input[type=hidden]');
+		const input = picker.querySelector('[data-author-search]');
+		const list = document.createElement('datalist');
+		list.id = `author-options-${index}`;
+		input.setAttribute('list', list.id);
+		picker.appendChild(list);
+
+		let timer = null;
+		let results = [];
+		input.addEventListener('input', () => {
+			const chosen = results.find((a) => a.label === input.value);
+			hidden.value = chosen ? chosen.id : '';
+			clearTimeout(timer);
+			const term = input.value.trim();
+			if (!term || chosen) {
+				return;
+			}
+			timer = setTimeout(async () => {
+				const url = `${input.dataset.authorSearch}?q=${encodeURIComponent(term)}&limit=10`;
+				const response = await fetch(url, { headers: { Accept: 'application/json' } });
+				if (!response.ok) {
+					return;
+				}
+				results = await response.json();
+				list.replaceChildren(...results.map((a) => {
+					const option = document.createElement('option');
+					option.value = a.label;
+					if (a.alias) {
+						option.label = a.alias;
+					}
+					return option;
+				}));
+			}, 200);
+		});
+	});
+});
+
+// Import progress: polls the job status endpoint and reloads the page with the
+// final counts once the background worker is done.
+document.addEventListener('DOMContentLoaded', () => {
+	const box = document.querySelector('[data-import-status]');
+	if (!box) {
+		return;
+	}
+	const progress = box.querySelector('[data-import-progress]');
+	const bar = box.querySelector('[data-import-bar]');
+	const poll = async () => {
+		const response = await fetch(box.dataset.importStatus, { headers: { Accept: 'application/json' } });
+		if (response.ok) {
+			const job = await response.json();
+			if (job.finished) {
+				window.location.reload();
+				return;
+			}
+			progress.textContent = job.total ? `${job.position} / ${job.total}` : `${job.position}`;
+			bar.style.width = `${Math.round((job.progress || 0) * 100)}%`;
+		}
+		setTimeout(poll, 2000);
+	};
+	setTimeout(poll, 2000);
+});
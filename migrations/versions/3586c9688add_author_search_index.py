@@ -0,0 +1,79 @@
+"""author search index
+
+Revision ID: 3586c9688add
+Revises: 9afb40f76214
+Create Date: 2026-10-18 11:26:53.730519
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3586c9688add'
+down_revision = '9afb40f76214'
+branch_labels = None
+depends_on = None
+
+
+# auteur_fts (SQLite, rowid = auteur.id, prefix indexes down to one letter) /
+# auteur_search (Postgres) for the author typeahead, as of this revision.
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS auteur_fts USING fts5("
+    "nom, prenom, alias, tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')",
+]
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS auteur_search ("
+    "auteur_id INTEGER PRIMARY KEY REFERENCES auteur(id) ON DELETE CASCADE, document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_auteur_search_document ON auteur_search USING GIN (document)",
+]
+SQLITE_INSERT = "INSERT INTO auteur_fts (rowid, nom, prenom, alias) VALUES (:id, :nom, :prenom, :alias)"
+POSTGRES_INSERT = (
+    "INSERT INTO auteur_search (auteur_id, document) VALUES (:id, "
+    "setweight(to_tsvector('simple', :nom), 'A') || to_tsvector('simple', :prenom || ' ' || :alias))"
+)
+CHUNK_SIZE = 2000
+
+
+def _fold(value):
+    # same folding as the app indexes with: lowercase, accents stripped
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        ddl, insert = SQLITE_DDL, SQLITE_INSERT
+    elif bind.dialect.name == 'postgresql':
+        ddl, insert = POSTGRES_DDL, POSTGRES_INSERT
+    else:
+        return
+    for stmt in ddl:
+        op.execute(stmt)
+    # populated from the existing auteurs
+    last = 0
+    while True:
+        rows = bind.execute(
+            sa.text("SELECT id, nom, prenom, alias FROM auteur WHERE id > :last ORDER BY id LIMIT :limit"),
+            {'last': last, 'limit': CHUNK_SIZE},
+        ).all()
+        if not rows:
+            break
+        bind.execute(sa.text(insert), [
+            {'id': auteur_id, 'nom': _fold(nom), 'prenom': _fold(prenom), 'alias': _fold(alias)}
+            for auteur_id, nom, prenom, alias in rows
+        ])
+        last = rows[-1][0]
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS auteur_fts')
+    elif bind.dialect.name == 'postgresql':
+        op.execute('DROP TABLE IF EXISTS auteur_search')
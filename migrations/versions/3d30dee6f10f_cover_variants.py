@@ -0,0 +1,34 @@
+"""cover variants
+
+Revision ID: 3d30dee6f10f
+Revises: bc08a56b8b84
+Create Date: 2026-10-18 19:47:12.305518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d30dee6f10f'
+down_revision = 'bc08a56b8b84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cover_variant',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=1024), nullable=False),
+    sa.Column('size', sa.SmallInteger(), nullable=False),
+    sa.Column('format', sa.String(length=8), nullable=False),
+    sa.Column('width', sa.SmallInteger(), nullable=False),
+    sa.Column('height', sa.SmallInteger(), nullable=False),
+    sa.Column('bytes', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('filename', 'size', 'format', name='uq_cover_variant')
+    )
+
+
+def downgrade():
+    op.drop_table('cover_variant')
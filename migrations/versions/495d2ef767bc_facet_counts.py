@@ -0,0 +1,68 @@
+"""facet counts
+
+Revision ID: 495d2ef767bc
+Revises: 770ca8ef0328
+Create Date: 2026-10-18 17:28:13.092419
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '495d2ef767bc'
+down_revision = '770ca8ef0328'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('facet_count',
+    sa.Column('facet', sa.String(length=16), nullable=False),
+    sa.Column('value', sa.String(length=64), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('facet', 'value')
+    )
+    with op.batch_alter_table('facet_count', schema=None) as batch_op:
+        batch_op.create_index('ix_facet_count_facet_count', ['facet', 'count'], unique=False)
+
+    op.create_table('livre_facet',
+    sa.Column('facet', sa.String(length=16), nullable=False),
+    sa.Column('value', sa.String(length=64), nullable=False),
+    sa.Column('livre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['livre_id'], ['livres.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('facet', 'value', 'livre_id')
+    )
+    with op.batch_alter_table('livre_facet', schema=None) as batch_op:
+        batch_op.create_index('ix_livre_facet_livre', ['livre_id', 'facet', 'value'], unique=False)
+
+    # facet values and counts of the existing livres (inner joins: a dangling
+    # id is not a facet value)
+    op.execute(
+        "INSERT INTO livre_facet (livre_id, facet, value) "
+        "SELECT livre_genre.livre_id, 'genre', CAST(livre_genre.genre_id AS VARCHAR(64)) FROM livre_genre "
+        "JOIN genre ON genre.id = livre_genre.genre_id "
+        "UNION ALL SELECT livres.id, 'editeur', CAST(livres.editeur_id AS VARCHAR(64)) FROM livres "
+        "JOIN editeur ON editeur.id = livres.editeur_id "
+        "UNION ALL SELECT livres.id, 'serie', CAST(livres.serie_id AS VARCHAR(64)) FROM livres "
+        "JOIN serie ON serie.id = livres.serie_id "
+        "UNION ALL SELECT livres.id, 'langue', CAST(livres.langue_id AS VARCHAR(64)) FROM livres "
+        "JOIN langue ON langue.id = livres.langue_id "
+        "UNION ALL SELECT livres.id, 'zone', emplacement.zone FROM livres "
+        "JOIN emplacement ON emplacement.id = livres.emplacement_id "
+        "WHERE emplacement.zone IS NOT NULL AND emplacement.zone != ''"
+    )
+    op.execute(
+        "INSERT INTO facet_count (facet, value, count) "
+        "SELECT facet, value, count(*) FROM livre_facet GROUP BY facet, value"
+    )
+
+def downgrade():
+    with op.batch_alter_table('livre_facet', schema=None) as batch_op:
+        batch_op.drop_index('ix_livre_facet_livre')
+
+    op.drop_table('livre_facet')
+    with op.batch_alter_table('facet_count', schema=None) as batch_op:
+        batch_op.drop_index('ix_facet_count_facet_count')
+
+    op.drop_table('facet_count')
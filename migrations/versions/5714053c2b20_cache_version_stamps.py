@@ -0,0 +1,36 @@
+"""cache version stamps
+
+Revision ID: 5714053c2b20
+Revises: 8633494b69cf
+Create Date: 2026-10-18 17:53:03.273462
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5714053c2b20'
+down_revision = '8633494b69cf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cache_version',
+    sa.Column('name', sa.String(length=32), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # rows exist up front: writers only ever UPDATE them
+    cache_version = sa.table('cache_version', sa.column('name'), sa.column('value'), sa.column('changed_at'))
+    op.bulk_insert(cache_version, [
+        {'name': name, 'value': 0, 'changed_at': datetime.utcnow()} for name in ('catalog', 'refs', 'fragments')
+    ])
+
+
+def downgrade():
+    op.drop_table('cache_version')
@@ -0,0 +1,86 @@
+"""duplicate clusters
+
+Revision ID: 66e05019a823
+Revises: d2f2e81b5b70
+Create Date: 2026-10-18 18:22:05.114862
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '66e05019a823'
+down_revision = 'd2f2e81b5b70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('duplicate_run',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('min_score', sa.Float(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('last_band', sa.SmallInteger(), nullable=True),
+    sa.Column('last_bucket', sa.BigInteger(), nullable=True),
+    sa.Column('comparisons', sa.Integer(), nullable=False),
+    sa.Column('clusters', sa.Integer(), nullable=False),
+    sa.Column('elapsed', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('duplicate_run', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_duplicate_run_kind'), ['kind'], unique=False)
+
+    op.create_table('duplicate_cluster',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('max_score', sa.Float(), nullable=False),
+    sa.Column('min_score', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.ForeignKeyConstraint(['run_id'], ['duplicate_run.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('duplicate_cluster', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_duplicate_cluster_run_id'), ['run_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_duplicate_cluster_status'), ['status'], unique=False)
+
+    op.create_table('duplicate_pair',
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('left_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('right_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['run_id'], ['duplicate_run.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('run_id', 'left_id', 'right_id')
+    )
+    op.create_table('duplicate_cluster_member',
+    sa.Column('cluster_id', sa.Integer(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.ForeignKeyConstraint(['cluster_id'], ['duplicate_cluster.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('cluster_id', 'entity_id')
+    )
+    with op.batch_alter_table('duplicate_cluster_member', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_duplicate_cluster_member_entity_id'), ['entity_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('duplicate_cluster_member', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_duplicate_cluster_member_entity_id'))
+
+    op.drop_table('duplicate_cluster_member')
+    op.drop_table('duplicate_pair')
+    with op.batch_alter_table('duplicate_cluster', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_duplicate_cluster_status'))
+        batch_op.drop_index(batch_op.f('ix_duplicate_cluster_run_id'))
+
+    op.drop_table('duplicate_cluster')
+    with op.batch_alter_table('duplicate_run', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_duplicate_run_kind'))
+
+    op.drop_table('duplicate_run')
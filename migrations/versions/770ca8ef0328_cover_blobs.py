@@ -0,0 +1,37 @@
+"""content-addressed cover blobs
+
+Revision ID: 770ca8ef0328
+Revises: 3d30dee6f10f
+Create Date: 2026-10-18 20:31:58.442190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '770ca8ef0328'
+down_revision = '3d30dee6f10f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cover_blob',
+    sa.Column('filename', sa.String(length=1024), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('bytes', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('filename')
+    )
+    # reference counts of the covers already stored (under random names until
+    # `flask covers-rehash` moves them to content-addressed storage)
+    op.execute(
+        'INSERT INTO cover_blob (filename, refcount, created_at) '
+        'SELECT lien_couverture, COUNT(*), CURRENT_TIMESTAMP FROM livres '
+        'WHERE lien_couverture IS NOT NULL GROUP BY lien_couverture'
+    )
+
+
+def downgrade():
+    op.drop_table('cover_blob')
@@ -0,0 +1,144 @@
+"""livre summary read table
+
+Revision ID: 8633494b69cf
+Revises: b1aa65bd2de4
+Create Date: 2026-10-18 17:38:23.711923
+
+"""
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8633494b69cf'
+down_revision = 'b1aa65bd2de4'
+branch_labels = None
+depends_on = None
+
+
+# Display formats as services.summary renders them at this revision, kept
+# here so later changes to the app do not alter what this migration writes.
+CHUNK_SIZE = 2000
+
+
+def _format_auteur(prenom, nom, role):
+    return f"{prenom or ''} {nom}{f' ({role})' if role else ''}".strip()
+
+
+def _format_oeuvre(ordre, titre, pages):
+    return f"{ordre or ''} {titre}{f' ({pages})' if pages else ''}".strip()
+
+
+def _format_emplacement(zone, colonne, etage):
+    return f"{zone or ''} C{colonne} E{etage}".strip()
+
+
+def _format_serie(nom, numero):
+    if not nom:
+        return ''
+    return f'{nom} #{numero}' if numero else nom
+
+
+def _render(bind, ids):
+    def read(sql):
+        return bind.execute(sa.text(sql).bindparams(sa.bindparam('ids', expanding=True)), {'ids': ids})
+
+    auteurs = defaultdict(list)
+    for livre_id, prenom, nom, role in read(
+        "SELECT livre_auteur.livre_id, auteur.prenom, auteur.nom, livre_auteur.role FROM livre_auteur "
+        "JOIN auteur ON auteur.id = livre_auteur.auteur_id WHERE livre_auteur.livre_id IN :ids "
+        "ORDER BY livre_auteur.livre_id, livre_auteur.auteur_id"
+    ):
+        auteurs[livre_id].append(_format_auteur(prenom, nom, role))
+    genres = defaultdict(list)
+    for livre_id, nom in read(
+        "SELECT livre_genre.livre_id, genre.nom FROM livre_genre JOIN genre ON genre.id = livre_genre.genre_id "
+        "WHERE livre_genre.livre_id IN :ids ORDER BY livre_genre.livre_id, genre.nom"
+    ):
+        genres[livre_id].append(nom)
+    oeuvres = defaultdict(list)
+    for livre_id, ordre, titre, pages in read(
+        "SELECT livre_oeuvre.livre_id, livre_oeuvre.ordre, oeuvre.titre, livre_oeuvre.pages FROM livre_oeuvre "
+        "JOIN oeuvre ON oeuvre.id = livre_oeuvre.oeuvre_id WHERE livre_oeuvre.livre_id IN :ids "
+        "ORDER BY livre_oeuvre.livre_id, coalesce(livre_oeuvre.ordre, 0), livre_oeuvre.oeuvre_id"
+    ):
+        oeuvres[livre_id].append(_format_oeuvre(ordre, titre, pages))
+
+    rows = []
+    for r in read(
+        "SELECT livres.id, livres.titre, livres.numero_serie, livres.created_at, editeur.nom AS editeur, "
+        "langue.nom AS langue, serie.nom AS serie, emplacement.zone, emplacement.colonne, emplacement.etage "
+        "FROM livres LEFT OUTER JOIN editeur ON editeur.id = livres.editeur_id "
+        "LEFT OUTER JOIN langue ON langue.id = livres.langue_id "
+        "LEFT OUTER JOIN serie ON serie.id = livres.serie_id "
+        "LEFT OUTER JOIN emplacement ON emplacement.id = livres.emplacement_id "
+        "WHERE livres.id IN :ids"
+    ):
+        rows.append({
+            'livre_id': r.id,
+            'titre': r.titre,
+            'editeur': r.editeur or '',
+            'langue': r.langue or '',
+            'serie': r.serie or '',
+            'numero_serie': r.numero_serie,
+            'serie_label': _format_serie(r.serie, r.numero_serie),
+            'emplacement': _format_emplacement(r.zone, r.colonne, r.etage) if r.colonne is not None else '',
+            'auteurs': '; '.join(auteurs[r.id]),
+            'genres': ', '.join(genres[r.id]),
+            'oeuvres': '; '.join(oeuvres[r.id]),
+            'created_at': r.created_at,
+        })
+    return rows
+
+
+def upgrade():
+    op.create_table('livre_summary',
+    sa.Column('livre_id', sa.Integer(), nullable=False),
+    sa.Column('titre', sa.String(length=512), nullable=False),
+    sa.Column('editeur', sa.String(length=255), nullable=False),
+    sa.Column('langue', sa.String(length=255), nullable=False),
+    sa.Column('serie', sa.String(length=255), nullable=False),
+    sa.Column('numero_serie', sa.Integer(), nullable=True),
+    sa.Column('serie_label', sa.String(length=300), nullable=False),
+    sa.Column('emplacement', sa.String(length=300), nullable=False),
+    sa.Column('auteurs', sa.Text(), nullable=False),
+    sa.Column('genres', sa.Text(), nullable=False),
+    sa.Column('oeuvres', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('revision', sa.Integer(), server_default='1', nullable=False),
+    sa.ForeignKeyConstraint(['livre_id'], ['livres.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('livre_id')
+    )
+    with op.batch_alter_table('livre_summary', schema=None) as batch_op:
+        batch_op.create_index('ix_livre_summary_created_at_id', ['created_at', 'livre_id'], unique=False)
+        batch_op.create_index('ix_livre_summary_titre_id', ['titre', 'livre_id'], unique=False)
+
+    # display rows of the existing livres
+    bind = op.get_bind()
+    insert = sa.text(
+        "INSERT INTO livre_summary (livre_id, titre, editeur, langue, serie, numero_serie, serie_label, "
+        "emplacement, auteurs, genres, oeuvres, created_at) VALUES (:livre_id, :titre, :editeur, :langue, "
+        ":serie, :numero_serie, :serie_label, :emplacement, :auteurs, :genres, :oeuvres, :created_at)"
+    )
+    last = 0
+    while True:
+        ids = list(bind.execute(
+            sa.text("SELECT id FROM livres WHERE id > :last ORDER BY id LIMIT :limit"),
+            {'last': last, 'limit': CHUNK_SIZE},
+        ).scalars())
+        if not ids:
+            break
+        rows = _render(bind, ids)
+        if rows:
+            bind.execute(insert, rows)
+        last = ids[-1]
+
+
+def downgrade():
+    with op.batch_alter_table('livre_summary', schema=None) as batch_op:
+        batch_op.drop_index('ix_livre_summary_titre_id')
+        batch_op.drop_index('ix_livre_summary_created_at_id')
+
+    op.drop_table('livre_summary')
@@ -0,0 +1,28 @@
+"""import job queue
+
+Revision ID: a9a63e5ea9ec
+Revises: 8b09a1e415c7
+Create Date: 2026-10-18 15:21:40.518372
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9a63e5ea9ec'
+down_revision = '8b09a1e415c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('import_run', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_import_run_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('import_run', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_import_run_status'))
+        batch_op.drop_column('total')
@@ -0,0 +1,28 @@
+"""livre change log
+
+Revision ID: b1aa65bd2de4
+Revises: 495d2ef767bc
+Create Date: 2026-10-18 17:32:42.884716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1aa65bd2de4'
+down_revision = '495d2ef767bc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('livre_change',
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('livre_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+
+
+def downgrade():
+    op.drop_table('livre_change')
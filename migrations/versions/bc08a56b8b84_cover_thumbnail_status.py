@@ -0,0 +1,28 @@
+"""cover thumbnail status
+
+Revision ID: bc08a56b8b84
+Revises: 66e05019a823
+Create Date: 2026-10-18 19:03:47.860215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bc08a56b8b84'
+down_revision = '66e05019a823'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing covers only have a 256px thumbnail: they show the placeholder
+    # until `flask covers-thumbnails` has made every size
+    with op.batch_alter_table('livres', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('couverture_prete', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('livres', schema=None) as batch_op:
+        batch_op.drop_column('couverture_prete')
@@ -0,0 +1,119 @@
+"""duplicate detection index
+
+Revision ID: d2f2e81b5b70
+Revises: a9a63e5ea9ec
+Create Date: 2026-10-18 17:41:26.517302
+
+"""
+import hashlib
+import random
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f2e81b5b70'
+down_revision = 'a9a63e5ea9ec'
+branch_labels = None
+depends_on = None
+
+
+# Title keys and MinHash LSH bands as the app computes them at this revision
+# (services.duplicate_check), kept here so later changes to the app do not
+# alter what this migration writes.
+ARTICLES = {'le', 'la', 'les', 'l', 'un', 'une', 'des', 'the', 'a', 'an'}
+BANDS = 10
+ROWS = 3
+_PRIME = (1 << 61) - 1
+_rnd = random.Random(0x11B7A7)
+_PERMUTATIONS = [(_rnd.randrange(1, _PRIME), _rnd.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+CHUNK_SIZE = 2000
+
+
+def _fold(value):
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _title_key(titre):
+    words = _WORD_RE.findall(_fold(titre))
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    return ' '.join(words)
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _band_buckets(key):
+    padded = f'  {key} '
+    trigrams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+    hashes = [_hash64(t) for t in trigrams]
+    if not hashes:
+        return []
+    signature = [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return buckets
+
+
+def upgrade():
+    op.create_table('livre_title_key',
+    sa.Column('livre_id', sa.Integer(), nullable=False),
+    sa.Column('title_key', sa.String(length=512), nullable=False),
+    sa.ForeignKeyConstraint(['livre_id'], ['livres.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('livre_id')
+    )
+    with op.batch_alter_table('livre_title_key', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_livre_title_key_title_key'), ['title_key'], unique=False)
+
+    op.create_table('livre_signature',
+    sa.Column('livre_id', sa.Integer(), nullable=False),
+    sa.Column('band', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('bucket', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['livre_id'], ['livres.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('livre_id', 'band')
+    )
+    with op.batch_alter_table('livre_signature', schema=None) as batch_op:
+        batch_op.create_index('ix_livre_signature_band_bucket', ['band', 'bucket'], unique=False)
+
+    # title keys and LSH bands of the existing livres
+    bind = op.get_bind()
+    last = 0
+    while True:
+        rows = bind.execute(
+            sa.text("SELECT id, titre FROM livres WHERE id > :last ORDER BY id LIMIT :limit"),
+            {'last': last, 'limit': CHUNK_SIZE},
+        ).all()
+        if not rows:
+            break
+        keys, bands = [], []
+        for livre_id, titre in rows:
+            key = _title_key(titre)
+            keys.append({'livre_id': livre_id, 'title_key': key})
+            bands += [{'livre_id': livre_id, 'band': band, 'bucket': bucket} for band, bucket in enumerate(_band_buckets(key))]
+        bind.execute(sa.text("INSERT INTO livre_title_key (livre_id, title_key) VALUES (:livre_id, :title_key)"), keys)
+        if bands:
+            bind.execute(sa.text("INSERT INTO livre_signature (livre_id, band, bucket) VALUES (:livre_id, :band, :bucket)"), bands)
+        last = rows[-1][0]
+
+
+def downgrade():
+    with op.batch_alter_table('livre_signature', schema=None) as batch_op:
+        batch_op.drop_index('ix_livre_signature_band_bucket')
+
+    op.drop_table('livre_signature')
+    with op.batch_alter_table('livre_title_key', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_livre_title_key_title_key'))
+
+    op.drop_table('livre_title_key')
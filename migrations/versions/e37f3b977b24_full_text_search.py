@@ -0,0 +1,107 @@
+"""full text search index
+
+Revision ID: e37f3b977b24
+Revises: ea747d0049a9
+Create Date: 2026-10-18 09:12:41.208113
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e37f3b977b24'
+down_revision = 'ea747d0049a9'
+branch_labels = None
+depends_on = None
+
+
+# FTS5 virtual table on SQLite (rowid = livres.id), tsvector table + GIN
+# indexes on Postgres. Kept here as of this revision: the app's search module
+# may change later.
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS livre_fts USING fts5("
+    "titre, oeuvres, serie, auteurs, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+]
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS livre_search ("
+    "livre_id INTEGER PRIMARY KEY REFERENCES livres(id) ON DELETE CASCADE, "
+    "document TSVECTOR NOT NULL, auteurs TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_livre_search_document ON livre_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_livre_search_auteurs ON livre_search USING GIN (auteurs)",
+]
+SQLITE_INSERT = (
+    "INSERT INTO livre_fts (rowid, titre, oeuvres, serie, auteurs) VALUES (:id, :titre, :oeuvres, :serie, :auteurs)"
+)
+POSTGRES_INSERT = (
+    "INSERT INTO livre_search (livre_id, document, auteurs) VALUES (:id, "
+    "setweight(to_tsvector('simple', :titre), 'A') || setweight(to_tsvector('simple', :serie), 'B') "
+    "|| setweight(to_tsvector('simple', :oeuvres), 'C'), to_tsvector('simple', :auteurs))"
+)
+CHUNK_SIZE = 2000
+
+
+def _fold(value):
+    # same folding as the app indexes with: lowercase, accents stripped
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _documents(bind, ids):
+    docs = {}
+    rows = bind.execute(sa.text(
+        "SELECT livres.id, livres.titre, serie.nom FROM livres LEFT OUTER JOIN serie ON serie.id = livres.serie_id "
+        "WHERE livres.id IN :ids"
+    ).bindparams(sa.bindparam('ids', expanding=True)), {'ids': ids})
+    for livre_id, titre, serie in rows:
+        docs[livre_id] = {'id': livre_id, 'titre': _fold(titre), 'serie': _fold(serie), 'oeuvres': '', 'auteurs': ''}
+    rows = bind.execute(sa.text(
+        "SELECT livre_auteur.livre_id, auteur.prenom, auteur.nom, auteur.alias FROM livre_auteur "
+        "JOIN auteur ON auteur.id = livre_auteur.auteur_id WHERE livre_auteur.livre_id IN :ids"
+    ).bindparams(sa.bindparam('ids', expanding=True)), {'ids': ids})
+    for livre_id, prenom, nom, alias in rows:
+        docs[livre_id]['auteurs'] += ' ' + _fold(' '.join(p for p in (prenom, nom, alias) if p))
+    rows = bind.execute(sa.text(
+        "SELECT livre_oeuvre.livre_id, oeuvre.titre FROM livre_oeuvre "
+        "JOIN oeuvre ON oeuvre.id = livre_oeuvre.oeuvre_id WHERE livre_oeuvre.livre_id IN :ids"
+    ).bindparams(sa.bindparam('ids', expanding=True)), {'ids': ids})
+    for livre_id, titre in rows:
+        docs[livre_id]['oeuvres'] += ' ' + _fold(titre)
+    return list(docs.values())
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        ddl, insert = SQLITE_DDL, SQLITE_INSERT
+    elif bind.dialect.name == 'postgresql':
+        ddl, insert = POSTGRES_DDL, POSTGRES_INSERT
+    else:
+        return
+    for stmt in ddl:
+        op.execute(stmt)
+    # populated from the existing livres
+    last = 0
+    while True:
+        ids = list(bind.execute(
+            sa.text("SELECT id FROM livres WHERE id > :last ORDER BY id LIMIT :limit"),
+            {'last': last, 'limit': CHUNK_SIZE},
+        ).scalars())
+        if not ids:
+            break
+        docs = _documents(bind, ids)
+        if docs:
+            bind.execute(sa.text(insert), docs)
+        last = ids[-1]
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS livre_fts')
+    elif bind.dialect.name == 'postgresql':
+        op.execute('DROP TABLE IF EXISTS livre_search')
@@ -1,19 +1,26 @@
+import importlib.util
 import io
+from datetime import datetime, timedelta
 
 import pytest
+from sqlalchemy import event, func, select, text
 
 from library_tracker.app import create_app
 from library_tracker.app.extensions import db
+from library_tracker.app.models.auth import User
 from library_tracker.app.models.core import Auteur, Genre
-from library_tracker.app.models.books import Livre
-from library_tracker.app.services.duplicate_check import find_potential_duplicates
+from library_tracker.app.models.books import Livre, LivreAuteur
+from library_tracker.app.services.cache import SqliteCache, get_cache
+from library_tracker.app.services.duplicate_check import duplicate_candidates, find_potential_duplicates
 from library_tracker.app.services.import_export import import_books_from_csv
+from library_tracker.app.services.pagination import keyset_paginate
+from library_tracker.app.services.refdata import get_refs, refs_version
+from library_tracker.app.services.search import match_subquery
 
 
 @pytest.fixture()
 def app():
-	app = create_app()
-	app.config.update({
+	app = create_app({
 		"TESTING": True,
 		"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
 	})
@@ -28,6 +35,17 @@ def client(app):
 	return app.test_client()
 
 
+@pytest.fixture()
+def logged_client(app):
+	user = User(username="tester")
+	user.set_password("secret")
+	db.session.add(user)
+	db.session.commit()
+	client = app.test_client()
+	client.post("/auth/login", data={"username": "tester", "password": "secret"})
+	return client
+
+
 def test_health(client):
 	rv = client.get("/health")
 	assert rv.status_code == 200
@@ -49,6 +67,315 @@ def test_duplicate_check(app):
 		assert any(x.titre == "Test Book" for x in dups)
 
 
+def test_duplicate_candidates_fuzzy(app):
+	with app.app_context():
+		herbert = Auteur(prenom="Frank", nom="Herbert")
+		simmons = Auteur(prenom="Dan", nom="Simmons")
+		db.session.add_all([herbert, simmons])
+		db.session.flush()
+		dune = Livre(titre="Dune")
+		dune.livre_auteurs.append(LivreAuteur(auteur=herbert))
+		hyperion = Livre(titre="Hypérion")
+		hyperion.livre_auteurs.append(LivreAuteur(auteur=simmons))
+		db.session.add_all([dune, hyperion, Livre(titre="La Chute d'Hypérion"), Livre(titre="Fondation")])
+		db.session.commit()
+
+		# accents, case and leading article are ignored
+		found = duplicate_candidates("L'hyperion")
+		assert found[0].livre_id == hyperion.id and found[0].score == 1.0
+		assert "Fondation" not in {c.titre for c in found}
+		# an author in common ranks higher than a different one
+		same = duplicate_candidates("Hyperion !", [simmons.id])[0]
+		other = duplicate_candidates("Hyperion !", [herbert.id])
+		assert same.livre_id == hyperion.id
+		assert all(c.score < same.score for c in other)
+		assert duplicate_candidates("Dune", exclude_id=dune.id) == []
+
+		# index follows edits and deletions
+		hyperion.titre = "Endymion"
+		db.session.delete(dune)
+		db.session.commit()
+		assert hyperion.id not in {c.livre_id for c in duplicate_candidates("Hypérion")}
+		assert duplicate_candidates("Endymion")[0].livre_id == hyperion.id
+		assert duplicate_candidates("Dune") == []
+
+		# renaming an author touches its books, not their title keys
+		statements = []
+		listener = lambda *args: statements.append(args[2])  # noqa: E731
+		event.listen(db.engine, "before_cursor_execute", listener)
+		simmons.nom = "Simmons Jr"
+		db.session.commit()
+		event.remove(db.engine, "before_cursor_execute", listener)
+		assert statements and not any("livre_title_key" in s or "livre_signature" in s for s in statements)
+
+
+def test_duplicate_clusters_resume(app, monkeypatch):
+	from library_tracker.app.models.dedup import DuplicateCluster
+	from library_tracker.app.services import duplicate_clusters as dc
+
+	with app.app_context():
+		db.session.add_all([Livre(titre=t) for t in [
+			"Hypérion", "Hyperion", "L'Hypérion", "Fondation", "Fondation !", "Dune", "Les Misérables",
+		]])
+		db.session.add_all([
+			Auteur(prenom="Victor", nom="Hugo"),
+			Auteur(prenom="Hugo", nom="Victor"),
+			Auteur(prenom="Victor", nom="Hugot"),
+			Auteur(prenom="Frank", nom="Herbert"),
+		])
+		db.session.commit()
+
+		# interrupted after the first committed batch, then resumed
+		score_blocks, calls = dc.score_blocks, []
+
+		def flaky(*args):
+			calls.append(1)
+			if len(calls) == 2:
+				raise KeyboardInterrupt
+			return score_blocks(*args)
+
+		monkeypatch.setattr(dc, "score_blocks", flaky)
+		with pytest.raises(KeyboardInterrupt):
+			dc.cluster_duplicates("livre", batch_blocks=1)
+		run = db.session.scalars(select(dc.DuplicateRun)).one()
+		assert run.status == "interrupted" and run.position == 1
+		monkeypatch.setattr(dc, "score_blocks", score_blocks)
+		resumed = dc.cluster_duplicates("livre", batch_blocks=1)
+		assert resumed.id == run.id and resumed.status == "done"
+
+		titles = {
+			frozenset(db.session.get(Livre, i).titre for i in ids)
+			for _, ids in dc.run_clusters(resumed)
+		}
+		assert titles == {frozenset({"Hypérion", "Hyperion", "L'Hypérion"}), frozenset({"Fondation", "Fondation !"})}
+
+		# authors, scored in worker processes
+		auteurs = dc.cluster_duplicates("auteur", workers=2, batch_blocks=2)
+		[(cluster, ids)] = dc.run_clusters(auteurs)
+		assert {db.session.get(Auteur, i).nom for i in ids} == {"Hugo", "Victor", "Hugot"}
+
+		# dismissed clusters stay dismissed in later runs
+		cluster.status = "dismissed"
+		db.session.commit()
+		again = dc.cluster_duplicates("auteur")
+		assert again.id != auteurs.id
+		assert [c.status for c, _ in dc.run_clusters(again)] == ["dismissed"]
+		assert db.session.scalar(select(func.count()).select_from(DuplicateCluster)) == 4
+
+
+def test_cover_thumbnails_and_variants(app, logged_client, tmp_path, monkeypatch):
+	import threading
+
+	from PIL import Image
+
+	from library_tracker.app.models.covers import CoverVariant
+	from library_tracker.app.services import covers
+
+	app.config.update(UPLOAD_FOLDER=str(tmp_path / "covers"), THUMB_ROOT=str(tmp_path / "thumbs"))
+	release = threading.Event()
+	make_thumbnails = covers.make_thumbnails
+
+	def slow(*args):
+		release.wait(5)
+		return make_thumbnails(*args)
+
+	monkeypatch.setattr(covers, "make_thumbnails", slow)
+	jpeg = io.BytesIO()
+	Image.new("RGB", (1200, 900), "navy").save(jpeg, "JPEG")
+	jpeg.seek(0)
+	rv = logged_client.post(
+		"/livres", data={"titre": "Couvert", "cover": (jpeg, "cover.jpg")}, content_type="multipart/form-data"
+	)
+	# the request returns before the thumbnails exist: placeholder meanwhile
+	detail = logged_client.get(rv.headers["Location"]).get_data(as_text=True)
+	assert "cover-256.png" in detail and "Couverture en préparation" in detail
+
+	release.set()
+	covers.wait_for_thumbnails(timeout=10)
+	db.session.expire_all()
+	livre = db.session.scalars(select(Livre).filter_by(titre="Couvert")).one()
+	assert livre.couverture_prete
+	for size in (64, 128, 256, 512):
+		with Image.open(tmp_path / "thumbs" / str(size) / livre.lien_couverture) as thumb:
+			assert max(thumb.size) == size and thumb.format == "JPEG"
+
+	# WebP next to the JPEG thumbnails, with per-size metadata
+	stem = livre.lien_couverture.rsplit(".", 1)[0]
+	variants = {(v.size, v.format): v for v in db.session.scalars(select(CoverVariant).filter_by(filename=livre.lien_couverture))}
+	assert {(64, "jpeg"), (64, "webp"), (512, "webp")} <= set(variants)
+	assert (variants[(64, "webp")].width, variants[(64, "webp")].height) == (64, 48)
+	assert variants[(64, "webp")].bytes == (tmp_path / "thumbs" / "64" / f"{stem}.webp").stat().st_size
+	assert variants[(64, "webp")].bytes < variants[(256, "jpeg")].bytes / 5
+
+	home = logged_client.get("/").get_data(as_text=True)
+	assert f'<source type="image/webp" srcset="/files/thumbs/64/{stem}.webp 64w, /files/thumbs/128/{stem}.webp 128w, /files/thumbs/256/{stem}.webp 256w' in home
+	assert f'src="/files/thumbs/64/{livre.lien_couverture}"' in home and 'sizes="48px"' in home
+	assert f"thumbs/256/{stem}.webp" in logged_client.get(rv.headers["Location"]).get_data(as_text=True)
+
+	# replacing the cover removes the old files and metadata
+	old_name, old_files = livre.lien_couverture, list((tmp_path / "thumbs").rglob(f"{stem}.*"))
+	png = io.BytesIO()
+	Image.new("RGBA", (300, 600), (0, 0, 0, 0)).save(png, "PNG")
+	png.seek(0)
+	logged_client.post(
+		f"/livres/{livre.id}", data={"titre": "Couvert", "cover": (png, "cover.png")}, content_type="multipart/form-data"
+	)
+	covers.wait_for_thumbnails(timeout=10)
+	assert old_files and not any(p.exists() for p in old_files)
+	assert db.session.scalar(select(func.count()).select_from(CoverVariant).filter_by(filename=old_name)) == 0
+	db.session.expire_all()
+	assert livre.lien_couverture.endswith(".png") and livre.couverture_prete
+
+
+def test_content_addressed_covers(app, logged_client, tmp_path):
+	from PIL import Image
+
+	from library_tracker.app.models.covers import CoverBlob, CoverVariant
+	from library_tracker.app.services.covers import rehash_covers, release_cover, set_cover
+
+	app.config.update(UPLOAD_FOLDER=str(tmp_path / "covers"), THUMB_ROOT=str(tmp_path / "thumbs"), THUMB_WORKERS=0)
+	jpeg = io.BytesIO()
+	Image.new("RGB", (400, 600), "teal").save(jpeg, "JPEG")
+
+	# the same cover for three volumes: one file, one set of thumbnails
+	for tome in (1, 2, 3):
+		logged_client.post(
+			"/livres",
+			data={"titre": f"Saga {tome}", "cover": (io.BytesIO(jpeg.getvalue()), f"tome{tome}.jpg")},
+			content_type="multipart/form-data",
+		)
+	livres = db.session.scalars(select(Livre).order_by(Livre.id)).all()
+	name = livres[0].lien_couverture
+	assert {l.lien_couverture for l in livres} == {name} and all(l.couverture_prete for l in livres)
+	assert name.count("/") == 2 and name.startswith(f"{name[-36:-34]}/{name[-34:-32]}/")
+	assert [p.name for p in (tmp_path / "covers").rglob("*") if p.is_file()] == [name.rsplit("/", 1)[1]]
+	assert db.session.get(CoverBlob, name).refcount == 3
+	variants = db.session.scalar(select(func.count()).select_from(CoverVariant))
+
+	# files go with the last livre using them
+	for livre in livres[:2]:
+		logged_client.post(f"/livres/{livre.id}/delete")
+	assert (tmp_path / "covers" / name).exists() and db.session.get(CoverBlob, name).refcount == 1
+	# files are removed at commit only: a rolled back release keeps them
+	release_cover(name)
+	assert (tmp_path / "covers" / name).exists()
+	db.session.rollback()
+	assert (tmp_path / "covers" / name).exists() and db.session.get(CoverBlob, name).refcount == 1
+	logged_client.post(f"/livres/{livres[2].id}/delete")
+	assert not (tmp_path / "covers" / name).exists() and not list((tmp_path / "thumbs").rglob("*.*"))
+	assert db.session.get(CoverBlob, name) is None
+	assert db.session.scalar(select(func.count()).select_from(CoverVariant)) == 0 < variants
+	# an upload that found the file just before that release writes it again
+	revenant = Livre(titre="Saga 4")
+	set_cover(revenant, name, jpeg.getvalue())
+	db.session.add(revenant)
+	db.session.commit()
+	assert (tmp_path / "covers" / name).read_bytes() == jpeg.getvalue() and db.session.get(CoverBlob, name).refcount == 1
+	db.session.delete(revenant)
+	release_cover(name)
+	db.session.commit()
+
+	# covers stored under random names before content addressing
+	for i in (1, 2):
+		(tmp_path / "covers" / f"{i:032x}.jpg").write_bytes(jpeg.getvalue())
+		db.session.add(Livre(titre=f"Ancien {i}", lien_couverture=f"{i:032x}.jpg", couverture_prete=True))
+	db.session.add(Livre(titre="Perdu", lien_couverture="gone.jpg"))
+	db.session.commit()
+	assert rehash_covers() == (2, 1, 1)
+	db.session.expire_all()
+	moved = db.session.scalars(select(Livre).where(Livre.titre.like("Ancien%"))).all()
+	assert {l.lien_couverture for l in moved} == {name} and not any(l.couverture_prete for l in moved)
+	assert not (tmp_path / "covers" / f"{1:032x}.jpg").exists() and (tmp_path / "covers" / name).exists()
+	assert db.session.get(CoverBlob, name).refcount == 2
+
+
+def test_cover_endpoint_caching(app, client, tmp_path):
+	from PIL import Image
+
+	from library_tracker.app.services.images import store_cover_bytes
+
+	app.config.update(
+		UPLOAD_FOLDER=str(tmp_path / "covers"), THUMB_ROOT=str(tmp_path / "thumbs"),
+		COVER_CACHE_FOLDER=str(tmp_path / "cache"), COVER_CACHE_MAX_FILES=3,
+	)
+	jpeg = io.BytesIO()
+	Image.new("RGB", (600, 900), "olive").save(jpeg, "JPEG")
+	name = store_cover_bytes(jpeg.getvalue(), "jpg", str(tmp_path / "covers"))
+	stem = name.rsplit(".", 1)[0]
+
+	# strong ETag from the content hash, cached for good; 304 and ranges
+	rv = client.get(f"/files/covers/{name}")
+	assert rv.status_code == 200 and rv.data == jpeg.getvalue() and rv.mimetype == "image/jpeg"
+	assert rv.headers["ETag"] == f'"{stem.rsplit("/", 1)[1]}-orig-jpg"'
+	assert rv.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+	assert client.get(f"/files/covers/{name}", headers={"If-None-Match": rv.headers["ETag"]}).status_code == 304
+	part = client.get(f"/files/covers/{name}", headers={"Range": "bytes=0-99"})
+	assert part.status_code == 206 and part.data == jpeg.getvalue()[:100]
+
+	# missing sizes and formats are made on demand, into a bounded cache
+	rv = client.get(f"/files/thumbs/96/{stem}.webp")
+	assert rv.status_code == 200 and rv.mimetype == "image/webp"
+	with Image.open(io.BytesIO(rv.data)) as thumb:
+		assert thumb.size == (64, 96)
+	assert (tmp_path / "cache" / "96" / f"{stem}.webp").exists()
+	for size in (32, 48, 80):
+		assert client.get(f"/files/thumbs/{size}/{name}").status_code == 200
+	assert len([p for p in (tmp_path / "cache").rglob("*") if p.is_file()]) <= 3
+	for bad in (f"/files/thumbs/100/{name}", f"/files/thumbs/4096/{name}", f"/files/thumbs/64/{stem}.bmp",
+			"/files/thumbs/64/00/00/missing.jpg", "/files/covers/../../config.py"):
+		assert client.get(bad).status_code == 404
+
+	# zero-copy delivery by the front server
+	app.config.update(COVER_SENDFILE="x-accel-redirect")
+	rv = client.get(f"/files/thumbs/96/{stem}.webp")
+	assert rv.headers["X-Accel-Redirect"] == f"/_protected/cache/96/{stem}.webp" and not rv.data
+	app.config.update(COVER_SENDFILE="x-sendfile")
+	rv = client.get(f"/files/covers/{name}")
+	assert rv.headers["X-Sendfile"] == str(tmp_path / "covers" / name)
+
+
+def test_covers_rebuild_cli(app, tmp_path):
+	import os
+
+	from PIL import Image
+
+	from library_tracker.app.models.covers import CoverVariant
+	from library_tracker.app.services.covers import audit_covers
+	from library_tracker.app.services.images import store_cover_bytes
+
+	app.config.update(UPLOAD_FOLDER=str(tmp_path / "covers"), THUMB_ROOT=str(tmp_path / "thumbs"), THUMB_SIZES=(64, 256))
+	names = []
+	for color in ("red", "green", "blue"):
+		png = io.BytesIO()
+		Image.new("RGB", (300, 450), color).save(png, "PNG")
+		names.append(store_cover_bytes(png.getvalue(), "png", str(tmp_path / "covers")))
+	db.session.add_all([Livre(titre="Rouge", lien_couverture=names[0]), Livre(titre="Vert", lien_couverture=names[1])])
+	db.session.add(Livre(titre="Perdu", lien_couverture="00/00/gone.png"))
+	db.session.commit()
+	runner = app.test_cli_runner()
+
+	out = runner.invoke(args=["covers-rebuild", "--workers", "2"]).output
+	assert "3 cover file(s), 2 to (re)make." in out and "2/2 cover(s) processed" in out
+	assert f"1 orphan file(s), used by no livre:\n  {names[2]}" in out
+	assert "1 missing file(s), referenced by livres:\n  00/00/gone.png" in out
+	assert (tmp_path / "thumbs" / "256" / names[1]).exists()
+	assert db.session.scalar(select(func.count()).select_from(CoverVariant).filter_by(filename=names[0])) >= 2
+	assert db.session.scalars(select(Livre.couverture_prete).filter_by(titre="Rouge")).one()
+
+	# incremental: nothing to do, then only what changed
+	assert audit_covers().stale == []
+	earlier = (tmp_path / "covers" / names[0]).stat().st_mtime - 10
+	os.utime(tmp_path / "thumbs" / "64" / names[0], (earlier, earlier))
+	assert audit_covers().stale == [names[0]]
+	app.config.update(THUMB_SIZES=(64, 96, 256))
+	assert audit_covers().stale == sorted(names[:2])
+	out = runner.invoke(args=["covers-rebuild", "--check"]).output
+	assert "2 to (re)make" in out and "processed" not in out
+	out = runner.invoke(args=["covers-rebuild", "--workers", "0"]).output
+	assert "2/2 cover(s) processed" in out and audit_covers().stale == []
+	assert audit_covers(full=True).stale == sorted(names[:2])
+
+
 def test_import_books(app):
 	with app.app_context():
 		rows = [
@@ -67,3 +394,734 @@ def test_import_books(app):
 		res = import_books_from_csv(rows)
 		assert res.created == 1
 		assert db.session.query(Livre).filter_by(titre="Imported Book").count() == 1
+
+
+def test_bulk_import_statements_per_chunk(app):
+	def run(rows, chunk_size):
+		statements = []
+		listener = lambda *args: statements.append(args[2])  # noqa: E731
+		event.listen(db.engine, "before_cursor_execute", listener)
+		try:
+			res = import_books_from_csv(rows, chunk_size=chunk_size)
+		finally:
+			event.remove(db.engine, "before_cursor_execute", listener)
+		return res, len(statements)
+
+	def rows(n, suffix=""):
+		return [
+			{
+				"titre": f"Book {i}",
+				"editeur": f"Editeur {i % 2}",
+				"serie": "Serie A",
+				"emplacement": "Salon C1 EA",
+				"auteurs": f"Jean Auteur{i}{suffix}; Anne Trad (traducteur)",
+				"genres": "Roman, SF",
+				"oeuvres": f"1 Histoire {i}; Postface",
+			}
+			for i in range(n)
+		] + [{"titre": ""}]
+
+	with app.app_context():
+		res, small = run(rows(10), chunk_size=100)
+		assert (res.created, res.updated, res.skipped, res.errors) == (10, 0, 1, [])
+		assert res.rows_per_second > 0
+		_, large = run([{**r, "titre": f"New {r['titre']}"} for r in rows(200) if r["titre"]], chunk_size=100)
+		# statements grow with chunks, not rows
+		assert large <= 2 * small + 10
+
+		res, _ = run(rows(10, suffix="bis"), chunk_size=4)
+		assert (res.created, res.updated) == (0, 10)
+		livre = db.session.query(Livre).filter_by(titre="Book 3").one()
+		assert sorted(la.auteur.nom for la in livre.livre_auteurs) == ["Auteur3bis", "Trad"]
+		assert sorted(g.nom for g in livre.genres) == ["Roman", "SF"]
+		assert [(lo.ordre, lo.oeuvre.titre) for lo in sorted(livre.livre_oeuvres, key=lambda lo: lo.ordre or 99)] == [
+			(1, "Histoire 3"),
+			(None, "Postface"),
+		]
+		assert db.session.query(Genre).count() == 2
+		# bulk writes still feed the search index
+		assert livre.id in set(db.session.execute(select(match_subquery(author="Auteur3bis").c.livre_id)).scalars())
+
+
+def test_bulk_import_isolates_failing_rows(app):
+	with app.app_context():
+		# SQLite ignores String lengths: reject like Postgres would for langue.nom String(64)
+		db.session.execute(text(
+			"CREATE TRIGGER langue_nom_length BEFORE INSERT ON langue WHEN length(NEW.nom) > 64 "
+			"BEGIN SELECT RAISE(ABORT, 'value too long'); END"
+		))
+		rows = [{"titre": f"Book {i}", "langue": "x" * 65 if i == 4 else "Français"} for i in range(10)]
+		res = import_books_from_csv(rows, chunk_size=10)
+		assert (res.created, res.updated, res.skipped) == (9, 0, 1)
+		assert len(res.errors) == 1 and res.errors[0].startswith("Ligne 6:")
+		assert db.session.query(Livre).count() == 9
+		assert db.session.query(Livre).filter_by(titre="Book 5").one().langue.nom == "Français"
+
+
+def test_streaming_import_resumes_from_checkpoint(app, tmp_path, monkeypatch):
+	from library_tracker.app.services import import_export
+
+	path = tmp_path / "books.csv"
+	path.write_text("titre,auteurs\n" + "".join(f"Book {i},Jean Auteur{i}\n" for i in range(25)), encoding="utf-8")
+
+	with app.app_context():
+		write_chunk = import_export._write_chunk
+		calls = []
+
+		def crash_on_third(records, *args):
+			calls.append(len(records))
+			if len(calls) == 3:
+				raise KeyboardInterrupt
+			return write_chunk(records, *args)
+
+		monkeypatch.setattr(import_export, "_write_chunk", crash_on_third)
+		run = import_export.open_import(str(path))
+		with pytest.raises(KeyboardInterrupt):
+			import_export.run_import(run, chunk_size=10)
+		assert (run.status, run.position, run.created) == ("interrupted", 20, 20)
+		assert db.session.query(Livre).count() == 20
+		# committed chunks are expunged, the session does not grow with the file
+		assert len(db.session.identity_map) <= 1
+
+		monkeypatch.setattr(import_export, "_write_chunk", write_chunk)
+		resumed = import_export.open_import(str(path))
+		assert resumed.id == run.id
+		res = import_export.run_import(resumed, chunk_size=10)
+		assert (res.created, res.updated, resumed.status, resumed.position) == (25, 0, "done", 25)
+		assert db.session.query(Livre).count() == 25
+		# a finished file starts a new run
+		assert import_export.open_import(str(path)).id != run.id
+
+
+def test_background_import_job(app, logged_client, tmp_path):
+	from library_tracker.app.services.import_jobs import run_worker
+
+	app.config["IMPORT_FOLDER"] = str(tmp_path)
+	data = {"file": (io.BytesIO("titre,auteurs\nDune,Frank Herbert\nHypérion,Dan Simmons\n".encode()), "books.csv")}
+	rv = logged_client.post("/import", data=data, content_type="multipart/form-data")
+	assert rv.status_code == 302
+	status_url = rv.headers["Location"] + "/status"
+	job = logged_client.get(status_url).get_json()
+	assert (job["status"], job["finished"]) == ("queued", False)
+	assert b"data-import-status" in logged_client.get(rv.headers["Location"]).data
+	assert db.session.query(Livre).count() == 0
+
+	assert run_worker(once=True) == 1
+	job = logged_client.get(status_url).get_json()
+	assert (job["status"], job["created"], job["total"], job["progress"]) == ("done", 2, 2, 1.0)
+	assert db.session.query(Livre).count() == 2
+	assert run_worker(once=True) == 0
+
+
+def test_streaming_csv_export(app, logged_client):
+	import csv
+
+	rows = [
+		{
+			"titre": f"Book {i}",
+			"editeur": "Edit",
+			"serie": "Serie A",
+			"numero_serie": str(i),
+			"emplacement": "Salon C2 EB",
+			"auteurs": f"Jean Auteur{i}; Anne Trad (traducteur)",
+			"genres": "Roman, SF",
+			"oeuvres": "1 Histoire (p.1-20); Postface",
+		}
+		for i in range(25)
+	]
+	import_books_from_csv(rows)
+	app.config["EXPORT_BATCH_SIZE"] = 10
+
+	statements = []
+	listener = lambda *args: statements.append(args[2])  # noqa: E731
+	event.listen(db.engine, "before_cursor_execute", listener)
+	try:
+		rv = logged_client.get("/export.csv")
+		assert rv.is_streamed
+		body = rv.get_data(as_text=True)
+	finally:
+		event.remove(db.engine, "before_cursor_execute", listener)
+	exported = list(csv.DictReader(io.StringIO(body)))
+	assert [r["titre"] for r in exported] == [f"Book {i}" for i in range(25)]
+	assert sorted(exported[3]["auteurs"].split("; ")) == ["Anne Trad (traducteur)", "Jean Auteur3"]
+	assert exported[3]["emplacement"] == "Salon C2 EB"
+	# relations are loaded per batch, not per book
+	assert len(statements) < 25
+
+	res = import_books_from_csv(exported)
+	assert (res.created, res.updated, res.errors) == (0, 25, [])
+	assert list(csv.DictReader(io.StringIO(logged_client.get("/export.csv").get_data(as_text=True)))) == exported
+
+
+def test_export_formats(app, logged_client, tmp_path):
+	import json
+	import sqlite3
+
+	import_books_from_csv([
+		{"titre": "Dune", "auteurs": "Frank Herbert (auteur)", "genres": "SF", "emplacement": "Salon C2 EB"},
+		{"titre": "Recueil", "oeuvres": "2 Seconde; 1 Première (1-20)"},
+	])
+	db.session.add(User(username="other", password_hash="x"))
+	db.session.commit()
+
+	rv = logged_client.get("/export/jsonl")
+	assert rv.is_streamed and rv.mimetype == "application/x-ndjson"
+	records = [json.loads(line) for line in rv.get_data(as_text=True).splitlines()]
+	assert records[0]["auteurs"][0] | {"id": None} == {"id": None, "prenom": "Frank", "nom": "Herbert", "alias": None, "role": "auteur"}
+	assert records[0]["emplacement"] == {"zone": "Salon", "colonne": 2, "etage": "B"}
+	assert [(o["ordre"], o["titre"], o["pages"]) for o in records[1]["oeuvres"]] == [(1, "Première", "1-20"), (2, "Seconde", None)]
+
+	snapshot = tmp_path / "snapshot.db"
+	snapshot.write_bytes(logged_client.get("/export/sqlite").data)
+	conn = sqlite3.connect(snapshot)
+	assert [t for (t,) in conn.execute("SELECT titre FROM livres ORDER BY id")] == ["Dune", "Recueil"]
+	assert not conn.execute("SELECT name FROM sqlite_master WHERE name = 'user'").fetchall()
+	conn.close()
+
+	assert logged_client.get("/export/xml").status_code == 302
+	if importlib.util.find_spec("pyarrow"):
+		import pyarrow.parquet as pq
+
+		(tmp_path / "livres.parquet").write_bytes(logged_client.get("/export/parquet").data)
+		table = pq.read_table(tmp_path / "livres.parquet")
+		assert table.column("titre").to_pylist() == ["Dune", "Recueil"]
+		assert table.to_pylist()[0]["genres"] == ["SF"]
+
+
+def test_parallel_parse_stage(app):
+	from library_tracker.app.services.import_export import parse_chunks
+
+	rows = [
+		{
+			"titre": f"Book {i}" if i % 7 else "",
+			"emplacement": f"Salon du fond C{i} E{'AB'[i % 2]}",
+			"auteurs": f"Jean Auteur{i} (auteur); Anne Trad (traducteur)",
+			"oeuvres": f"1 Histoire {i} (p.1-20); Postface",
+		}
+		for i in range(40)
+	]
+	inline = list(parse_chunks(enumerate(rows, start=2), 6))
+	pooled = list(parse_chunks(enumerate(rows, start=2), 6, workers=2))
+	assert pooled == inline
+	assert [c.last_line for c in pooled] == list(range(7, 42, 6)) + [41]
+	record = pooled[0].records[0]
+	assert (record.line, record.emplacement) == (3, ("Salon du fond", 1, "B"))
+	assert record.auteurs == [("Jean", "Auteur1", "auteur"), ("Anne", "Trad", "traducteur")]
+	assert record.oeuvres == [(1, "Histoire 1", "p.1-20"), (None, "Postface", None)]
+
+	res = import_books_from_csv(rows, chunk_size=6, parse_workers=2)
+	assert (res.created, res.skipped) == (34, 6)
+
+
+def test_import_dry_run_diff(app, logged_client):
+	from library_tracker.app.services.import_diff import diff_books_from_csv
+
+	existing = [
+		{"titre": "Dune", "auteurs": "Frank Herbert (auteur)", "genres": "SF", "serie": "Dune", "numero_serie": "1"},
+		{"titre": "Hypérion", "auteurs": "Dan Simmons", "emplacement": "Salon C2 EB"},
+		{"titre": "Fondation", "auteurs": "Isaac Asimov"},
+	]
+	import_books_from_csv(existing)
+	rows = [
+		dict(existing[0]),  # unchanged
+		{**existing[1], "emplacement": "Bureau C1 EA", "genres": "SF"},  # updated
+		{"titre": "Fondation", "auteurs": "Jean Dupont"},  # conflicting: no author in common
+		{"titre": "Hyperion", "auteurs": "Dan Simmons"},  # conflicting: near-identical title
+		{"titre": "Dune (édition reliée)", "serie": "Dune", "numero_serie": "1"},  # conflicting: same serie/numero
+		{"titre": "Ubik", "auteurs": "Philip K. Dick"},  # created
+		{"titre": "Ubik", "auteurs": "Philip Dick"},  # conflicting: repeated with other content
+		{"titre": ""},
+	]
+
+	statements = []
+	listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+	event.listen(db.engine, "before_cursor_execute", listener)
+	try:
+		diff = diff_books_from_csv(rows)
+	finally:
+		event.remove(db.engine, "before_cursor_execute", listener)
+	assert not [s for s in statements if not s.lstrip().upper().startswith("SELECT")]
+	assert diff.counts == {"created": 1, "updated": 1, "unchanged": 1, "conflicting": 4}
+	assert diff.skipped == 1
+	updated = diff.rows["updated"][0]
+	assert updated.changes == {"emplacement": ("Salon C2 EB", "Bureau C1 EA"), "genres": ("", "SF")}
+	reasons = {r.titre: r.reason for r in diff.rows["conflicting"]}
+	assert "aucun auteur" in reasons["Fondation"]
+	assert "« Hypérion »" in reasons["Hyperion"]
+	assert "même série" in reasons["Dune (édition reliée)"]
+	assert "ligne 7" in reasons["Ubik"]
+	assert db.session.query(Livre).count() == 3
+
+	data = {"file": (io.BytesIO(b"titre,auteurs\nUbik,Philip K. Dick\n"), "books.csv"), "dry_run": "1"}
+	rv = logged_client.post("/import", data=data, content_type="multipart/form-data")
+	assert rv.status_code == 200 and "Simulation" in rv.get_data(as_text=True)
+	assert db.session.query(Livre).count() == 3
+
+
+def test_full_text_search(app):
+	with app.app_context():
+		rows = [
+			{"titre": "Hypérion", "auteurs": "Dan Simmons (auteur)", "serie": "Cantos"},
+			{"titre": "La Chute d'Hypérion", "auteurs": "Dan Simmons"},
+			{"titre": "Dune", "auteurs": "Frank Herbert"},
+		]
+		import_books_from_csv(rows)
+
+		def titles(**kw):
+			match = match_subquery(**kw)
+			q = db.session.query(Livre.titre).join(match, match.c.livre_id == Livre.id).order_by(match.c.rank)
+			return [t for (t,) in q]
+
+		# accent/case folded, prefix matching, ranked
+		assert titles(q="hyperion") == ["Hypérion", "La Chute d'Hypérion"]
+		assert titles(q="HYPÉ") == ["Hypérion", "La Chute d'Hypérion"]
+		assert titles(author="simm") and "Dune" not in titles(author="simm")
+		assert titles(q="cantos") == ["Hypérion"]
+
+		# index follows updates and deletes
+		dune = db.session.query(Livre).filter_by(titre="Dune").one()
+		dune.titre = "Dune Messiah"
+		db.session.commit()
+		assert titles(q="messiah") == ["Dune Messiah"]
+		db.session.delete(dune)
+		db.session.commit()
+		assert titles(q="dune") == []
+
+
+def test_secondary_indexes_used(app):
+	with app.app_context():
+		def plan(sql):
+			return " / ".join(row[3] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+		assert "ix_livres_editeur_id" in plan("SELECT id FROM livres WHERE editeur_id = 1")
+		assert "ix_livre_genre_genre_id" in plan("SELECT livre_id FROM livre_genre WHERE genre_id = 1")
+		assert "ix_livres_created_at_id" in plan("SELECT id FROM livres ORDER BY created_at DESC, id DESC LIMIT 20")
+		assert "ix_emplacement_zone_colonne_etage" in plan("SELECT id FROM emplacement WHERE zone = 'A' AND colonne = 1 AND etage = 'B'")
+
+
+def test_keyset_pagination(app):
+	with app.app_context():
+		base = datetime(2024, 1, 1)
+		for i in range(45):
+			db.session.add(Livre(titre=f"Livre {i:02d}", created_at=base + timedelta(days=i // 2)))
+		db.session.commit()
+		q = db.session.query(Livre)
+
+		seen = []
+		page = keyset_paginate(q, "created_desc", per_page=20)
+		assert page.prev_cursor is None
+		while True:
+			seen.extend(l.titre for l in page.items)
+			if not page.next_cursor:
+				break
+			page = keyset_paginate(q, "created_desc", after=page.next_cursor, per_page=20)
+		expected = [l.titre for l in q.order_by(Livre.created_at.desc(), Livre.id.desc())]
+		assert seen == expected
+
+		# walking back from the last page returns the previous one
+		back = keyset_paginate(q, "created_desc", before=page.prev_cursor, per_page=20)
+		assert [l.titre for l in back.items] == expected[20:40]
+
+		titles = keyset_paginate(q, "title_asc", per_page=5)
+		assert [l.titre for l in titles.items] == [f"Livre {i:02d}" for i in range(5)]
+		# a cursor from another sort is ignored
+		assert keyset_paginate(q, "title_asc", after=page.prev_cursor, per_page=5).items == titles.items
+
+
+def test_home_query_count_constant(app, logged_client):
+	def add_books(n, offset):
+		rows = [
+			{
+				"titre": f"Book {offset + i}",
+				"serie": f"Serie {i % 3}",
+				"emplacement": f"Salon C{i % 4} EA",
+				"auteurs": f"Jean Auteur{i}; Anne Trad{i} (traducteur)",
+				"genres": "Roman, Aventure, SF",
+			}
+			for i in range(n)
+		]
+		import_books_from_csv(rows)
+
+	def count_statements(url):
+		statements = []
+		listener = lambda *args: statements.append(args[2])  # noqa: E731
+		event.listen(db.engine, "before_cursor_execute", listener)
+		try:
+			rv = logged_client.get(url)
+		finally:
+			event.remove(db.engine, "before_cursor_execute", listener)
+		assert rv.status_code == 200
+		return len(statements)
+
+	app.config["RESPONSE_CACHE"] = False  # measures rendering
+	add_books(3, 0)
+	few = count_statements("/")
+	add_books(30, 3)
+	many = count_statements("/")
+	assert few == many
+	assert logged_client.get("/").data.count(b"Anne Trad") == 20
+
+
+def test_facet_counts(app, logged_client):
+	from library_tracker.app.models.core import Editeur, Emplacement, Langue
+	from library_tracker.app.models.facets import FacetCount
+	from library_tracker.app.services.facets import facet_counts, rebuild_facets
+
+	roman, polar = Genre(nom="Roman"), Genre(nom="Polar")
+	fr, en = Langue(nom="FR"), Langue(nom="EN")
+	folio = Editeur(nom="Folio")
+	a1, b2 = Emplacement(zone="Salon", colonne=1, etage="A"), Emplacement(zone="Bureau", colonne=2, etage="B")
+	for i in range(6):
+		db.session.add(Livre(
+			titre=f"Livre {i}", genres=[roman] + ([polar] if i % 2 else []), langue=fr if i < 4 else en,
+			editeur=folio if i < 3 else None, emplacement=a1 if i < 5 else b2,
+		))
+	db.session.commit()
+
+	def counts(ids=None):
+		return {f: {v.label: v.count for v in values} for f, values in facet_counts(ids).items()}
+
+	assert counts() == {
+		"genre": {"Roman": 6, "Polar": 3}, "editeur": {"Folio": 3}, "serie": {},
+		"langue": {"FR": 4, "EN": 2}, "zone": {"Salon": 5, "Bureau": 1},
+	}
+	# kept up to date on write, equal to a full rebuild
+	livre = db.session.scalars(select(Livre).filter_by(titre="Livre 0")).one()
+	livre.genres = [polar]
+	livre.langue = en
+	db.session.delete(db.session.scalars(select(Livre).filter_by(titre="Livre 5")).one())
+	db.session.commit()
+	a1.zone = "Séjour"
+	db.session.commit()
+	live = counts()
+	assert live["genre"] == {"Roman": 4, "Polar": 3} and live["langue"] == {"FR": 3, "EN": 2}
+	assert live["zone"] == {"Séjour": 5}
+	stored = set(db.session.execute(select(FacetCount.facet, FacetCount.value, FacetCount.count)))
+	rebuild_facets(db.session.connection())
+	assert set(db.session.execute(select(FacetCount.facet, FacetCount.value, FacetCount.count))) == stored
+
+	# counts follow the current filters; location filters share one join
+	html = logged_client.get(f"/?langue_id={fr.id}&zone=Séjour&colonne=1&etage=A").get_data(as_text=True)
+	assert "Livre 1" in html and "Livre 0" not in html
+	assert 'Roman</a> <span class="text-slate-500">(3)</span>' in html
+	assert 'Polar</a> <span class="text-slate-500">(2)</span>' in html
+	assert f'href="/?zone=S%C3%A9jour&amp;colonne=1&amp;etage=A" title="Retirer"' in html
+	html = logged_client.get("/").get_data(as_text=True)
+	assert f'href="/?genre_id={polar.id}">Polar</a> <span class="text-slate-500">(3)</span>' in html
+
+
+def test_bitmap_index(app, logged_client, monkeypatch):
+	from array import array
+
+	from library_tracker.app.models.core import Editeur, Emplacement
+	from library_tracker.app.services import bitmap_index
+	from library_tracker.app.services.bitmap_index import BitmapIndex, catalog_match
+
+	monkeypatch.setattr(bitmap_index, "SPARSE_MIN", 12)  # dense bitmaps from 13 books
+	app.config.update(BITMAP_INDEX=True, BITMAP_MAX_IDS=20, BITMAP_CHANGE_KEEP=50)
+	roman, polar = Genre(nom="Roman"), Genre(nom="Polar")
+	folio = Editeur(nom="Folio")
+	salon = [Emplacement(zone="Salon", colonne=c, etage="A") for c in (1, 2)]
+	cave = Emplacement(zone="Cave", colonne=1, etage="A")
+	for i in range(40):
+		db.session.add(Livre(
+			titre=f"Tome {i:02d}", genres=[roman] + ([polar] if i % 4 == 0 else []),
+			editeur=folio if i % 2 else None, emplacement=salon[i % 2] if i < 30 else cave,
+		))
+	db.session.commit()
+
+	def sql(*where):
+		return sorted(db.session.scalars(select(Livre.id).outerjoin(Emplacement).where(*where)))
+
+	def ids(**filters):
+		return sorted(catalog_match(**filters).ids())
+
+	index = bitmap_index.get_bitmap_index()
+	assert isinstance(index.values["genre"][roman.id], bytearray) and isinstance(index.values["genre"][polar.id], array)
+	assert ids(genre_id=polar.id, editeur_id=folio.id) == []
+	assert ids(genre_id=roman.id, editeur_id=folio.id, zone="sal") == sql(Livre.editeur_id == folio.id, Emplacement.zone == "Salon")
+	assert ids(genre_id=polar.id, zone="salon", colonne=1) == sql(Livre.id.in_(sql(Emplacement.colonne == 1, Emplacement.zone == "Salon")), Livre.genres.any(Genre.id == polar.id))
+	assert catalog_match(genre_id=roman.id).count == 40 and catalog_match(zone="Grenier").count == 0
+
+	# another worker's index replays the change log
+	other = BitmapIndex()
+	other.sync(db.session.connection())
+	livre = db.session.scalars(select(Livre).filter_by(titre="Tome 00")).one()
+	livre.genres = [roman]
+	livre.emplacement = cave
+	db.session.delete(db.session.scalars(select(Livre).filter_by(titre="Tome 04")).one())
+	db.session.commit()
+	other.sync(db.session.connection())
+	assert sorted(other.match({"genre": [polar.id]}).ids()) == sql(Livre.genres.any(Genre.id == polar.id))
+	assert livre.id in other.match({"emplacement": [cave.id]}).ids()
+	# seqs commit out of order (Postgres): seq + 1 shows up after seq + 2
+	LivreChange = bitmap_index.LivreChange
+	first, second = (db.session.scalars(select(Livre.id).filter_by(titre=t)).one() for t in ("Tome 01", "Tome 02"))
+	seq = other.seq
+	for livre_id, change in ((second, seq + 2), (first, seq + 1)):
+		with db.engine.begin() as connection:
+			connection.execute(bitmap_index.livre_genre.insert().values(livre_id=livre_id, genre_id=polar.id))
+			connection.execute(LivreChange.__table__.insert().values(seq=change, livre_id=livre_id))
+		other.sync(db.session.connection())
+		assert livre_id in other.match({"genre": [polar.id]}).ids()
+	assert other.seq == seq + 2 and not other.gaps
+	# log pruned past its position: rebuilt
+	seq = other.seq
+	for i in range(60):
+		db.session.add(Livre(titre=f"Nouveau {i}", genres=[polar]))
+		db.session.commit()
+	assert db.session.scalar(select(func.min(bitmap_index.LivreChange.seq))) > seq + 1
+	other.sync(db.session.connection())
+	assert other.match({"genre": [polar.id]}).count == len(sql(Livre.genres.any(Genre.id == polar.id))) == 70
+
+	# catalog.home: small matches fetched by id, exact totals
+	html = logged_client.get(f"/?editeur_id={folio.id}&zone=Cave").get_data(as_text=True)
+	assert "Tome 31" in html and "Tome 39" in html and "Tome 30" not in html
+	rv = logged_client.get(f"/?genre_id={polar.id}&page=1").get_data(as_text=True)
+	assert "Page 1 / 4 — 70 résultats" in rv
+
+
+def test_livre_summary(app, logged_client):
+	from library_tracker.app.models.anthologies import LivreOeuvre, Oeuvre
+	from library_tracker.app.models.core import Emplacement, Serie
+	from library_tracker.app.models.summary import LivreSummary
+
+	herbert = Auteur(prenom="Frank", nom="Herbert")
+	dune = Livre(
+		titre="Dune", serie=Serie(nom="Dune"), numero_serie=1, emplacement=Emplacement(zone="Salon", colonne=2, etage="B"),
+		genres=[Genre(nom="SF"), Genre(nom="Aventure")],
+	)
+	dune.livre_auteurs.append(LivreAuteur(auteur=herbert, role="auteur"))
+	dune.livre_oeuvres.append(LivreOeuvre(oeuvre=Oeuvre(titre="Postface"), ordre=2))
+	dune.livre_oeuvres.append(LivreOeuvre(oeuvre=Oeuvre(titre="Dune"), ordre=1, pages="1-600"))
+	db.session.add_all([dune, Livre(titre="Ubik")])
+	db.session.commit()
+
+	summary = db.session.get(LivreSummary, dune.id)
+	assert (summary.auteurs, summary.genres, summary.serie_label, summary.emplacement) == (
+		"Frank Herbert (auteur)", "Aventure, SF", "Dune #1", "Salon C2 EB",
+	)
+	assert summary.oeuvres == "1 Dune (1-600); 2 Postface"
+	# kept current when a referenced row changes, and on delete
+	herbert.prenom = "F."
+	db.session.commit()
+	db.session.expire_all()
+	assert db.session.get(LivreSummary, dune.id).auteurs == "F. Herbert (auteur)"
+	db.session.delete(db.session.scalars(select(Livre).filter_by(titre="Ubik")).one())
+	db.session.commit()
+	assert db.session.scalar(select(func.count()).select_from(LivreSummary)) == 1
+
+	html = logged_client.get("/").get_data(as_text=True)
+	assert "F. Herbert (auteur)" in html and "Salon C2 EB" in html and "Dune #1" in html
+	# the CSV export reads livre_summary alone
+	statements = []
+	listener = lambda *args: statements.append(args[2])  # noqa: E731
+	event.listen(db.engine, "before_cursor_execute", listener)
+	try:
+		body = logged_client.get("/export.csv").get_data(as_text=True)
+	finally:
+		event.remove(db.engine, "before_cursor_execute", listener)
+	assert "Aventure, SF" in body
+	[export] = [s for s in statements if "user" not in s]
+	assert "FROM livre_summary ORDER BY" in export
+
+	db.session.execute(LivreSummary.__table__.delete())
+	db.session.commit()
+	assert "(1 livres)" in app.test_cli_runner().invoke(args=["summary-rebuild"]).output
+	assert db.session.get(LivreSummary, dune.id).emplacement == "Salon C2 EB"
+
+
+def test_response_cache(app, logged_client):
+	db.session.add(Livre(titre="Dune"))
+	db.session.commit()
+
+	def get(url, **headers):
+		statements = []
+		listener = lambda *args: statements.append(args[2])  # noqa: E731
+		event.listen(db.engine, "before_cursor_execute", listener)
+		try:
+			rv = logged_client.get(url, headers=headers)
+		finally:
+			event.remove(db.engine, "before_cursor_execute", listener)
+		return rv, [s for s in statements if "livres" in s or "genre" in s]
+
+	logged_client.get("/")  # shows the login flash message: not cached
+	rv, queries = get("/")
+	assert rv.status_code == 200 and "Dune" in rv.get_data(as_text=True) and queries
+	etag, modified = rv.headers["ETag"], rv.headers["Last-Modified"]
+	assert etag.startswith('W/"') and "no-cache" in rv.headers["Cache-Control"]
+	# served again without touching the catalog, or answered 304
+	again, queries = get("/")
+	assert again.data == rv.data and again.headers["ETag"] == etag and not queries
+	assert get("/", **{"If-None-Match": etag})[0].status_code == 304
+	assert get("/", **{"If-Modified-Since": modified})[0].status_code == 304
+	assert get("/refs/genres")[0].status_code == 200 and not get("/refs/genres")[1]
+
+	# any write bumps the catalog version
+	db.session.add_all([Livre(titre="Ubik"), Genre(nom="SF")])
+	db.session.commit()
+	rv, queries = get("/", **{"If-None-Match": etag})
+	assert rv.status_code == 200 and "Ubik" in rv.get_data(as_text=True) and rv.headers["ETag"] != etag
+	assert "SF" in get("/refs/genres")[0].get_data(as_text=True)
+	# pages with a pending flash message are rendered, not cached
+	with logged_client.session_transaction() as sess:
+		sess["_flashes"] = [("success", "Livre ajouté.")]
+	assert "Livre ajouté." in logged_client.get("/").get_data(as_text=True)
+	assert "Livre ajouté." not in logged_client.get("/").get_data(as_text=True)
+
+
+def test_fragment_cache(app, logged_client):
+	app.config["RESPONSE_CACHE"] = False
+	sf, polar = Genre(nom="SF"), Genre(nom="Polar")
+	herbert = Auteur(prenom="Frank", nom="Herbert")
+	dune = Livre(titre="Dune", genres=[sf])
+	dune.livre_auteurs.append(LivreAuteur(auteur=herbert))
+	db.session.add_all([dune, Livre(titre="Maigret", genres=[polar])])
+	db.session.commit()
+
+	def get(url):
+		statements = []
+		listener = lambda *args: statements.append(args[2])  # noqa: E731
+		event.listen(db.engine, "before_cursor_execute", listener)
+		try:
+			html = logged_client.get(url).get_data(as_text=True)
+		finally:
+			event.remove(db.engine, "before_cursor_execute", listener)
+		return html, statements
+
+	html, statements = get("/")
+	assert "Frank Herbert" in html and any("livre_summary.auteurs" in s for s in statements)
+	# rows come from the cache: only their revisions are read
+	again, statements = get("/")
+	assert "Frank Herbert" in again and not any("livre_summary.auteurs" in s for s in statements)
+	assert "Frank Herbert" in get(f"/livres/{dune.id}")[0]
+	assert not any("livre_auteur" in s for s in get(f"/livres/{dune.id}")[1])
+
+	# a referenced row changes: only its books are rendered again
+	herbert.nom = "Herbert Jr"
+	db.session.commit()
+	html, statements = get("/")
+	assert "Frank Herbert Jr" in html and "Maigret" in html
+	[summaries] = [s for s in statements if "livre_summary.auteurs" in s]
+	assert summaries.count("?") == 1  # Dune only
+	assert "Frank Herbert Jr" in get(f"/livres/{dune.id}")[0]
+
+
+def _file_app(tmp_path, **config):
+	"""App on a SQLite file with a logged-in client, so another process can write to it."""
+	uri = f"sqlite:///{(tmp_path / 'library.db').as_posix()}"
+	app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": uri, **config})
+	with app.app_context():
+		db.create_all()
+		user = User(username="tester")
+		user.set_password("secret")
+		db.session.add_all([user, Livre(titre="Dune")])
+		db.session.commit()
+	client = app.test_client()
+	client.post("/auth/login", data={"username": "tester", "password": "secret"})
+	client.get("/")  # login flash
+	return app, client
+
+
+def _write_in_process(app, body):
+	"""Run `body` (app context, default per-process memory cache) in a separate Python process."""
+	import subprocess
+	import sys
+	from pathlib import Path
+
+	uri = app.config["SQLALCHEMY_DATABASE_URI"]
+	script = (
+		"from library_tracker.app import create_app\n"
+		"from library_tracker.app.extensions import db\n"
+		"from library_tracker.app.models.books import Livre, LivreAuteur\n"
+		"from library_tracker.app.models.core import Auteur\n"
+		f"app = create_app({{'SQLALCHEMY_DATABASE_URI': {uri!r}}})\n"
+		"with app.app_context():\n"
+		+ "".join(f"\t{line}\n" for line in body)
+	)
+	subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).resolve().parent.parent, check=True)
+
+
+def test_response_cache_across_processes(tmp_path):
+	reader, client = _file_app(tmp_path)
+	etag = client.get("/").headers["ETag"]
+	assert client.get("/", headers={"If-None-Match": etag}).status_code == 304
+
+	# another process adds a book
+	_write_in_process(reader, ["db.session.add(Livre(titre='Ubik'))", "db.session.commit()"])
+	rv = client.get("/", headers={"If-None-Match": etag})
+	assert rv.status_code == 200 and rv.headers["ETag"] != etag and "Ubik" in rv.get_data(as_text=True)
+
+
+def test_fragment_cache_across_processes(tmp_path):
+	reader, client = _file_app(tmp_path, RESPONSE_CACHE=False)
+	_write_in_process(reader, [
+		"livre = db.session.query(Livre).one()",
+		"livre.livre_auteurs.append(LivreAuteur(auteur=Auteur(prenom='Frank', nom='Herbert')))",
+		"db.session.commit()",
+	])
+	assert "Frank Herbert" in client.get("/").get_data(as_text=True)
+	assert "Frank Herbert" in client.get("/").get_data(as_text=True)  # cached row
+
+	# renaming the author elsewhere leaves livres.updated_at alone
+	_write_in_process(reader, ["db.session.query(Auteur).one().nom = 'Herbert Jr'", "db.session.commit()"])
+	assert "Frank Herbert Jr" in client.get("/").get_data(as_text=True)
+
+
+def test_refs_cache_invalidation(app, tmp_path):
+	with app.app_context():
+		db.session.add(Genre(nom="Roman"))
+		db.session.commit()
+		assert [g["nom"] for g in get_refs("genres")] == ["Roman"]
+
+		statements = []
+		listener = lambda *args: statements.append(args[2])  # noqa: E731
+		event.listen(db.engine, "before_cursor_execute", listener)
+		get_refs("genres")
+		event.remove(db.engine, "before_cursor_execute", listener)
+		# only the version stamp is read (once per request inside requests)
+		assert len(statements) == 1 and "FROM cache_version" in statements[0]
+		assert next(iter(get_cache()._data.values()))[0] is not None  # expires (REFS_CACHE_TTL)
+
+		# attaching a genre to a book does not invalidate, creating one does
+		version = refs_version()
+		livre = Livre(titre="X", genres=[db.session.query(Genre).one()])
+		db.session.add(livre)
+		db.session.commit()
+		assert refs_version() == version
+		db.session.add(Genre(nom="Essai"))
+		db.session.commit()
+		assert refs_version() == version + 1
+		assert [g["nom"] for g in get_refs("genres")] == ["Essai", "Roman"]
+
+	# the SQLite backend shares values between processes
+	first = SqliteCache((tmp_path / "cache.db").as_posix())
+	second = SqliteCache((tmp_path / "cache.db").as_posix())
+	first.set("k", [{"id": 1}])
+	assert second.get("k") == [{"id": 1}]
+
+
+def test_author_autocomplete(app, logged_client):
+	with app.app_context():
+		db.session.add_all([
+			Auteur(nom="Simmons", prenom="Dan"),
+			Auteur(nom="Simak", prenom="Clifford"),
+			Auteur(nom="Éluard", prenom="Paul"),
+		])
+		db.session.commit()
+
+	rv = logged_client.get("/refs/auteurs/search?q=sim")
+	assert rv.status_code == 200
+	assert sorted(a["label"] for a in rv.get_json()) == ["Clifford Simak", "Dan Simmons"]
+	assert [a["label"] for a in logged_client.get("/refs/auteurs/search?q=eluard").get_json()] == ["Paul Éluard"]
+	assert len(logged_client.get("/refs/auteurs/search?q=s&limit=1").get_json()) == 1
+
+	# new authors are visible right away (cache keyed on the refs version)
+	with app.app_context():
+		db.session.add(Auteur(nom="Simenon", prenom="Georges"))
+		db.session.commit()
+	assert "Georges Simenon" in [a["label"] for a in logged_client.get("/refs/auteurs/search?q=sim").get_json()]
+
+	# form pages no longer embed the author table
+	page = logged_client.get("/livres/nouveau").get_data(as_text=True)
+	assert "Simmons" not in page and "data-author-search" in page